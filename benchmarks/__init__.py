@@ -0,0 +1 @@
+"""Standalone benchmarks; run each module with ``python -m benchmarks.<name>``"""
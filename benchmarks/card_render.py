@@ -0,0 +1,93 @@
+"""Rank-card throughput: rendering on the loop vs the CardRenderer pool vs cache hits
+
+    python -m benchmarks.card_render [cards] [workers]
+
+Needs Pillow. Avatars come from a local PNG instead of the CDN, so the
+numbers are pure render + IPC cost; event-loop lag is sampled alongside.
+"""
+import asyncio
+import io
+import sys
+import time
+
+from benchmarks.gateway_load import LagProbe
+from core.cards import CardRenderer, RankCard, render_rank_card
+from core.leveling import level_for_xp
+
+
+class FakeAsset:
+    def __init__(self, key: str, data: bytes):
+        self.key = key
+        self._data = data
+
+    def replace(self, **kwargs):
+        return self
+
+    async def read(self) -> bytes:
+        return self._data
+
+
+class FakeGuild:
+    id = 1
+
+
+class FakeMember:
+    guild = FakeGuild()
+
+    def __init__(self, member_id: int, avatar: FakeAsset):
+        self.id = member_id
+        self.display_name = f"member{member_id}"
+        self.display_avatar = avatar
+
+
+def avatar_png() -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (128, 128), (114, 137, 218)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def timed(label: str, count: int, render):
+    probe = LagProbe()
+    probe.start()
+    started = time.perf_counter()
+    await render()
+    elapsed = time.perf_counter() - started
+    await probe.stop()
+    lags = sorted(probe.lags) or [0.0]
+    print(f"{label:<22} {count / elapsed:>8,.0f} cards/s  loop lag p99={lags[int(len(lags) * 0.99)] * 1000:7.2f}ms "
+          f"max={lags[-1] * 1000:7.2f}ms")
+
+
+async def run(count: int, workers: int):
+    avatar = avatar_png()
+    members = [FakeMember(i, FakeAsset(f"a{i}", avatar)) for i in range(count)]
+    xp = [(i * 7919) % 200_000 for i in range(count)]
+
+    async def inline():
+        for i, member in enumerate(members):
+            render_rank_card(RankCard(member.display_name, level_for_xp(xp[i]), xp[i], i + 1), avatar)
+            await asyncio.sleep(0)
+
+    renderer = CardRenderer(workers=workers)
+    await asyncio.to_thread(renderer.start)
+
+    async def pooled():
+        await asyncio.gather(*(renderer.rank_card(member, xp[i], level_for_xp(xp[i]), i + 1)
+                               for i, member in enumerate(members)))
+
+    print(f"{count:,} distinct rank cards, {workers} workers")
+    await timed("on the event loop", count, inline)
+    await timed("process pool", count, pooled)
+    await timed("cached (same cards)", count, pooled)
+    renderer.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    asyncio.run(run(count, workers))
+
+
+if __name__ == "__main__":
+    main()
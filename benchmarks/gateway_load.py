@@ -0,0 +1,291 @@
+"""Message throughput of ProDiscordBot fed by a fake gateway
+
+    python -m benchmarks.gateway_load [scenario ...] [--events N] [--guilds N] [--members N] [--inflight N]
+
+Synthetic guilds, channels and members are built from gateway payloads and
+events go through the same ConnectionState parsers the websocket uses, so
+on_message, get_prefix and process_commands run unmodified. HTTP is answered
+locally. Scenarios:
+
+    chat      steady chat spread over every guild and member
+    raid      a burst of member joins into one guild with welcomes enabled
+    commands  prefix command spam (!help, unknown commands)
+
+Each reports throughput, p50/p99 handler latency (dispatch to completion),
+event-loop lag, SQL statements per event (including the XP writer's flush at
+the end of the scenario) and RSS growth. The bot module is imported inside a
+scratch directory so its database and log never touch real data.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.welcome_views_memory import rss_mb
+
+SCENARIOS = ("chat", "raid", "commands")
+_ids = itertools.count(10 ** 17)
+
+
+def snowflake() -> str:
+    return str(next(_ids))
+
+
+def user_payload(user_id: str, name: str, bot: bool = False) -> dict:
+    return {"id": user_id, "username": name, "discriminator": "0", "global_name": None,
+            "avatar": None, "bot": bot}
+
+
+def member_payload(**extra) -> dict:
+    return {"roles": [], "joined_at": datetime.now(timezone.utc).isoformat(), "deaf": False, "mute": False,
+            "flags": 0, **extra}
+
+
+def guild_payload(guild_id: str, channel_id: str, members: list) -> dict:
+    return {
+        "id": guild_id, "name": f"guild-{guild_id[-4:]}", "owner_id": members[0]["id"],
+        "member_count": len(members), "features": [], "emojis": [], "stickers": [],
+        "roles": [{"id": guild_id, "name": "@everyone", "permissions": "104324673", "position": 0,
+                   "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [{"id": channel_id, "type": 0, "name": "general", "position": 0,
+                      "permission_overwrites": [], "guild_id": guild_id}],
+        "members": [member_payload(user=user) for user in members],
+    }
+
+
+class FakeHTTP:
+    """Stands in for HTTPClient.request: every route succeeds instantly"""
+
+    def __init__(self, bot_user: dict):
+        self.bot_user = bot_user
+        self.calls = 0
+
+    async def request(self, route, **kwargs):
+        self.calls += 1
+        if route.method == "POST" and route.path == "/channels/{channel_id}/messages":
+            return {
+                "id": snowflake(), "channel_id": str(route.channel_id), "author": self.bot_user,
+                "content": "", "timestamp": datetime.now(timezone.utc).isoformat(),
+                "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+                "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0,
+            }
+        return None
+
+
+class LagProbe:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(loop.time() - started - self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class Harness:
+    """A ProDiscordBot wired to synthetic guilds instead of Discord"""
+
+    def __init__(self, bot_module, guilds: int, members: int, inflight: int):
+        self.module = bot_module
+        self.bot = bot_module.bot
+        self.state = self.bot._connection
+        self.guild_count = guilds
+        self.member_count = members
+        self.inflight = asyncio.Semaphore(inflight)
+        self.guilds = []  # (guild_id, channel_id, [user payloads])
+        self.dispatched = {}
+        self.latencies = []
+        self.sql_statements = 0
+
+    async def start(self):
+        from discord import ClientUser, Guild
+        from core.storage import open_backend
+        from core.views import MainMenuView, QuickActionsView, send_only
+
+        bot, db = self.bot, self.module.db
+        await bot._async_setup_hook()
+        bot_user = user_payload(snowflake(), "ProBot", bot=True)
+        self.state.user = ClientUser(state=self.state, data=bot_user)
+        self.fake_http = FakeHTTP(bot_user)
+        bot.http.request = self.fake_http.request
+
+        # Every sqlite connection the handlers open reports its statements here
+        db.get_connection = self._counted(db.get_connection)
+
+        for _ in range(self.guild_count):
+            guild_id, channel_id = snowflake(), snowflake()
+            members = [user_payload(snowflake(), f"member{i}") for i in range(self.member_count)]
+            self.state._add_guild(Guild(data=guild_payload(guild_id, channel_id, members), state=self.state))
+            self.guilds.append((guild_id, channel_id, members))
+
+        db.backend = await open_backend(None, db.db_path)
+        # ...and so does every batch the backend runs on its worker threads
+        db.backend._connect = self._counted(db.backend._connect)
+        await asyncio.to_thread(bot.features.load)
+        bot.xp.start()
+        bot.main_menu_view = send_only(MainMenuView())
+        bot.quick_actions_view = send_only(QuickActionsView())
+
+        for name in ("on_message", "on_member_join"):
+            setattr(bot, name, self._timed(getattr(bot, name)))
+
+    def _counted(self, connect):
+        def counted_connection():
+            conn = connect()
+            conn.set_trace_callback(self._count_sql)
+            return conn
+        return counted_connection
+
+    def _count_sql(self, statement):
+        self.sql_statements += 1
+
+    def _timed(self, handler):
+        async def timed(subject):
+            try:
+                await handler(subject)
+            finally:
+                self.latencies.append(time.perf_counter() - self.dispatched.pop(subject.id))
+                self.inflight.release()
+        timed.__name__ = handler.__name__
+        return timed
+
+    def reset(self):
+        self.latencies = []
+        self.sql_statements = 0
+        self.fake_http.calls = 0
+
+    async def _inject(self, key: int, parse, data: dict):
+        await self.inflight.acquire()
+        self.dispatched[key] = time.perf_counter()
+        parse(data)
+
+    async def message(self, guild, author: dict, content: str):
+        guild_id, channel_id, _ = guild
+        message_id = snowflake()
+        await self._inject(int(message_id), self.state.parse_message_create, {
+            "id": message_id, "channel_id": channel_id, "guild_id": guild_id, "author": author,
+            "member": member_payload(),
+            "content": content, "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+            "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0,
+        })
+
+    async def member_join(self, guild):
+        guild_id = guild[0]
+        user = user_payload(snowflake(), "raider")
+        await self._inject(int(user["id"]), self.state.parse_guild_member_add,
+                           member_payload(guild_id=guild_id, user=user))
+
+    async def drain(self):
+        while self.dispatched:
+            await asyncio.sleep(0.001)
+        # XP the handlers buffered is part of the scenario's cost, not the next one's
+        await self.bot.xp.flush()
+
+
+async def chat(harness: Harness, events: int):
+    rng = random.Random(1)
+    for _ in range(events):
+        guild = rng.choice(harness.guilds)
+        await harness.message(guild, rng.choice(guild[2]), rng.choice(("hello", "gg", "anyone around?", "lol")))
+
+
+async def raid(harness: Harness, events: int):
+    guild = harness.guilds[0]
+    conn = sqlite3.connect(harness.module.db.db_path)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO guilds (id, name, welcome_channel) VALUES (?, ?, ?)",
+                     (int(guild[0]), "raided", int(guild[1])))
+    conn.close()
+    for _ in range(events):
+        await harness.member_join(guild)
+
+
+async def command_spam(harness: Harness, events: int):
+    rng = random.Random(2)
+    for _ in range(events):
+        guild = rng.choice(harness.guilds)
+        await harness.message(guild, rng.choice(guild[2]), rng.choice(("!help", "!nope", "!help")))
+
+
+RUNNERS = {"chat": chat, "raid": raid, "commands": command_spam}
+
+
+async def run(bot_module, args):
+    harness = Harness(bot_module, args.guilds, args.members, args.inflight)
+    await harness.start()
+    print(f"{args.guilds} guilds x {args.members} members, {args.events:,} events per scenario, "
+          f"{args.inflight} in flight")
+
+    for name in args.scenarios:
+        harness.reset()
+        probe = LagProbe()
+        rss_before = rss_mb()
+        probe.start()
+        started = time.perf_counter()
+        await RUNNERS[name](harness, args.events)
+        await harness.drain()
+        elapsed = time.perf_counter() - started
+        await probe.stop()
+
+        latencies = sorted(harness.latencies)
+        lags = sorted(probe.lags) or [0.0]
+        print(f"{name:<9} {len(latencies) / elapsed:>8,.0f} ev/s  "
+              f"latency p50={statistics.median(latencies) * 1000:6.2f}ms p99={latencies[int(len(latencies) * 0.99)] * 1000:7.2f}ms  "
+              f"loop lag p99={lags[int(len(lags) * 0.99)] * 1000:7.2f}ms max={lags[-1] * 1000:7.2f}ms  "
+              f"sql/ev={harness.sql_statements / len(latencies):5.2f}  http/ev={harness.fake_http.calls / len(latencies):4.2f}  "
+              f"rss +{rss_mb() - rss_before:.1f}MB")
+
+    await harness.bot.xp.close()
+    await harness.bot.modlog.close()
+    await harness.bot.guild_registry.close()
+    await harness.module.db.backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake-gateway load test for ProDiscordBot")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS), help=", ".join(SCENARIOS))
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--inflight", type=int, default=64, help="events dispatched but not yet handled")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, repo)
+    os.chdir(tempfile.mkdtemp(prefix="gateway_load_"))
+    import bot as bot_module
+
+    try:
+        asyncio.run(run(bot_module, args))
+    finally:
+        bot_module.config.stop_watching()
+        bot_module.log_listener.stop()
+
+
+if __name__ == "__main__":
+    main()
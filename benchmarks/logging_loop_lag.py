@@ -0,0 +1,78 @@
+"""Event-loop lag under heavy logging: handlers on the loop vs the queue listener
+
+    python -m benchmarks.logging_loop_lag [seconds] [disk_latency_ms]
+
+A handler that sleeps per record stands in for a slow disk, so the
+numbers show how much of that latency leaks into the event loop.
+"""
+import asyncio
+import logging
+import statistics
+import sys
+import time
+
+from core.logsetup import setup_logging
+
+
+class SlowDiskHandler(logging.Handler):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def emit(self, record):
+        self.format(record)
+        time.sleep(self.latency)
+
+
+async def probe(duration: float, interval: float = 0.005):
+    """Schedule short sleeps and record how late each wake-up is"""
+    loop = asyncio.get_running_loop()
+    lags = []
+    end = loop.time() + duration
+    while loop.time() < end:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - started - interval)
+    return lags
+
+
+async def chatter(logger: logging.Logger, duration: float):
+    loop = asyncio.get_running_loop()
+    end = loop.time() + duration
+    count = 0
+    while loop.time() < end:
+        for _ in range(20):
+            logger.info("message %d from guild %d", count, count % 50)
+            logger.debug("xp gain %d", count, extra={"sample": "xp_gain", "guild_id": count % 50})
+            count += 1
+        await asyncio.sleep(0)
+    return count
+
+
+async def run(label: str, duration: float, dropped=lambda: 0):
+    logger = logging.getLogger("bench")
+    lags, count = await asyncio.gather(probe(duration), chatter(logger, duration))
+    lags.sort()
+    print(f"{label:<8} records={count:>8,}  dropped={dropped():>8,}  lag p50={statistics.median(lags) * 1000:6.2f}ms  "
+          f"p99={lags[int(len(lags) * 0.99)] * 1000:7.2f}ms  max={lags[-1] * 1000:7.2f}ms")
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0005
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(SlowDiskHandler(latency))
+    asyncio.run(run("direct", duration))
+
+    listener = setup_logging(level=logging.INFO, path=None, max_queue=1000)
+    # Swap the listener's stream handler for the same slow handler
+    listener.handlers = (SlowDiskHandler(latency),)
+    queue_handler = logging.getLogger().handlers[0]
+    asyncio.run(run("queue", duration, lambda: queue_handler.dropped))
+    listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Memory per member: sqlite row tuples and dicts vs the columnar MemberStatsStore
+
+    python -m benchmarks.member_store_memory [members] [guilds]
+
+Every layout holds the same synthetic users rows. Memory is measured with
+tracemalloc, so the numbers are Python heap only; the top-10 and decay
+timings show what the columnar layout does with and without NumPy.
+"""
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import core.memberstats as memberstats
+from core.memberstats import MemberStatsStore, epoch
+
+NOW = datetime(2026, 1, 1)
+
+
+def synthetic_rows(members: int, guilds: int):
+    rng = random.Random(7)
+    for i in range(members):
+        last = (NOW - timedelta(seconds=rng.randrange(0, 90 * 86400))).isoformat()
+        # Same shape as SELECT * FROM users
+        yield (rng.randrange(10 ** 17, 10 ** 18), 10 ** 17 + i % guilds, rng.randrange(0, 500_000),
+               rng.randrange(1, 80), rng.randrange(0, 50_000), last, rng.randrange(0, 5),
+               rng.randrange(0, 100), last)
+
+
+def measure(label: str, build, members: int, guilds: int):
+    # Rows are generated inside the trace, as if fetched from sqlite, so kept tuples count
+    tracemalloc.start()
+    started = time.perf_counter()
+    holder = build(synthetic_rows(members, guilds))
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<30} {current / 1024 / 1024:8.1f} MB  {current / members:6.0f} B/member  built in {elapsed:5.1f}s")
+    return holder
+
+
+def build_tuples(rows):
+    return {(row[1], row[0]): row for row in rows}
+
+
+def build_dicts(rows):
+    guilds = {}
+    for user_id, guild_id, xp, level, coins, last_message, warnings, reputation, created_at in rows:
+        guilds.setdefault(guild_id, {})[user_id] = {
+            "xp": xp, "level": level, "coins": coins, "reputation": reputation,
+            "warnings": warnings, "last_message": last_message, "created_at": created_at,
+        }
+    return guilds
+
+
+def build_columns(rows, guilds: int):
+    store = MemberStatsStore()
+    for user_id, guild_id, xp, level, coins, last_message, warnings, reputation, _ in rows:
+        store.guild(guild_id).append(user_id, (xp, level, coins, reputation, warnings, epoch(last_message)))
+    for guild_id in range(10 ** 17, 10 ** 17 + guilds):
+        store.guild(guild_id).index.merge()
+    return store
+
+
+def timed(label: str, fn, repeat: int = 3):
+    best = min(_once(fn) for _ in range(repeat))
+    print(f"  {label:<40} {best * 1000:8.2f}ms")
+
+
+def _once(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    guild_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f"{members:,} members across {guild_count} guilds (numpy: {'yes' if memberstats.numpy else 'no'})")
+
+    tuples = measure("row tuples keyed by (guild, user)", build_tuples, members, guild_count)
+    dicts = measure("dict per member", build_dicts, members, guild_count)
+    store = measure("columnar MemberStatsStore", lambda rows: build_columns(rows, guild_count), members, guild_count)
+    print(f"  of which arrays and index: {store.nbytes() / 1024 / 1024:.1f} MB")
+
+    guild_id = 10 ** 17
+    idle_before = epoch((NOW - timedelta(days=30)).isoformat())
+    print("Operations on one guild:")
+    timed("top 10 (row tuples)", lambda: sorted((row for key, row in tuples.items() if key[0] == guild_id),
+                                                key=lambda row: row[2], reverse=True)[:10])
+    timed("top 10 (dicts)", lambda: sorted(dicts[guild_id].items(), key=lambda item: item[1]["xp"], reverse=True)[:10])
+    timed("top 10 (columnar)", lambda: store.guild(guild_id).top(10))
+    timed("decay idle members 1% (dicts)", lambda: [
+        member.__setitem__("xp", int(member["xp"] * 0.99)) for member in dicts[guild_id].values()
+        if member["last_message"] < (NOW - timedelta(days=30)).isoformat()
+    ])
+    timed("decay idle members 1% (columnar)", lambda: store.guild(guild_id).decay(0.99, idle_before))
+
+
+if __name__ == "__main__":
+    main()
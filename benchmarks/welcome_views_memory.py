@@ -0,0 +1,52 @@
+"""RSS across many welcome sends: a new QuickActionsView per message vs the shared persistent one
+
+    python -m benchmarks.welcome_views_memory [count]
+"""
+import asyncio
+import gc
+import sys
+
+from discord.ui.view import ViewStore
+
+from core.views import QuickActionsView, send_only
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * 4096 / 1024 / 1024
+
+
+def store_like_send(store: ViewStore, view, message_id: int):
+    # Mirrors Messageable.send: unfinished views are stored against the new message
+    if not view.is_finished():
+        store.add_view(view, message_id)
+
+
+async def run(count: int, per_message: bool):
+    store = ViewStore(None)
+    store.add_view(QuickActionsView())
+    shared = send_only(QuickActionsView())
+
+    gc.collect()
+    start = rss_mb()
+    samples = []
+    for message_id in range(1, count + 1):
+        view = QuickActionsView() if per_message else shared
+        store_like_send(store, view, message_id)
+        if message_id % (count // 10) == 0:
+            samples.append(rss_mb() - start)
+
+    label = "per-message view" if per_message else "persistent view "
+    print(f"{label}: " + " ".join(f"{delta:7.1f}" for delta in samples) + " MB")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"RSS growth sampled every {count // 10:,} welcomes")
+    asyncio.run(run(count, per_message=False))
+    asyncio.run(run(count, per_message=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands, tasks
-from discord.ui import View, Button, Select, Modal, TextInput
 import os
 import asyncio
 import json
@@ -8,57 +7,78 @@ import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, Optional, List
 import logging
-import aiohttp
-import youtube_dl
 from collections import defaultdict
 import random
-import asyncpg
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
-logger = logging.getLogger(__name__)
+from core.activity import Activity, ActivityRecorder, create_tables as create_activity_tables
+from core.cards import CardRenderer
+from core.modlog import ModLogWriter, ModLogChannelSender, create_tables as create_mod_log_tables
+from core.moderation import ModerationExecutor
+from core.tickets import TicketService, create_indexes as create_ticket_indexes
+from core.config import BotConfig
+from core.content import HELP_EMBED, SETUP_EMBED, guild_join_embed
+from core.events import EventRelay
+from core.views import MainMenuView, QuickActionsView, send_only
+from core.features import Feature, FeatureGate
+from core.leveling import required_xp
+from core.maintenance import Maintenance, enable_incremental_vacuum
+from core.memberstats import MemberStatsStore, epoch
+from core.lifecycle import ShutdownCoordinator
+from core.levelups import LevelUpAnnouncer, create_columns as create_level_up_columns
+from core.guilds import GuildRegistry
+from core.logsetup import setup_logging
+from core.metrics import metrics
+from core.profiling import EventProfiler, TimedConnection, queries
+from core.storage import open_backend
+from core.storage.sqlite import create_tables as create_user_tables
+from core.watchdog import LoopWatchdog
+from core.retention import JsonlArchive, RetentionEngine, create_tables as create_retention_tables
+from core.retention import MODES as RETENTION_MODES, SPECS as RETENTION_TABLES
+from core.snapshot import StateSnapshots
+from core.startup import StartupTimer, available_extensions, lazy_import, sync_tree_if_changed
+from core.webapi import create_indexes as create_api_indexes, enable_wal
+from core.xp import XpWriter
 
-# Enhanced Bot Configuration
-class BotConfig:
-    def __init__(self):
-        self.prefix = "!"
-        self.version = "2.0.0"
-        self.description = "Professional Discord Bot - Like MEE6 but Better!"
-        self.owner_ids = []
-        
-    def load_config(self):
-        try:
-            with open('config/config.json', 'r') as f:
-                config = json.load(f)
-                self.__dict__.update(config)
-        except FileNotFoundError:
-            self.save_config()
-    
-    def save_config(self):
-        os.makedirs('config', exist_ok=True)
-        with open('config/config.json', 'w') as f:
-            json.dump(self.__dict__, f, indent=4)
+# Heavy optional dependencies are only imported when a cog first touches them
+aiohttp = lazy_import("aiohttp")
+youtube_dl = lazy_import("youtube_dl")
+
+startup = StartupTimer()
 
+# Seconds between messages that earn XP
+XP_COOLDOWN = 60
+
+logger = logging.getLogger(__name__)
+
+# Enhanced Bot Configuration (typed, reloaded live from config/config.json)
 config = BotConfig()
-config.load_config()
+with startup.phase("config"):
+    config.load_config()
+
+# Render workers are forked while the process is still single-threaded: the log listener below is the first thread
+with startup.phase("card workers"):
+    cards = CardRenderer()
+    cards.start()
+
+# Configure logging: handlers run on a listener thread so disk latency never stalls the loop
+with startup.phase("logging"):
+    log_listener = setup_logging(level=config.log_level, path="bot.log", json_output=config.log_json)
 
 # Enhanced Database with all features
 class Database:
     def __init__(self):
         self.db_path = "discord_bot_pro.db"
+        # Batched writers go through this; opened in setup_hook (SQLite or Postgres)
+        self.backend = None
         self.init_database()
     
     def init_database(self):
         """Initialize all database tables"""
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
+        # Must precede the first table; existing files are converted by Maintenance
+        enable_incremental_vacuum(c)
+        enable_wal(c)
         
         # Guilds table (server settings)
         c.execute("""
@@ -79,36 +99,13 @@ class Database:
                 updated_at TEXT
             )
         """)
+        create_level_up_columns(c)
         
         # Users table (global user data)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER,
-                guild_id INTEGER,
-                xp INTEGER DEFAULT 0,
-                level INTEGER DEFAULT 1,
-                coins INTEGER DEFAULT 100,
-                last_message TEXT,
-                warnings INTEGER DEFAULT 0,
-                reputation INTEGER DEFAULT 0,
-                created_at TEXT,
-                PRIMARY KEY (user_id, guild_id)
-            )
-        """)
+        create_user_tables(c)
         
         # Moderation logs
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS mod_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id INTEGER,
-                user_id INTEGER,
-                moderator_id INTEGER,
-                action TEXT,
-                reason TEXT,
-                duration INTEGER,
-                timestamp TEXT
-            )
-        """)
+        create_mod_log_tables(c)
         
         # Custom commands
         c.execute("""
@@ -160,6 +157,7 @@ class Database:
                 closed_at TEXT
             )
         """)
+        create_ticket_indexes(c)
         
         # Reaction roles
         c.execute("""
@@ -186,15 +184,23 @@ class Database:
             )
         """)
         
+        # Retention policies and the archive tables expired rows move to
+        create_retention_tables(c)
+        
+        # Hourly and daily activity rollups for the dashboard
+        create_activity_tables(c)
+        create_api_indexes(c)
+        
         conn.commit()
         conn.close()
         logger.info("Database initialized successfully!")
     
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        return sqlite3.connect(self.db_path, factory=TimedConnection)
 
 # Initialize database
-db = Database()
+with startup.phase("database"):
+    db = Database()
 
 # Enhanced Bot Class
 class ProDiscordBot(commands.Bot):
@@ -213,290 +219,164 @@ class ProDiscordBot(commands.Bot):
         self.launch_time = datetime.utcnow()
         self.command_stats = defaultdict(int)
         self.music_players = {}
-        
+        self.db = db
+        self.modlog_sender = ModLogChannelSender(self, db)
+        self.levelups = LevelUpAnnouncer(self, db)
+        self.member_stats = MemberStatsStore()
+        self.modlog = ModLogWriter(db, interval=config.modlog_flush_interval, max_batch=config.modlog_batch_size,
+                                   sender=self.modlog_sender, member_stats=self.member_stats)
+        # The dashboard runs in main.py's process; live events reach its hub over the relay
+        self.event_hub = EventRelay(config.event_relay_port)
+        self.moderation = ModerationExecutor(self.modlog, events=self.event_hub)
+        self.xp = XpWriter(db, interval=config.xp_flush_interval)
+        self.tickets = TicketService(db, max_pending_per_guild=config.ticket_queue_size, events=self.event_hub)
+        self.features = FeatureGate(db)
+        self.guild_registry = GuildRegistry(db)
+        self.main_menu_view = None
+        self.quick_actions_view = None
+        self.metrics = metrics
+        self.profiler = EventProfiler(enabled=config.profiling_enabled)
+        self.profiler.install(self)
+        self.query_profiler = queries
+        self.cards = cards
+        self.snapshots = StateSnapshots(self, db, config.snapshot_path, interval=config.snapshot_interval)
+        self.watchdog = LoopWatchdog(threshold=config.watchdog_threshold_ms / 1000)
+        queries.slow_threshold = config.slow_query_ms / 1000
+        queries.timing = config.profiling_enabled
+        self.maintenance = Maintenance(db, backup_dir=config.backup_dir, keep=config.backup_keep,
+                                       quiet_hours=(config.maintenance_start_hour, config.maintenance_end_hour))
+        self.analytics = ActivityRecorder(db)
+        self.retention = RetentionEngine(db, JsonlArchive(config.archive_dir), interval=config.retention_interval)
+        self.lifecycle = ShutdownCoordinator(deadline=config.shutdown_deadline)
+        # Drain order: stop background work, then flush queues and pending writes, then storage
+        self.lifecycle.add_step("config watcher", config.stop_watching)
+        self.lifecycle.add_step("watchdog", self.watchdog.stop)
+        self.lifecycle.add_step("voice", self.disconnect_voice)
+        self.lifecycle.add_step("card workers", self.cards.close)
+        self.lifecycle.add_step("mod log", self.modlog.close)
+        self.lifecycle.add_step("mod log channels", self.modlog_sender.close)
+        self.lifecycle.add_step("xp", self.xp.close)
+        self.lifecycle.add_step("level-ups", self.levelups.close)
+        self.lifecycle.add_step("guild registry", self.guild_registry.close)
+        self.lifecycle.add_step("activity", self.analytics.close)
+        # After the registry, so the snapshot sees every flushed setting
+        self.lifecycle.add_step("snapshot", self.snapshots.close)
+        self.lifecycle.add_step("maintenance", self.maintenance.close)
+        self.lifecycle.add_step("retention", self.retention.close)
+        self.lifecycle.add_step("storage", self.close_storage)
+        self.lifecycle.add_step("event relay", self.event_hub.close)
+        config.on_change(self.apply_config)
+        
+    def apply_config(self, old, new, changed):
+        """Push live config changes into running services without reconnecting"""
+        if "owner_ids" in changed:
+            self.owner_ids = set(new.owner_ids)
+        if "log_level" in changed:
+            logging.getLogger().setLevel(new.log_level)
+        self.modlog.interval = new.modlog_flush_interval
+        self.modlog.max_batch = new.modlog_batch_size
+        self.xp.interval = new.xp_flush_interval
+        self.tickets.max_pending_per_guild = new.ticket_queue_size
+        if "profiling_enabled" in changed:
+            self.profiler.enabled = new.profiling_enabled
+            self.query_profiler.timing = new.profiling_enabled
+        self.query_profiler.slow_threshold = new.slow_query_ms / 1000
+        self.watchdog.threshold = new.watchdog_threshold_ms / 1000
+        self.snapshots.interval = new.snapshot_interval
+        self.lifecycle.deadline = new.shutdown_deadline
+        self.maintenance.backup_dir = new.backup_dir
+        self.maintenance.keep = new.backup_keep
+        self.maintenance.quiet_hours = (new.maintenance_start_hour, new.maintenance_end_hour)
+        self.retention.interval = new.retention_interval
+    
+    def _schedule_event(self, coro, event_name, *args, **kwargs):
+        """Refuse new handlers once draining and track the rest so the drain can wait for them"""
+        if not self.lifecycle.admit():
+            return None
+        task = super()._schedule_event(coro, event_name, *args, **kwargs)
+        self.lifecycle.track(task)
+        return task
+    
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        """Every event handler runs through here; time it when profiling is on"""
+        with self.profiler.event(event_name):
+            await super()._run_event(coro, event_name, *args, **kwargs)
+    
     async def get_prefix(self, message):
         """Dynamic prefix per server"""
         if not message.guild:
             return commands.when_mentioned_or("!")(self, message)
         
-        conn = db.get_connection()
-        c = conn.cursor()
-        c.execute("SELECT prefix FROM guilds WHERE id = ?", (message.guild.id,))
-        result = c.fetchone()
-        conn.close()
-        
-        prefix = result[0] if result else "!"
-        return commands.when_mentioned_or(prefix)(self, message)
+        return commands.when_mentioned_or(self.guild_registry.prefix(message.guild.id))(self, message)
     
     async def setup_hook(self):
-        """Load all cogs/extensions"""
-        extensions = [
-            'cogs.moderation',
-            'cogs.music', 
-            'cogs.economy',
-            'cogs.leveling',
-            'cogs.tickets'
-        ]
-        
-        for ext in extensions:
+        """Load enabled cogs/extensions and warm in-memory state"""
+        self.lifecycle.install_signal_handlers(self.close)
+        with startup.phase("storage"):
+            db.backend = await open_backend(os.getenv("DATABASE_URL"), db.db_path)
+        
+        with startup.phase("state"):
+            # Flags, prefixes, channels and member stats come from the last snapshot plus DB deltas
+            await asyncio.to_thread(self.snapshots.load)
+            await asyncio.to_thread(self.tickets.load)
+        
+        # Persistent views: registered once, shared by every message that carries them
+        with startup.phase("views"):
+            self.add_view(MainMenuView())
+            self.add_view(QuickActionsView())
+            self.main_menu_view = send_only(MainMenuView())
+            self.quick_actions_view = send_only(QuickActionsView())
+        self.modlog.start()
+        self.xp.start()
+        self.guild_registry.start()
+        self.snapshots.start()
+        self.maintenance.start()
+        self.retention.start()
+        self.analytics.start()
+        self.watchdog.start()
+        config.start_watching()
+        
+        for ext in available_extensions(config.enabled_cogs):
             try:
-                await self.load_extension(ext)
-                logger.info(f"Loaded {ext}")
+                with startup.phase(ext):
+                    await self.load_extension(ext)
+                logger.info("Loaded %s", ext)
             except Exception as e:
-                logger.error(f"Failed to load {ext}: {e}")
+                logger.error("Failed to load %s: %s", ext, e)
         
-        await self.tree.sync()
-        logger.info("Slash commands synced!")
-
-bot = ProDiscordBot()
-
-# Enhanced UI Components
-class MainMenuView(View):
-    def __init__(self):
-        super().__init__(timeout=300)
-    
-    @discord.ui.select(
-        placeholder="🎮 Choose a feature to explore...",
-        options=[
-            discord.SelectOption(label="🛡️ Moderation", description="Kick, ban, warn, and more", emoji="🛡️"),
-            discord.SelectOption(label="🎵 Music", description="Play music in voice channels", emoji="🎵"),
-            discord.SelectOption(label="💰 Economy", description="Coins, shop, and inventory", emoji="💰"),
-            discord.SelectOption(label="📊 Leveling", description="XP system and leaderboards", emoji="📊"),
-            discord.SelectOption(label="🎫 Tickets", description="Support ticket system", emoji="🎫"),
-            discord.SelectOption(label="⚙️ Settings", description="Configure server settings", emoji="⚙️"),
-        ]
-    )
-    async def menu_select(self, interaction: discord.Interaction, select: Select):
-        selection = select.values[0]
-        
-        if selection == "🛡️ Moderation":
-            embed = discord.Embed(
-                title="🛡️ Moderation System",
-                description="Professional moderation tools at your fingertips!",
-                color=0xff6b6b
-            )
-            embed.add_field(
-                name="Commands",
-                value='/kick'  # Corrected
-• `/ban` - Permanently ban member
-• `/warn` - Issue warning
-• `/mute` - Temporarily mute member
-• `/purge` - Delete multiple messages
-• `/warnings` - View user warnings",
-                inline=False
-            )
-            embed.add_field(
-                name="Auto-Moderation",
-                value="• Spam protection
-• Link filtering
-• Bad word detection
-• Raid protection",
-                inline=False
-            )
-            
-        elif selection == "🎵 Music":
-            embed = discord.Embed(
-                title="🎵 Music System",
-                description="High-quality music streaming for your server!",
-                color=0x4ecdc4
-            )
-            embed.add_field(
-                name="Commands",
-                value="• `/play` - Play a song
-• `/queue` - View music queue
-• `/skip` - Skip current song
-• `/pause/resume` - Control playback
-• `/volume` - Adjust volume
-• `/lyrics` - Get song lyrics",
-                inline=False
-            )
-            
-        elif selection == "💰 Economy":
-            embed = discord.Embed(
-                title="💰 Economy System",
-                description="Virtual currency and shop system!",
-                color=0xf7dc6f
-            )
-            embed.add_field(
-                name="Commands",
-                value="• `/balance` - Check your coins
-• `/daily` - Claim daily reward
-• `/shop` - Browse server shop
-• `/buy` - Purchase items
-• `/inventory` - View your items
-• `/pay` - Transfer coins",
-                inline=False
-            )
-            
-        elif selection == "📊 Leveling":
-            embed = discord.Embed(
-                title="📊 Leveling System",
-                description="XP and ranking system to keep members engaged!",
-                color=0xbb8fce
-            )
-            embed.add_field(
-                name="Commands",
-                value="• `/rank` - View your rank card
-• `/leaderboard` - Top server members
-• `/setlevel` - Set user level (mods)
-• `/rewards` - Level rewards",
-                inline=False
-            )
-            
-        elif selection == "🎫 Tickets":
-            embed = discord.Embed(
-                title="🎫 Ticket System",
-                description="Professional support ticket system!",
-                color=0x85c1e9
-            )
-            embed.add_field(
-                name="Features",
-                value="• Create private support channels
-• Automatic ticket logging
-• Customizable categories
-• Staff management tools",
-                inline=False
-            )
-            
-        elif selection == "⚙️ Settings":
-            embed = discord.Embed(
-                title="⚙️ Server Settings",
-                description="Configure all bot features for your server!",
-                color=0xa6acaf
-            )
-            embed.add_field(
-                name="Configuration",
-                value="• Welcome/goodbye messages
-• Auto-roles
-• Moderation settings
-• Feature toggles
-• Prefix customization",
-                inline=False
-            )
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-
-class QuickActionsView(View):
-    def __init__(self):
-        super().__init__(timeout=None)
+        with startup.phase("command sync"):
+            try:
+                await sync_tree_if_changed(self)
+            except discord.HTTPException as e:
+                logger.error("Failed to sync command tree: %s", e)
     
-    @discord.ui.button(label="🎵 Play Music", style=discord.ButtonStyle.success, emoji="🎵")
-    async def play_music(self, interaction: discord.Interaction, button: Button):
-        modal = PlayMusicModal()
-        await interaction.response.send_modal(modal)
+    async def disconnect_voice(self):
+        for voice in list(self.voice_clients):
+            await voice.disconnect(force=True)
     
-    @discord.ui.button(label="📊 Server Stats", style=discord.ButtonStyle.primary, emoji="📊")
-    async def server_stats(self, interaction: discord.Interaction, button: Button):
-        guild = interaction.guild
-        
-        # Get database stats
-        conn = db.get_connection()
-        c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM users WHERE guild_id = ?", (guild.id,))
-        active_users = c.fetchone()[0]
-        conn.close()
-        
-        embed = discord.Embed(
-            title=f"📊 {guild.name} Statistics",
-            color=0x3498db,
-            timestamp=datetime.utcnow()
-        )
-        embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
-        embed.add_field(name="👥 Total Members", value=f"{guild.member_count:,}", inline=True)
-        embed.add_field(name="🤖 Bots", value=f"{len([m for m in guild.members if m.bot]):,}", inline=True)
-        embed.add_field(name="👨‍💻 Humans", value=f"{len([m for m in guild.members if not m.bot]):,}", inline=True)
-        embed.add_field(name="📈 Active Users", value=f"{active_users:,}", inline=True)
-        embed.add_field(name="💬 Text Channels", value=f"{len(guild.text_channels):,}", inline=True)
-        embed.add_field(name="🔊 Voice Channels", value=f"{len(guild.voice_channels):,}", inline=True)
-        embed.add_field(name="😎 Roles", value=f"{len(guild.roles):,}", inline=True)
-        embed.add_field(name="😀 Emojis", value=f"{len(guild.emojis):,}", inline=True)
-        embed.add_field(name="🎮 Boosts", value=f"{guild.premium_subscription_count:,}", inline=True)
-        embed.add_field(name="📅 Created", value=guild.created_at.strftime("%B %d, %Y"), inline=False)
-        
-        if guild.owner:
-            embed.add_field(name="👑 Owner", value=guild.owner.mention, inline=False)
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+    async def close_storage(self):
+        if db.backend is not None:
+            await db.backend.close()
     
-    @discord.ui.button(label="🎫 Create Ticket", style=discord.ButtonStyle.secondary, emoji="🎫")
-    async def create_ticket(self, interaction: discord.Interaction, button: Button):
-        # Check if user already has an open ticket
-        conn = db.get_connection()
-        c = conn.cursor()
-        c.execute("SELECT id FROM tickets WHERE guild_id = ? AND user_id = ? AND status = 'open'", 
-                 (interaction.guild_id, interaction.user.id))
-        existing = c.fetchone()
-        
-        if existing:
-            await interaction.response.send_message("❌ You already have an open ticket!", ephemeral=True)
-            return
-        
-        # Create ticket channel
-        category = discord.utils.get(interaction.guild.categories, name="🎫 TICKETS")
-        if not category:
-            category = await interaction.guild.create_category("🎫 TICKETS")
-        
-        overwrites = {
-            interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-            interaction.user: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-            interaction.guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
-        }
-        
-        channel = await interaction.guild.create_text_channel(
-            f"ticket-{interaction.user.name}",
-            category=category,
-            overwrites=overwrites
-        )
-        
-        # Save to database
-        c.execute("INSERT INTO tickets (guild_id, user_id, channel_id, category_id, created_at) VALUES (?, ?, ?, ?, ?)",
-                 (interaction.guild_id, interaction.user.id, channel.id, category.id, datetime.utcnow().isoformat()))
-        conn.commit()
-        conn.close()
-        
-        embed = discord.Embed(
-            title="🎫 Ticket Created",
-            description=f"Your support ticket has been created: {channel.mention}",
-            color=0x2ecc71
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        
-        # Send welcome message to ticket
-        welcome_embed = discord.Embed(
-            title="🎫 Support Ticket",
-            description=f"Hello {interaction.user.mention}! Staff will be with you shortly.
-
-Please describe your issue in detail.",
-            color=0x3498db
-        )
-        await channel.send(embed=welcome_embed)
+    async def close(self):
+        """Drain handlers and flush buffered writes before disconnecting"""
+        await self.lifecycle.drain()
+        await super().close()
 
-class PlayMusicModal(Modal):
-    def __init__(self):
-        super().__init__(title="🎵 Play Music")
-        
-        self.song_input = TextInput(
-            label="Song Name or URL",
-            placeholder="Enter a YouTube URL or search term...",
-            required=True,
-            max_length=500
-        )
-        self.add_item(self.song_input)
-    
-    async def on_submit(self, interaction: discord.Interaction):
-        if not interaction.user.voice:
-            await interaction.response.send_message("❌ You need to be in a voice channel!", ephemeral=True)
-            return
-        
-        await interaction.response.send_message(f"🎵 Searching for: `{self.song_input.value}`", ephemeral=True)
-        # Music functionality would be handled by the music cog
+bot = ProDiscordBot()
 
 # Enhanced Event Handlers
 @bot.event
 async def on_ready():
-    logger.info(f'{bot.user} has connected to Discord!')
-    logger.info(f'Connected to {len(bot.guilds)} guilds')
-    logger.info(f'Serving {sum(guild.member_count for guild in bot.guilds)} users')
+    logger.info('%s has connected to Discord!', bot.user)
+    logger.info('Connected to %d guilds', len(bot.guilds))
+    logger.info('Serving %d users', sum(guild.member_count for guild in bot.guilds))
+    # Reconcile the guilds table with where the bot actually is, in one transaction
+    await asyncio.to_thread(bot.guild_registry.sync, bot.guilds)
+    
+    if "until ready" not in startup.phases:
+        startup.mark("until ready")
+        logger.info("Startup timings:\n%s", startup.report())
     
     # Set status
     await bot.change_presence(
@@ -513,69 +393,38 @@ async def on_ready():
 @bot.event
 async def on_guild_join(guild):
     """Bot joins a new server"""
-    logger.info(f"Joined new guild: {guild.name} ({guild.id})")
+    logger.info("Joined new guild: %s (%s)", guild.name, guild.id)
     
-    # Add guild to database
-    conn = db.get_connection()
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO guilds (id, name, created_at) VALUES (?, ?, ?)",
-             (guild.id, guild.name, datetime.utcnow().isoformat()))
-    conn.commit()
-    conn.close()
+    # Queue the guild row; a returning guild keeps its configured settings
+    bot.guild_registry.joined(guild)
     
     # Send welcome message
     for channel in guild.text_channels:
         if channel.permissions_for(guild.me).send_messages:
-            embed = discord.Embed(
-                title="🎉 Thanks for adding me!",
-                description=f"Hello **{guild.name}**! I'm a professional Discord bot with tons of features!",
-                color=0x2ecc71
-            )
-            embed.add_field(
-                name="🚀 Quick Start",
-                value="• Use `/help` to see all commands
-• Use `/setup` to configure me
-• Visit the web dashboard for advanced settings",
-                inline=False
-            )
-            embed.add_field(
-                name="✨ Key Features",
-                value="• Advanced Moderation
-• Music Player
-• Economy System
-• Leveling & XP
-• Ticket System
-• And much more!",
-                inline=False
-            )
-            embed.set_footer(text="Made with ❤️ for your server")
-            
-            await channel.send(embed=embed, view=MainMenuView())
+            embed = guild_join_embed(guild.name)
+            await channel.send(embed=embed, view=bot.main_menu_view)
             break
 
 @bot.event
 async def on_member_join(member):
     """Enhanced welcome system"""
+    bot.event_hub.publish(member.guild.id, "member_join", {"user_id": member.id, "name": str(member),
+                                                           "bot": member.bot})
     if member.bot:
         return
+    bot.analytics.record(member.guild.id, Activity.JOINS)
     
-    conn = db.get_connection()
-    c = conn.cursor()
-    
-    # Get guild settings
-    c.execute("SELECT welcome_channel, welcome_message, auto_role FROM guilds WHERE id = ?", (member.guild.id,))
-    settings = c.fetchone()
-    
-    # Add user to database
-    c.execute("INSERT OR REPLACE INTO users (user_id, guild_id, created_at) VALUES (?, ?, ?)",
-             (member.id, member.guild.id, datetime.utcnow().isoformat()))
-    conn.commit()
-    conn.close()
+    # Both run on worker threads, so a raid's joins never block the loop on sqlite
+    settings = await bot.guild_registry.fetch_settings(member.guild.id, "welcome_channel", "welcome_message",
+                                                       "auto_role")
+    await db.backend.reset_user(member.id, member.guild.id)
+    bot.member_stats.reset(member.guild.id, member.id)
     
     if not settings:
         return
     
-    welcome_channel_id, welcome_message, auto_role_id = settings
+    welcome_channel_id, welcome_message, auto_role_id = (settings["welcome_channel"], settings["welcome_message"],
+                                                         settings["auto_role"])
     
     # Send welcome message
     if welcome_channel_id:
@@ -600,7 +449,7 @@ async def on_member_join(member):
                 embed.add_field(name="Account Created", value=member.created_at.strftime("%B %d, %Y"), inline=True)
                 embed.set_footer(text=f"ID: {member.id}")
                 
-                await channel.send(embed=embed, view=QuickActionsView())
+                await channel.send(embed=embed, view=bot.quick_actions_view)
     
     # Auto-role assignment
     if auto_role_id:
@@ -609,70 +458,56 @@ async def on_member_join(member):
             try:
                 await member.add_roles(role, reason="Auto-role on join")
             except discord.Forbidden:
-                logger.warning(f"Cannot assign auto-role in {member.guild.name}: Missing permissions")
+                logger.warning("Cannot assign auto-role in %s: Missing permissions", member.guild.name)
+
+@bot.event
+async def on_member_remove(member):
+    if not member.bot:
+        bot.analytics.record(member.guild.id, Activity.LEAVES)
+    bot.event_hub.publish(member.guild.id, "member_leave", {"user_id": member.id, "name": str(member),
+                                                            "bot": member.bot})
+
+@bot.event
+async def on_command(ctx):
+    if ctx.guild:
+        bot.analytics.record(ctx.guild.id, Activity.COMMANDS)
 
 @bot.event
 async def on_message(message):
     """Enhanced message handling with XP and auto-moderation"""
     if message.author.bot:
+        if message.author == bot.user:
+            # Our own sends share the channel's rate limit with level-up announcements
+            bot.levelups.note_send(message.channel.id, message.id)
         return
     
-    # XP System
     if message.guild:
-        conn = db.get_connection()
-        c = conn.cursor()
-        
-        # Check if user can gain XP (cooldown system)
-        c.execute("SELECT last_message FROM users WHERE user_id = ? AND guild_id = ?", 
-                 (message.author.id, message.guild.id))
-        result = c.fetchone()
-        
-        can_gain_xp = True
-        if result and result[0]:
-            last_message = datetime.fromisoformat(result[0])
-            if (datetime.utcnow() - last_message).seconds < 60:  # 1 minute cooldown
-                can_gain_xp = False
-        
-        if can_gain_xp:
+        bot.analytics.record(message.guild.id, Activity.MESSAGES)
+    
+    # XP System (gated from the in-memory flags before any DB access)
+    if message.guild and bot.features.enabled(message.guild.id, Feature.LEVELING):
+        # Cooldown, XP and level come from the member stats store; bot.xp batches the writes
+        stats = bot.member_stats.guild(message.guild.id)
+        member = stats.get(message.author.id)
+        timestamp = datetime.utcnow().isoformat()
+        now = epoch(timestamp)
+        
+        if member is None or now - member.last_active >= XP_COOLDOWN:
             # Give random XP (15-25)
             xp_gain = random.randint(15, 25)
-            
-            c.execute("""
-                INSERT OR REPLACE INTO users 
-                (user_id, guild_id, xp, last_message, created_at) 
-                VALUES (?, ?, 
-                    COALESCE((SELECT xp FROM users WHERE user_id = ? AND guild_id = ?), 0) + ?, 
-                    ?, 
-                    COALESCE((SELECT created_at FROM users WHERE user_id = ? AND guild_id = ?), ?))
-            """, (message.author.id, message.guild.id, message.author.id, message.guild.id, 
-                 xp_gain, datetime.utcnow().isoformat(), message.author.id, message.guild.id, 
-                 datetime.utcnow().isoformat()))
+            logger.debug("XP +%d for %s in %s", xp_gain, message.author.id, message.guild.id,
+                         extra={"sample": "xp_gain", "guild_id": message.guild.id})
+            current_xp = stats.add_xp(message.author.id, xp_gain, now)
+            bot.xp.add(message.author.id, message.guild.id, xp_gain, timestamp)
             
             # Check for level up
-            c.execute("SELECT xp, level FROM users WHERE user_id = ? AND guild_id = ?", 
-                     (message.author.id, message.guild.id))
-            user_data = c.fetchone()
-            
-            if user_data:
-                current_xp, current_level = user_data
-                required_xp = 5 * (current_level ** 2) + 50 * current_level + 100
-                
-                if current_xp >= required_xp:
-                    new_level = current_level + 1
-                    c.execute("UPDATE users SET level = ? WHERE user_id = ? AND guild_id = ?",
-                             (new_level, message.author.id, message.guild.id))
-                    
-                    # Send level up message
-                    embed = discord.Embed(
-                        title="🎉 Level Up!",
-                        description=f"{message.author.mention} reached **Level {new_level}**!",
-                        color=0xf1c40f
-                    )
-                    embed.set_thumbnail(url=message.author.display_avatar.url)
-                    await message.channel.send(embed=embed)
-        
-        conn.commit()
-        conn.close()
+            current_level = member.level if member else 1
+            if current_xp >= required_xp(current_level):
+                new_level = current_level + 1
+                stats.upsert(message.author.id, level=new_level)
+                bot.xp.set_level(message.author.id, message.guild.id, new_level)
+                # Bursts in one channel are merged into a single embed
+                bot.levelups.announce(message.channel, message.author, new_level)
     
     await bot.process_commands(message)
 
@@ -680,65 +515,70 @@ async def on_message(message):
 @bot.hybrid_command(name="help")
 async def help_command(ctx):
     """Show the main help menu"""
-    embed = discord.Embed(
-        title="🤖 Professional Discord Bot",
-        description="A feature-rich bot with everything your server needs!",
-        color=0x3498db
-    )
-    embed.add_field(
-        name="🛡️ Moderation",
-        value="`/kick` `/ban` `/warn` `/mute` `/purge`",
-        inline=True
-    )
-    embed.add_field(
-        name="🎵 Music",
-        value="`/play` `/queue` `/skip` `/pause` `/volume`",
-        inline=True
-    )
-    embed.add_field(
-        name="💰 Economy",
-        value="`/balance` `/daily` `/shop` `/buy` `/pay`",
-        inline=True
-    )
-    embed.add_field(
-        name="📊 Leveling",
-        value="`/rank` `/leaderboard` `/setlevel`",
-        inline=True
-    )
-    embed.add_field(
-        name="🎫 Tickets",
-        value="`/ticket` `/close` `/add` `/remove`",
-        inline=True
-    )
-    embed.add_field(
-        name="⚙️ Admin",
-        value="`/setup` `/config` `/prefix` `/autorole`",
-        inline=True
-    )
-    embed.set_footer(text="Use the menu below for interactive help!")
-    
-    await ctx.send(embed=embed, view=MainMenuView())
+    await ctx.send(embed=HELP_EMBED, view=bot.main_menu_view)
 
 @bot.hybrid_command(name="setup")
 @commands.has_permissions(administrator=True)
 async def setup_server(ctx):
     """Quick server setup wizard"""
-    embed = discord.Embed(
-        title="⚙️ Server Setup",
-        description="Let's configure your server! Use the buttons below:",
-        color=0xe74c3c
-    )
-    embed.add_field(
-        name="📋 Setup Steps",
-        value="1. Set welcome channel
-2. Configure auto-role
-3. Set moderation log channel
-4. Enable features
-5. Customize prefix",
-        inline=False
-    )
+    await ctx.send(embed=SETUP_EMBED)
+
+@bot.hybrid_command(name="prefix")
+@commands.has_permissions(administrator=True)
+async def set_prefix(ctx, prefix: commands.Range[str, 1, 10]):
+    """Change the command prefix for this server"""
+    bot.guild_registry.update_settings(ctx.guild.id, prefix=prefix)
+    await ctx.send(f"✅ Prefix set to `{prefix}`")
+
+@bot.hybrid_command(name="autorole")
+@commands.has_permissions(administrator=True)
+async def set_autorole(ctx, role: Optional[discord.Role] = None):
+    """Set (or clear) the role given to new members"""
+    bot.guild_registry.update_settings(ctx.guild.id, auto_role=role.id if role else None)
+    await ctx.send(f"✅ Auto-role set to {role.mention}" if role else "✅ Auto-role cleared")
+
+@bot.hybrid_command(name="modlog")
+@commands.has_permissions(administrator=True)
+async def set_modlog_channel(ctx, channel: Optional[discord.TextChannel] = None):
+    """Set (or clear) the moderation log channel"""
+    bot.guild_registry.update_settings(ctx.guild.id, mod_log_channel=channel.id if channel else None)
+    bot.modlog_sender.set_channel(ctx.guild.id, channel.id if channel else None)
+    await ctx.send(f"✅ Moderation logs will go to {channel.mention}" if channel else "✅ Moderation log channel cleared")
+
+@bot.hybrid_command(name="levelupchannel")
+@commands.has_permissions(administrator=True)
+async def set_level_up_channel(ctx, channel: Optional[discord.TextChannel] = None):
+    """Send level-up announcements to one channel (or clear to announce where members chat)"""
+    bot.guild_registry.update_settings(ctx.guild.id, level_up_channel=channel.id if channel else None)
+    bot.levelups.set_channel(ctx.guild.id, channel.id if channel else None)
+    await ctx.send(f"✅ Level-ups will be announced in {channel.mention}" if channel else "✅ Level-ups will be announced where members chat")
+
+@bot.hybrid_command(name="retention")
+@commands.has_permissions(administrator=True)
+async def set_retention(ctx, table: str, days: commands.Range[int, 0, 3650], mode: str = "table"):
+    """Keep mod_logs, tickets or music_queue rows for N days (0 = forever), then archive to table/jsonl or delete"""
+    if table not in RETENTION_TABLES or mode not in RETENTION_MODES:
+        await ctx.send(f"❌ Table must be one of {', '.join(RETENTION_TABLES)}; mode one of {', '.join(RETENTION_MODES)}.",
+                       ephemeral=True)
+        return
+    await asyncio.to_thread(bot.retention.set_policy, ctx.guild.id, table, days, mode)
+    await ctx.send(f"✅ {table} rows are kept {f'for {days} days, then {mode}' if days else 'forever'}.")
+
+@bot.hybrid_command(name="feature")
+@commands.has_permissions(administrator=True)
+async def toggle_feature(ctx, feature: str, enabled: bool):
+    """Turn leveling, economy, auto_mod or music on or off for this server"""
+    try:
+        flag = Feature[feature.upper()]
+    except KeyError:
+        await ctx.send(f"❌ Unknown feature. Choose from: {', '.join(f.name.lower() for f in Feature)}", ephemeral=True)
+        return
     
-    await ctx.send(embed=embed)
+    if enabled:
+        await asyncio.to_thread(bot.features.set_many, [ctx.guild.id], enable=flag)
+    else:
+        await asyncio.to_thread(bot.features.set_many, [ctx.guild.id], disable=flag)
+    await ctx.send(f"✅ {flag.name.replace('_', ' ').title()} is now {'enabled' if enabled else 'disabled'}.")
 
 @bot.hybrid_command(name="stats")
 async def bot_stats(ctx):
@@ -794,8 +634,10 @@ async def on_command_error(ctx, error):
             color=0xe74c3c
         )
         await ctx.send(embed=embed)
+    elif isinstance(error, commands.CheckFailure):
+        await ctx.send(f"❌ {error}", ephemeral=True)
     else:
-        logger.error(f"Unhandled error: {error}")
+        logger.error("Unhandled error: %s", error)
         embed = discord.Embed(
             title="❌ An Error Occurred",
             description="Something went wrong. The error has been logged.",
@@ -816,4 +658,4 @@ if __name__ == "__main__":
     try:
         bot.run(token)
     except Exception as e:
-        logger.error(f"Failed to start bot: {e}")
+        logger.error("Failed to start bot: %s", e)
@@ -0,0 +1,256 @@
+"""Bulk import/export of member stats for guilds migrating from other bots
+
+    python bulk_io.py import members.csv [--guild ID] [--chunk 50000]
+    python bulk_io.py import members.jsonl --format jsonl
+    python bulk_io.py export GUILD_ID [--out members.csv] [--format csv|jsonl]
+
+Imports stream the file in chunks, upsert each chunk in one transaction with
+durability relaxed for the duration of the load, then recompute levels for the
+touched guilds in one transaction. Exports stream straight from a cursor.
+Run it while the bot is stopped: the relaxed PRAGMAs trade crash safety for speed.
+"""
+import argparse
+import csv
+import json
+import logging
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
+
+from core.leveling import level_for_xp
+from core.storage.base import UserRow
+from core.storage.sqlite import SQLiteBackend, UPDATED_NOW, USER_COLUMNS, create_tables
+
+logger = logging.getLogger("bulk_io")
+
+DEFAULT_DB = "discord_bot_pro.db"
+DEFAULT_CHUNK = 50000
+EXPORT_FIELDS = [c.strip() for c in USER_COLUMNS.split(",")]
+
+# Durability is restored before the tool exits; a crash mid-load means re-running the import
+LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+    "temp_store": "MEMORY",
+    "cache_size": "-262144",  # 256 MiB
+}
+
+
+class BadRow(ValueError):
+    """A source row that cannot be loaded"""
+
+
+def _int(record: dict, key: str, default: Optional[int] = None) -> Optional[int]:
+    value = record.get(key)
+    if value in (None, ""):
+        return default
+    return int(value)
+
+
+def parse_record(record: dict, guild_id: Optional[int], now: str) -> UserRow:
+    try:
+        return UserRow(
+            user_id=int(record["user_id"]),
+            guild_id=guild_id if guild_id is not None else int(record["guild_id"]),
+            xp=_int(record, "xp", 0),
+            # Imported levels are ignored and recomputed from xp after the load
+            level=1,
+            coins=_int(record, "coins", 100),
+            reputation=_int(record, "reputation", 0),
+            warnings=_int(record, "warnings", 0),
+            last_message=record.get("last_message") or None,
+            created_at=record.get("created_at") or now,
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise BadRow(f"bad row {record!r}: {e}") from e
+
+
+def decode_line(line: str) -> dict:
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise BadRow(f"bad line {line.strip()!r}: {e}") from e
+    if not isinstance(record, dict):
+        raise BadRow(f"bad line {line.strip()!r}: not a JSON object")
+    return record
+
+
+def read_records(path: str, fmt: str) -> Iterator:
+    """CSV rows as dicts, JSONL as raw lines; decoding is left to the caller so a bad line can be skipped"""
+    stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            yield from csv.DictReader(stream)
+        else:
+            for line in stream:
+                if line.strip():
+                    yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def chunks(rows: Iterable, size: int) -> Iterator[List]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.create_function("level_for_xp", 1, level_for_xp, deterministic=True)
+    return conn
+
+
+def relax(conn: sqlite3.Connection) -> dict:
+    previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in LOAD_PRAGMAS}
+    for name, value in LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return previous
+
+
+def restore(conn: sqlite3.Connection, previous: dict):
+    for name, value in previous.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def recompute_levels(conn: sqlite3.Connection, guild_ids: Iterable[int]) -> int:
+    """One UPDATE per guild; only rows whose level is actually stale are rewritten"""
+    updated = 0
+    conn.execute("BEGIN")
+    try:
+        for guild_id in guild_ids:
+            updated += conn.execute(
+                f"UPDATE users SET level = level_for_xp(xp), updated_at = {UPDATED_NOW} "
+                "WHERE guild_id = ? AND level != level_for_xp(xp)",
+                (guild_id,)
+            ).rowcount
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return updated
+
+
+def import_rows(db_path: str, path: str, fmt: str, guild_id: Optional[int], chunk_size: int,
+                skip_bad: bool) -> int:
+    now = datetime.utcnow().isoformat()
+    conn = connect(db_path)
+    create_tables(conn)
+    previous = relax(conn)
+    guilds = set()
+    loaded = skipped = 0
+    started = time.perf_counter()
+
+    def parsed():
+        nonlocal skipped
+        for record in read_records(path, fmt):
+            try:
+                if fmt != "csv":
+                    record = decode_line(record)
+                yield parse_record(record, guild_id, now)
+            except BadRow:
+                if not skip_bad:
+                    raise
+                skipped += 1
+
+    try:
+        for chunk in chunks(parsed(), chunk_size):
+            conn.execute("BEGIN")
+            try:
+                SQLiteBackend.upsert_users_sync(conn, chunk)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            guilds.update(row.guild_id for row in chunk)
+            loaded += len(chunk)
+            elapsed = time.perf_counter() - started
+            logger.info("%d rows loaded (%.0f rows/s)", loaded, loaded / elapsed if elapsed else 0)
+
+        level_started = time.perf_counter()
+        levels = recompute_levels(conn, sorted(guilds))
+        logger.info("Recomputed %d levels across %d guilds in %.2fs",
+                    levels, len(guilds), time.perf_counter() - level_started)
+    finally:
+        restore(conn, previous)
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info("Imported %d rows (%d skipped) in %.2fs: %.0f rows/s",
+                loaded, skipped, elapsed, loaded / elapsed if elapsed else 0)
+    return loaded
+
+
+def export_rows(db_path: str, guild_id: int, out: str, fmt: str) -> int:
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    stream = sys.stdout if out == "-" else open(out, "w", newline="", encoding="utf-8")
+    started = time.perf_counter()
+    written = 0
+    try:
+        # Iterating the cursor pulls rows from SQLite a page at a time
+        cursor = conn.execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE guild_id = ? ORDER BY user_id", (guild_id,)
+        )
+        if fmt == "csv":
+            writer = csv.writer(stream)
+            writer.writerow(EXPORT_FIELDS)
+            for row in cursor:
+                writer.writerow(row)
+                written += 1
+        else:
+            for row in cursor:
+                stream.write(json.dumps(dict(zip(EXPORT_FIELDS, row))))
+                stream.write("\n")
+                written += 1
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info("Exported %d rows in %.2fs: %.0f rows/s", written, elapsed, written / elapsed if elapsed else 0)
+    return written
+
+
+def _format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite database file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="load users rows from CSV or JSONL")
+    imp.add_argument("path", help="source file, or - for stdin")
+    imp.add_argument("--format", choices=["csv", "jsonl"])
+    imp.add_argument("--guild", type=int, help="load every row into this guild, ignoring guild_id in the file")
+    imp.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="rows per transaction")
+    imp.add_argument("--skip-bad", action="store_true", help="skip malformed rows instead of aborting")
+
+    exp = sub.add_parser("export", help="stream one guild's users rows")
+    exp.add_argument("guild_id", type=int)
+    exp.add_argument("--out", default="-", help="destination file, or - for stdout")
+    exp.add_argument("--format", choices=["csv", "jsonl"])
+
+    args = parser.parse_args(argv)
+    # Progress goes to stderr so exports can be piped
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.command == "import":
+        import_rows(args.db, args.path, _format(args.path, args.format), args.guild, args.chunk, args.skip_bad)
+    else:
+        export_rows(args.db, args.guild_id, args.out, _format(args.out, args.format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Bot extensions loaded by ProDiscordBot.setup_hook"""
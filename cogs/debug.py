@@ -0,0 +1,111 @@
+import asyncio
+import io
+import threading
+from datetime import datetime
+
+import discord
+from discord.ext import commands
+
+from core.maintenance import AUTO_VACUUM_INCREMENTAL
+from core.metrics import metrics
+from core.profiling import collapsed, hottest_frames, sample_stacks
+
+
+class Debug(commands.Cog):
+    """Owner-only diagnostics for a running shard"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._profiling = asyncio.Lock()
+
+    async def cog_check(self, ctx):
+        # owner_ids comes from config.owner_ids and follows live config reloads
+        if not await self.bot.is_owner(ctx.author):
+            raise commands.NotOwner("Only bot owners can use debug commands.")
+        return True
+
+    @commands.hybrid_group(name="debug")
+    async def debug(self, ctx):
+        """Diagnostics for bot owners"""
+        if ctx.invoked_subcommand is None:
+            await ctx.send("Subcommands: `profile`, `timings`, `timers`, `stalls`, `db`, `maintenance`", ephemeral=True)
+
+    @debug.command(name="profile")
+    async def profile(self, ctx, seconds: commands.Range[int, 1, 60] = 10):
+        """Sample the event loop thread and return a collapsed-stack file"""
+        if self._profiling.locked():
+            await ctx.send("❌ A profile is already running.", ephemeral=True)
+            return
+        async with self._profiling:
+            await ctx.defer(ephemeral=True)
+            # Commands run on the loop thread, which is the one worth sampling
+            stacks = await asyncio.to_thread(sample_stacks, threading.get_ident(), seconds)
+
+        samples = sum(stacks.values())
+        hottest = "\n".join(f"`{count:>5}` {frame}" for frame, count in hottest_frames(stacks)) or "No samples"
+        embed = discord.Embed(title="🔥 Profile", color=0xe67e22,
+                              description=f"{samples:,} samples over {seconds}s")
+        embed.add_field(name="Hottest frames", value=hottest[:1024], inline=False)
+        name = f"profile-{datetime.utcnow():%Y%m%d-%H%M%S}.collapsed"
+        await ctx.send(embed=embed, file=discord.File(io.BytesIO(collapsed(stacks).encode()), filename=name),
+                       ephemeral=True)
+
+    @debug.command(name="timings")
+    async def timings(self, ctx, prefix: str = ""):
+        """Slowest recorded handlers, commands and queries by p99"""
+        rows = metrics.slowest(prefix)
+        if not rows:
+            await ctx.send("No timings recorded. Turn them on with `debug timers on`.", ephemeral=True)
+            return
+        lines = [f"{name:<32} n={s['count']:<7} p50={s['p50_ms']:7.1f}ms p99={s['p99_ms']:7.1f}ms max={s['max_ms']:7.1f}ms"
+                 for name, s in rows]
+        await ctx.send("```\n" + "\n".join(lines)[:1900] + "\n```", ephemeral=True)
+
+    @debug.command(name="timers")
+    async def timers(self, ctx, enabled: bool):
+        """Switch handler, command and query timers on or off until the next restart"""
+        self.bot.profiler.enabled = enabled
+        self.bot.query_profiler.timing = enabled
+        await ctx.send(f"✅ Timers {'enabled' if enabled else 'disabled'}.", ephemeral=True)
+
+    @debug.command(name="stalls")
+    async def stalls(self, ctx):
+        """Recent event-loop stalls caught by the watchdog"""
+        stalls = list(self.bot.watchdog.stalls)[-5:]
+        if not stalls:
+            await ctx.send("✅ No event-loop stalls recorded.", ephemeral=True)
+            return
+        embed = discord.Embed(title="🐢 Event-loop stalls", color=0xe74c3c)
+        for stall in reversed(stalls):
+            # Innermost frames are the ones that blocked
+            frames = stall.stack.rstrip().splitlines()[-4:]
+            embed.add_field(name=f"{stall.duration * 1000:.0f}ms in {stall.task} at {stall.at[:19]}",
+                            value=("```\n" + "\n".join(frames) + "\n```")[:1024], inline=False)
+        await ctx.send(embed=embed, ephemeral=True)
+
+    @debug.command(name="db")
+    async def db(self, ctx):
+        """Database file size, fragmentation and backups"""
+        maintenance = self.bot.maintenance
+        stats = await asyncio.to_thread(maintenance.stats)
+        backups = await asyncio.to_thread(maintenance.backups)
+        embed = discord.Embed(title="🗄️ Database", color=0x3498db)
+        embed.add_field(name="Size", value=f"{stats.size_bytes / 1024 / 1024:.1f} MB", inline=True)
+        embed.add_field(name="Free pages", value=f"{stats.freelist_count:,} ({stats.fragmentation:.1%})", inline=True)
+        embed.add_field(name="Reclaimable", value=f"{stats.reclaimable_bytes / 1024 / 1024:.1f} MB", inline=True)
+        embed.add_field(name="Incremental vacuum", value="on" if stats.auto_vacuum == AUTO_VACUUM_INCREMENTAL else "off", inline=True)
+        embed.add_field(name="Last maintenance", value=maintenance.last_run or "never", inline=True)
+        embed.add_field(name="Backups", value="\n".join(f"`{path}`" for path in backups[:5]) or "none", inline=False)
+        await ctx.send(embed=embed, ephemeral=True)
+
+    @debug.command(name="maintenance")
+    async def maintenance(self, ctx):
+        """Back up, vacuum and optimize now instead of waiting for quiet hours"""
+        await ctx.defer(ephemeral=True)
+        stats = await self.bot.maintenance.run_now()
+        await ctx.send(f"✅ Maintenance done: {stats.size_bytes / 1024 / 1024:.1f} MB, "
+                       f"{stats.fragmentation:.1%} free pages.", ephemeral=True)
+
+
+async def setup(bot):
+    await bot.add_cog(Debug(bot))
@@ -0,0 +1,95 @@
+import io
+from typing import Literal, Optional
+
+import discord
+from discord.ext import commands
+
+from core.cards import LeaderboardRow, RendererUnavailable, level_progress
+from core.features import Feature, requires_feature
+
+LEADERBOARD_SIZE = 10
+Theme = Literal["dark", "light"]
+
+
+class Leveling(commands.Cog):
+    """Rank and leaderboard cards rendered by the bot's CardRenderer"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.hybrid_command(name="rank")
+    @commands.guild_only()
+    @requires_feature(Feature.LEVELING)
+    async def rank(self, ctx, member: Optional[discord.Member] = None, theme: Theme = "dark"):
+        """View your rank card"""
+        member = member or ctx.author
+        store = self.bot.member_stats
+        if store.loaded:
+            guild_stats = store.guild(ctx.guild.id)
+            user = guild_stats.get(member.id)
+            position = guild_stats.rank(member.id) if user else None
+        else:
+            backend = self.bot.db.backend
+            user = await backend.get_user(member.id, ctx.guild.id)
+            position = await backend.rank(member.id, ctx.guild.id) if user else None
+        if user is None:
+            await ctx.send(f"❌ {member.display_name} hasn't earned any XP yet.", ephemeral=True)
+            return
+
+        cards = self.bot.cards
+        if cards.available:
+            await ctx.defer()
+            try:
+                image = await cards.rank_card(member, user.xp, user.level, position, theme)
+            except RendererUnavailable:
+                pass
+            else:
+                await ctx.send(file=discord.File(io.BytesIO(image), filename="rank.png"))
+                return
+
+        into, span = level_progress(user.level, user.xp)
+        embed = discord.Embed(title=f"📊 {member.display_name}", color=0xbb8fce)
+        embed.set_thumbnail(url=member.display_avatar.url)
+        embed.add_field(name="Rank", value=f"#{position}", inline=True)
+        embed.add_field(name="Level", value=str(user.level), inline=True)
+        embed.add_field(name="XP", value=f"{into:,} / {span:,}", inline=True)
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="leaderboard")
+    @commands.guild_only()
+    @requires_feature(Feature.LEVELING)
+    async def leaderboard(self, ctx, theme: Theme = "dark"):
+        """Top server members"""
+        store = self.bot.member_stats
+        if store.loaded:
+            guild_stats = store.guild(ctx.guild.id)
+            users = [guild_stats.get(user_id) for user_id, _ in guild_stats.top(LEADERBOARD_SIZE)]
+        else:
+            users = await self.bot.db.backend.top_users(ctx.guild.id, LEADERBOARD_SIZE)
+        if not users:
+            await ctx.send("❌ Nobody has earned XP here yet.", ephemeral=True)
+            return
+        rows = []
+        for position, user in enumerate(users, start=1):
+            member = ctx.guild.get_member(user.user_id)
+            rows.append(LeaderboardRow(position, member.display_name if member else f"User {user.user_id}",
+                                       user.level, user.xp))
+
+        cards = self.bot.cards
+        if cards.available:
+            await ctx.defer()
+            try:
+                image = await cards.leaderboard(ctx.guild, rows, theme)
+            except RendererUnavailable:
+                pass
+            else:
+                await ctx.send(file=discord.File(io.BytesIO(image), filename="leaderboard.png"))
+                return
+
+        lines = [f"**#{row.rank}** {row.name} — Level {row.level} ({row.xp:,} XP)" for row in rows]
+        await ctx.send(embed=discord.Embed(title=f"🏆 {ctx.guild.name} Leaderboard",
+                                           description="\n".join(lines), color=0xbb8fce))
+
+
+async def setup(bot):
+    await bot.add_cog(Leveling(bot))
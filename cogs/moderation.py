@@ -0,0 +1,235 @@
+import asyncio
+import re
+from typing import List, Optional
+
+import discord
+from discord.ext import commands
+from discord.ui import View, Button
+
+from core.modlog import fetch_mod_logs, count_mod_logs
+
+PAGE_SIZE = 10
+MAX_PURGE = 1000
+USER_ID_RE = re.compile(r"\d{15,20}")
+
+
+class UserId(commands.Converter):
+    """A member mention or raw user ID, without an API lookup per ID (mass bans can list users not in the server)"""
+
+    async def convert(self, ctx, argument: str) -> int:
+        if not USER_ID_RE.fullmatch(argument.strip("<@!>")):
+            raise commands.BadArgument(f"{argument} is not a member mention or user ID")
+        return int(argument.strip("<@!>"))
+
+
+class ProgressReporter:
+    """Edits one status message as a long moderation job advances"""
+
+    def __init__(self, ctx, label: str):
+        self.ctx = ctx
+        self.label = label
+        self.message = None
+
+    async def start(self, total: int):
+        self.message = await self.ctx.send(f"⏳ {self.label}: 0/{total}")
+
+    async def __call__(self, done: int, total: int):
+        if self.message is not None:
+            await self.message.edit(content=f"⏳ {self.label}: {done}/{total}")
+
+    async def finish(self, text: str):
+        if self.message is not None:
+            await self.message.edit(content=text)
+        else:
+            await self.ctx.send(text)
+
+
+class WarningsPager(View):
+    """Walks a member's warnings with keyset pagination"""
+
+    def __init__(self, db, guild_id: int, member: discord.Member, total: int, pages):
+        super().__init__(timeout=120)
+        self.db = db
+        self.guild_id = guild_id
+        self.member = member
+        self.total = total
+        # Stack of cursors so "Newer" can step back without OFFSET scans
+        self.cursors = [None]
+        self.next_cursor = pages[1]
+        self.rows = pages[0]
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.newer.disabled = len(self.cursors) == 1
+        self.older.disabled = self.next_cursor is None
+
+    def build_embed(self) -> discord.Embed:
+        embed = discord.Embed(
+            title=f"⚠️ Warnings for {self.member.display_name}",
+            color=0xf39c12
+        )
+        if not self.rows:
+            embed.description = "This user has no warnings."
+            return embed
+        embed.description = "\n".join(
+            f"**#{row_id}** • <@{moderator_id}> • {timestamp[:10]}\n{reason or 'No reason provided'}"
+            for row_id, _, moderator_id, _, reason, _, timestamp in self.rows
+        )
+        embed.set_footer(text=f"Page {len(self.cursors)} • {self.total} warning(s) total")
+        return embed
+
+    async def _load(self, interaction: discord.Interaction, cursor: Optional[int]):
+        self.rows, self.next_cursor = await asyncio.to_thread(self._fetch, cursor)
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    def _fetch(self, cursor: Optional[int]):
+        conn = self.db.get_connection()
+        try:
+            return fetch_mod_logs(conn, self.guild_id, user_id=self.member.id, action="warn",
+                                  before_id=cursor, limit=PAGE_SIZE)
+        finally:
+            conn.close()
+
+    @discord.ui.button(label="◀ Newer", style=discord.ButtonStyle.secondary)
+    async def newer(self, interaction: discord.Interaction, button: Button):
+        self.cursors.pop()
+        await self._load(interaction, self.cursors[-1])
+
+    @discord.ui.button(label="Older ▶", style=discord.ButtonStyle.secondary)
+    async def older(self, interaction: discord.Interaction, button: Button):
+        self.cursors.append(self.next_cursor)
+        await self._load(interaction, self.next_cursor)
+
+
+class Moderation(commands.Cog):
+    """Moderation commands backed by the mod_logs audit trail"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.hybrid_command(name="warn")
+    @commands.has_permissions(moderate_members=True)
+    async def warn(self, ctx, member: discord.Member, *, reason: Optional[str] = None):
+        """Issue a warning to a member"""
+        self.bot.modlog.log(ctx.guild.id, member.id, ctx.author.id, "warn", reason)
+        self.bot.event_hub.publish(ctx.guild.id, "moderation", {"action": "warn", "user_id": member.id,
+                                                                "moderator_id": ctx.author.id, "reason": reason})
+        embed = discord.Embed(
+            title="⚠️ Warning Issued",
+            description=f"{member.mention} has been warned.",
+            color=0xf39c12
+        )
+        embed.add_field(name="Reason", value=reason or "No reason provided", inline=False)
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="warnings")
+    @commands.has_permissions(moderate_members=True)
+    async def warnings(self, ctx, member: discord.Member):
+        """View a member's warnings"""
+        # Pending warnings must be visible straight away
+        await self.bot.modlog.flush()
+        total, page = await asyncio.to_thread(self._first_page, ctx.guild.id, member.id)
+        view = WarningsPager(self.bot.db, ctx.guild.id, member, total, page)
+        await ctx.send(embed=view.build_embed(), view=view)
+
+    @commands.hybrid_command(name="purge")
+    @commands.has_permissions(manage_messages=True)
+    @commands.bot_has_permissions(manage_messages=True, read_message_history=True)
+    async def purge(self, ctx, amount: commands.Range[int, 1, MAX_PURGE], member: Optional[discord.Member] = None):
+        """Delete multiple messages, optionally only from one member"""
+        await ctx.defer(ephemeral=True)
+        reporter = ProgressReporter(ctx, "Deleting messages")
+        await reporter.start(amount)
+
+        def check(message):
+            # Keep our own progress message alive when invoked with a prefix
+            if message.id == reporter.message.id:
+                return False
+            return member is None or message.author.id == member.id
+
+        deleted = await self.bot.moderation.purge(
+            ctx.channel, amount, ctx.author.id, check=check,
+            reason=f"Purge by {ctx.author}", progress=reporter
+        )
+        await reporter.finish(f"🧹 Deleted {deleted} message(s).")
+
+    @commands.hybrid_command(name="kick")
+    @commands.has_permissions(kick_members=True)
+    @commands.bot_has_permissions(kick_members=True)
+    async def kick(self, ctx, members: commands.Greedy[UserId], *, reason: Optional[str] = None):
+        """Remove one or more members from the server"""
+        await self._bulk(ctx, "kick", members, reason)
+
+    @commands.hybrid_command(name="ban")
+    @commands.has_permissions(ban_members=True)
+    @commands.bot_has_permissions(ban_members=True)
+    async def ban(self, ctx, members: commands.Greedy[UserId], *, reason: Optional[str] = None):
+        """Permanently ban one or more users"""
+        await self._bulk(ctx, "ban", members, reason)
+
+    @commands.hybrid_command(name="mute")
+    @commands.has_permissions(moderate_members=True)
+    @commands.bot_has_permissions(moderate_members=True)
+    async def mute(self, ctx, members: commands.Greedy[UserId], minutes: commands.Range[int, 1, 40320] = 10, *,
+                   reason: Optional[str] = None):
+        """Temporarily mute one or more members"""
+        await self._bulk(ctx, "mute", members, reason, duration=minutes * 60)
+
+    @staticmethod
+    def _can_target(ctx, user_id: int) -> bool:
+        """Not the moderator, the bot or the owner, and below the moderator's top role unless they own the server"""
+        guild = ctx.guild
+        if user_id in (ctx.author.id, ctx.me.id, guild.owner_id):
+            return False
+        member = guild.get_member(user_id)
+        # Users who aren't in the server (ban by ID) have no roles to compare
+        if member is None or ctx.author.id == guild.owner_id:
+            return True
+        return member.top_role < ctx.author.top_role
+
+    async def _bulk(self, ctx, action: str, members: List[int], reason: Optional[str],
+                    duration: Optional[int] = None):
+        # Greedy: with a prefix every leading mention/ID is a target and the rest is the reason;
+        # the slash form takes them space-separated in one option
+        user_ids, skipped = [], []
+        for user_id in dict.fromkeys(members):
+            (user_ids if self._can_target(ctx, user_id) else skipped).append(user_id)
+        if not user_ids:
+            if skipped:
+                await ctx.send(f"❌ {action.title()}: {len(skipped)} failed — you can't {action} yourself, me, "
+                               "the owner or members with a role at or above yours.", ephemeral=True)
+            else:
+                await ctx.send("❌ Mention at least one member or give their IDs.", ephemeral=True)
+            return
+        await ctx.defer()
+        reporter = None
+        if len(user_ids) > 1:
+            reporter = ProgressReporter(ctx, f"Running {action}")
+            await reporter.start(len(user_ids))
+        result = await self.bot.moderation.run_bulk(
+            ctx.guild, action, user_ids, ctx.author.id,
+            reason=reason, duration=duration, progress=reporter
+        )
+        text = f"✅ {action.title()}: {len(result.succeeded)} succeeded"
+        if result.failed or skipped:
+            text += f", {len(result.failed) + len(skipped)} failed"
+        if skipped:
+            text += f" ({len(skipped)} outrank you or can't be targeted)"
+        if reporter is not None:
+            await reporter.finish(text)
+        else:
+            await ctx.send(text)
+
+    def _first_page(self, guild_id: int, user_id: int):
+        conn = self.bot.db.get_connection()
+        try:
+            total = count_mod_logs(conn, guild_id, user_id=user_id, action="warn")
+            page = fetch_mod_logs(conn, guild_id, user_id=user_id, action="warn", limit=PAGE_SIZE)
+        finally:
+            conn.close()
+        return total, page
+
+
+async def setup(bot):
+    await bot.add_cog(Moderation(bot))
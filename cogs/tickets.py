@@ -0,0 +1,62 @@
+import discord
+from discord.ext import commands
+
+from core.tickets import TicketQueueFull
+
+
+class Tickets(commands.Cog):
+    """Support tickets served from TicketService's in-memory index"""
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.hybrid_command(name="ticket")
+    @commands.guild_only()
+    async def ticket(self, ctx):
+        """Open a private support ticket"""
+        tickets = self.bot.tickets
+        existing = tickets.get_open(ctx.guild.id, ctx.author.id)
+        if existing:
+            await ctx.send(f"❌ You already have an open ticket: <#{existing.channel_id}>", ephemeral=True)
+            return
+
+        await ctx.defer(ephemeral=True)
+        try:
+            ticket, created = await tickets.open_ticket(ctx.guild, ctx.author)
+        except TicketQueueFull:
+            await ctx.send("⏳ Lots of tickets are being opened right now, please try again in a minute.",
+                           ephemeral=True)
+            return
+
+        if not created:
+            await ctx.send(f"❌ You already have an open ticket: <#{ticket.channel_id}>", ephemeral=True)
+            return
+        embed = discord.Embed(
+            title="🎫 Ticket Created",
+            description=f"Your support ticket has been created: <#{ticket.channel_id}>",
+            color=0x2ecc71
+        )
+        await ctx.send(embed=embed, ephemeral=True)
+
+    @commands.hybrid_command(name="close")
+    @commands.guild_only()
+    async def close(self, ctx):
+        """Close the ticket this channel belongs to"""
+        ticket = self.bot.tickets.get_by_channel(ctx.channel.id)
+        if ticket is None:
+            await ctx.send("❌ This isn't a ticket channel.", ephemeral=True)
+            return
+        if ctx.author.id != ticket.user_id and not ctx.channel.permissions_for(ctx.author).manage_channels:
+            await ctx.send("❌ Only the ticket owner or staff can close this ticket.", ephemeral=True)
+            return
+
+        await self.bot.tickets.close_ticket(ticket)
+        await ctx.send("🔒 Ticket closed, this channel will be deleted.")
+        try:
+            await ctx.channel.delete(reason=f"Ticket closed by {ctx.author}")
+        except discord.HTTPException:
+            pass
+
+
+async def setup(bot):
+    await bot.add_cog(Tickets(bot))
@@ -0,0 +1,166 @@
+"""Per-guild activity counters: in-memory minute buckets flushed into hourly and daily rollup tables"""
+import asyncio
+import enum
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Minutes kept in memory after they are flushed, for live minute-resolution charts
+RECENT_MINUTES = 60
+HOURLY_RETENTION_DAYS = 90
+
+
+class Activity(enum.IntEnum):
+    MESSAGES = 0
+    JOINS = 1
+    LEAVES = 2
+    COMMANDS = 3
+
+
+COLUMNS = tuple(kind.name.lower() for kind in Activity)
+GRANULARITIES = {
+    # granularity -> (table, bucket column, strftime format of the bucket)
+    "hour": ("activity_hourly", "hour", "%Y-%m-%dT%H"),
+    "day": ("activity_daily", "day", "%Y-%m-%d"),
+}
+
+
+def create_tables(cursor):
+    for table, column, _ in GRANULARITIES.values():
+        counters = ", ".join(f"{name} INTEGER DEFAULT 0" for name in COLUMNS)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                guild_id INTEGER,
+                {column} TEXT,
+                {counters},
+                PRIMARY KEY (guild_id, {column})
+            ) WITHOUT ROWID
+        """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_activity_hourly_hour ON activity_hourly (hour)")
+
+
+def _upsert_sql(table: str, column: str) -> str:
+    return (f"INSERT INTO {table} (guild_id, {column}, {', '.join(COLUMNS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(COLUMNS))}) "
+            f"ON CONFLICT(guild_id, {column}) DO UPDATE SET "
+            + ", ".join(f"{name} = {name} + excluded.{name}" for name in COLUMNS))
+
+
+def fetch_activity(conn, guild_id: int, granularity: str = "hour", days: int = 30,
+                   now: Optional[datetime] = None) -> List[tuple]:
+    """(bucket, messages, joins, leaves, commands) rows for the last ``days``, oldest first"""
+    table, column, fmt = GRANULARITIES[granularity]
+    since = ((now or datetime.utcnow()) - timedelta(days=days)).strftime(fmt)
+    return conn.execute(
+        f"SELECT {column}, {', '.join(COLUMNS)} FROM {table} WHERE guild_id = ? AND {column} >= ? ORDER BY {column}",
+        (guild_id, since)
+    ).fetchall()
+
+
+class ActivityRecorder:
+    """Counts events per guild and minute on the loop; a background flush adds finished minutes to the rollups"""
+
+    def __init__(self, db, interval: float = 60.0):
+        self.db = db
+        self.interval = interval
+        # minute (epoch // 60) -> guild id -> counts indexed by Activity
+        self._minutes: Dict[int, Dict[int, List[int]]] = {}
+        # Minutes up to and including this one are in the rollup tables
+        self._flushed = int(time.time()) // 60 - 1
+        self._pruned_day: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def record(self, guild_id: int, kind: Activity, count: int = 1):
+        minute = int(time.time()) // 60
+        guilds = self._minutes.get(minute)
+        if guilds is None:
+            guilds = self._minutes[minute] = {}
+        counts = guilds.get(guild_id)
+        if counts is None:
+            counts = guilds[guild_id] = [0] * len(Activity)
+        counts[kind] += count
+
+    def recent(self, guild_id: int, minutes: int = RECENT_MINUTES) -> List[Tuple[str, ...]]:
+        """Minute buckets still in memory, oldest first, in the same shape as fetch_activity
+
+        Safe to call from the web server thread: it only reads copies of the keys.
+        """
+        start = int(time.time()) // 60 - minutes
+        rows = []
+        for minute in sorted(m for m in list(self._minutes) if m > start):
+            counts = self._minutes.get(minute, {}).get(guild_id)
+            if counts:
+                rows.append((datetime.utcfromtimestamp(minute * 60).strftime("%Y-%m-%dT%H:%M"), *counts))
+        return rows
+
+    def _collect(self, upto: int) -> Dict[str, Dict[Tuple[int, str], List[int]]]:
+        """Sum minutes in (flushed, upto] into hour and day buckets"""
+        rollups: Dict[str, Dict[Tuple[int, str], List[int]]] = {granularity: {} for granularity in GRANULARITIES}
+        for minute in sorted(m for m in self._minutes if self._flushed < m <= upto):
+            at = datetime.utcfromtimestamp(minute * 60)
+            for granularity, (_, _, fmt) in GRANULARITIES.items():
+                bucket = at.strftime(fmt)
+                target = rollups[granularity]
+                for guild_id, counts in self._minutes[minute].items():
+                    totals = target.get((guild_id, bucket))
+                    if totals is None:
+                        target[(guild_id, bucket)] = list(counts)
+                    else:
+                        for i, value in enumerate(counts):
+                            totals[i] += value
+        return rollups
+
+    def _write(self, rollups: Dict[str, Dict[Tuple[int, str], List[int]]], prune_before: Optional[str]):
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                for granularity, buckets in rollups.items():
+                    table, column, _ = GRANULARITIES[granularity]
+                    conn.executemany(_upsert_sql(table, column),
+                                     [(guild_id, bucket, *counts) for (guild_id, bucket), counts in buckets.items()])
+                if prune_before is not None:
+                    conn.execute("DELETE FROM activity_hourly WHERE hour < ?", (prune_before,))
+        finally:
+            conn.close()
+
+    async def flush(self, everything: bool = False):
+        """Write finished minutes (every minute when ``everything``, e.g. at shutdown)"""
+        async with self._flush_lock:
+            current = int(time.time()) // 60
+            upto = current if everything else current - 1
+            if upto <= self._flushed:
+                return
+            rollups = self._collect(upto)
+            today = datetime.utcnow().strftime("%Y-%m-%d")
+            prune_before = None
+            if self._pruned_day != today:
+                prune_before = (datetime.utcnow() - timedelta(days=HOURLY_RETENTION_DAYS)).strftime("%Y-%m-%dT%H")
+            if any(rollups.values()) or prune_before:
+                await asyncio.to_thread(self._write, rollups, prune_before)
+            # Only advance once written; a failed flush is retried with the same minutes
+            self._flushed = upto
+            self._pruned_day = today
+            for minute in [m for m in self._minutes if m <= upto and m <= current - RECENT_MINUTES]:
+                del self._minutes[minute]
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush activity counters")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush(everything=True)
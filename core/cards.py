@@ -0,0 +1,291 @@
+"""Rank and leaderboard card rendering off the event loop, with avatar and card caches
+
+Pillow is optional: without it ``CardRenderer.available`` is False and the
+leveling cog falls back to embeds. The same happens for the rest of the
+process if a worker dies, since the pool is only ever forked at startup. Rendering functions run in worker processes,
+so they only take and return plain data (names, numbers, PNG bytes).
+"""
+import asyncio
+import importlib.util
+import io
+import logging
+import multiprocessing
+import os
+import signal
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from core.leveling import required_xp
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+THEMES = {
+    "dark": {"background": (35, 39, 42), "panel": (44, 47, 51), "text": (255, 255, 255),
+             "muted": (153, 170, 181), "accent": (187, 143, 206), "track": (72, 75, 78)},
+    "light": {"background": (242, 243, 245), "panel": (255, 255, 255), "text": (35, 39, 42),
+              "muted": (116, 127, 141), "accent": (88, 101, 242), "track": (220, 221, 222)},
+}
+DEFAULT_THEME = "dark"
+
+# Cards are reused until the member crosses into the next bucket of XP
+XP_BUCKET = 50
+AVATAR_SIZE = 128
+FONT_PATHS = ("DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "Arial Bold.ttf")
+
+
+class RankCard(NamedTuple):
+    name: str
+    level: int
+    xp: int
+    rank: int
+    theme: str = DEFAULT_THEME
+
+
+class LeaderboardRow(NamedTuple):
+    rank: int
+    name: str
+    level: int
+    xp: int
+
+
+def level_progress(level: int, xp: int) -> Tuple[int, int]:
+    """(xp into the current level, xp the level spans)"""
+    floor = required_xp(level - 1) if level > 1 else 0
+    return max(0, xp - floor), required_xp(level) - floor
+
+
+# ---- Worker-side rendering (runs in the pool) ----
+
+_fonts: Dict[int, object] = {}
+
+
+def _init_worker():
+    # Workers are forked from the bot: drop its log handlers and leave Ctrl+C to the parent
+    logging.getLogger().handlers.clear()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _font(size: int):
+    font = _fonts.get(size)
+    if font is None:
+        from PIL import ImageFont
+        for path in FONT_PATHS:
+            try:
+                font = ImageFont.truetype(path, size)
+                break
+            except OSError:
+                continue
+        else:
+            font = ImageFont.load_default(size)
+        _fonts[size] = font
+    return font
+
+
+def _png(image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=False, compress_level=1)
+    return buffer.getvalue()
+
+
+def _short(number: int) -> str:
+    if number >= 1_000_000:
+        return f"{number / 1_000_000:.1f}M"
+    if number >= 1_000:
+        return f"{number / 1_000:.1f}K"
+    return str(number)
+
+
+def _fit(text: str, font, width: int) -> str:
+    """Trim text with an ellipsis until it fits in ``width`` pixels"""
+    if font.getlength(text) <= width:
+        return text
+    while text and font.getlength(text + "…") > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def render_rank_card(card: RankCard, avatar: Optional[bytes]) -> bytes:
+    from PIL import Image, ImageDraw
+
+    colors = THEMES.get(card.theme, THEMES[DEFAULT_THEME])
+    image = Image.new("RGB", (934, 282), colors["background"])
+    draw = ImageDraw.Draw(image)
+    draw.rounded_rectangle((20, 20, 914, 262), radius=24, fill=colors["panel"])
+
+    size = 180
+    if avatar:
+        picture = Image.open(io.BytesIO(avatar)).convert("RGB").resize((size, size))
+        mask = Image.new("L", (size, size), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+        image.paste(picture, (50, 51), mask)
+    else:
+        draw.ellipse((50, 51, 50 + size, 51 + size), fill=colors["track"])
+
+    draw.text((270, 60), _fit(card.name, _font(40), 610), font=_font(40), fill=colors["text"])
+    draw.text((270, 150), f"RANK #{card.rank}   LEVEL {card.level}", font=_font(28),
+              fill=colors["accent"], anchor="ls")
+
+    into, span = level_progress(card.level, card.xp)
+    draw.text((880, 150), f"{_short(into)} / {_short(span)} XP", font=_font(24),
+              fill=colors["muted"], anchor="rs")
+    bar = (270, 190, 880, 226)
+    draw.rounded_rectangle(bar, radius=18, fill=colors["track"])
+    filled = bar[0] + int((bar[2] - bar[0]) * min(1.0, into / span))
+    if filled > bar[0] + 36:
+        draw.rounded_rectangle((bar[0], bar[1], filled, bar[3]), radius=18, fill=colors["accent"])
+    return _png(image)
+
+
+def render_leaderboard(title: str, rows: Sequence[LeaderboardRow], theme: str = DEFAULT_THEME) -> bytes:
+    from PIL import Image, ImageDraw
+
+    colors = THEMES.get(theme, THEMES[DEFAULT_THEME])
+    row_height = 56
+    image = Image.new("RGB", (720, 90 + row_height * max(1, len(rows))), colors["background"])
+    draw = ImageDraw.Draw(image)
+    draw.text((30, 28), _fit(title, _font(32), 660), font=_font(32), fill=colors["text"])
+    for i, row in enumerate(rows):
+        top = 80 + i * row_height
+        if i % 2 == 0:
+            draw.rounded_rectangle((20, top, 700, top + row_height - 6), radius=12, fill=colors["panel"])
+        middle = top + (row_height - 6) // 2
+        draw.text((40, middle), f"#{row.rank}", font=_font(24), fill=colors["accent"], anchor="lm")
+        draw.text((120, middle), _fit(row.name, _font(24), 330), font=_font(24), fill=colors["text"], anchor="lm")
+        draw.text((680, middle), f"LVL {row.level}  ·  {_short(row.xp)} XP", font=_font(20),
+                  fill=colors["muted"], anchor="rm")
+    return _png(image)
+
+
+# ---- Loop-side service ----
+
+class LRUCache:
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value: bytes):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class RendererUnavailable(RuntimeError):
+    pass
+
+
+class CardRenderer:
+    """Renders in a process pool; identical concurrent requests share one render"""
+
+    def __init__(self, workers: Optional[int] = None, avatar_cache_size: int = 2048, card_cache_size: int = 1024):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.avatars = LRUCache(avatar_cache_size)
+        self.cards = LRUCache(card_cache_size)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self.available = importlib.util.find_spec("PIL") is not None
+
+    def start(self):
+        """Fork the workers (blocking); call before the first thread starts so no child inherits a held lock"""
+        if self._pool is None and self.available:
+            # Imported before forking, so workers never take the import lock themselves
+            from PIL import Image, ImageDraw, ImageFont  # noqa: F401
+            self._pool = self._new_pool()
+            # Submitting once makes the executor spawn its workers now rather than on the first /rank
+            self._pool.submit(int).result()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # fork keeps workers from re-importing the bot's entry module, which has side effects at import time
+        context = multiprocessing.get_context("fork" if os.name == "posix" else None)
+        return ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker)
+
+    def _disable(self, broken: ProcessPoolExecutor):
+        """Retire a pool whose worker died and serve embeds from then on
+
+        Forking a replacement now would copy the loop's threads mid-flight, so there is no restart.
+        """
+        if self._pool is broken and broken is not None:
+            logger.error("A card worker died; falling back to embeds until the bot restarts")
+            metrics.incr("cards.disabled")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self.available = False
+
+    async def _avatar(self, asset) -> Optional[bytes]:
+        if asset is None:
+            return None
+        key = (asset.key, AVATAR_SIZE)
+        data = self.avatars.get(key)
+        if data is None:
+            metrics.incr("cards.avatar_miss")
+            try:
+                data = await asset.replace(size=AVATAR_SIZE, format="png").read()
+            except Exception as e:
+                logger.warning("Could not fetch avatar %s: %s", asset.key, e)
+                return None
+            self.avatars.put(key, data)
+        return data
+
+    async def _render(self, key: Hashable, fn, *args) -> bytes:
+        cached = self.cards.get(key)
+        if cached is not None:
+            metrics.incr("cards.hit")
+            return cached
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        if self._pool is None:
+            raise RendererUnavailable("CardRenderer.start() has not been called, Pillow is missing or a worker died")
+        metrics.incr("cards.miss")
+        future = asyncio.ensure_future(self._submit(fn, *args))
+        self._pending[key] = future
+        try:
+            with metrics.timer("cards.render"):
+                data = await future
+        finally:
+            self._pending.pop(key, None)
+        self.cards.put(key, data)
+        return data
+
+    async def _submit(self, fn, *args) -> bytes:
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool as e:
+            # A crashed worker breaks the whole executor
+            self._disable(pool)
+            raise RendererUnavailable("a card worker died") from e
+
+    async def rank_card(self, member, xp: int, level: int, rank: int, theme: str = DEFAULT_THEME) -> bytes:
+        asset = member.display_avatar
+        key = ("rank", member.guild.id, member.id, xp // XP_BUCKET, level, rank, theme, asset.key)
+        cached = self.cards.get(key)
+        if cached is not None:
+            metrics.incr("cards.hit")
+            return cached
+        card = RankCard(member.display_name, level, xp, rank, theme)
+        return await self._render(key, render_rank_card, card, await self._avatar(asset))
+
+    async def leaderboard(self, guild, rows: List[LeaderboardRow], theme: str = DEFAULT_THEME) -> bytes:
+        key = ("leaderboard", guild.id, theme, tuple((row.rank, row.name, row.level, row.xp // XP_BUCKET)
+                                                     for row in rows))
+        return await self._render(key, render_leaderboard, f"{guild.name} leaderboard", rows, theme)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,226 @@
+"""Typed bot configuration that can be reloaded from disk while the bot runs"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = "config/config.json"
+
+
+class ConfigError(ValueError):
+    """Raised when config.json holds a value of the wrong type or range"""
+
+
+class Field(NamedTuple):
+    name: str
+    kind: str
+    default: Any
+    choices: Tuple = ()
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+
+FIELDS: Tuple[Field, ...] = (
+    Field("prefix", "str", "!"),
+    Field("version", "str", "2.0.0"),
+    Field("description", "str", "Professional Discord Bot - Like MEE6 but Better!"),
+    Field("owner_ids", "int_list", []),
+    Field("enabled_cogs", "str_list", ["moderation", "music", "economy", "leveling", "tickets", "debug"]),
+    Field("log_level", "str", "INFO", choices=("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")),
+    Field("log_json", "bool", False),
+    Field("modlog_flush_interval", "float", 2.0, minimum=0.1),
+    Field("modlog_batch_size", "int", 500, minimum=1),
+    Field("xp_flush_interval", "float", 5.0, minimum=0.1),
+    Field("ticket_queue_size", "int", 25, minimum=1),
+    Field("config_poll_interval", "float", 2.0, minimum=0.1),
+    Field("profiling_enabled", "bool", False),
+    Field("slow_query_ms", "float", 100.0, minimum=0),
+    Field("watchdog_threshold_ms", "float", 250.0, minimum=0),
+    Field("snapshot_path", "str", "bot_state.snapshot"),
+    Field("snapshot_interval", "float", 300.0, minimum=0),
+    Field("shutdown_deadline", "float", 30.0, minimum=1),
+    Field("backup_dir", "str", "backups"),
+    Field("backup_keep", "int", 7, minimum=1),
+    Field("maintenance_start_hour", "int", 3, minimum=0, maximum=23),
+    Field("maintenance_end_hour", "int", 6, minimum=0, maximum=23),
+    Field("archive_dir", "str", "archive"),
+    Field("retention_interval", "float", 3600.0, minimum=0),
+    # Interface the dashboard binds to; anything but loopback also needs API_TOKEN set
+    Field("api_host", "str", "127.0.0.1"),
+    Field("api_cache_ttl", "float", 5.0, minimum=0),
+    Field("api_readers", "int", 4, minimum=1),
+    Field("event_buffer", "int", 100, minimum=1),
+    Field("event_keepalive", "float", 15.0, minimum=1),
+    Field("event_max_subscribers", "int", 500, minimum=1),
+    # Loopback UDP port bot.py relays live events to the dashboard on; 0 turns the relay off
+    Field("event_relay_port", "int", 10001, minimum=0, maximum=65535),
+)
+FIELDS_BY_NAME = {field.name: field for field in FIELDS}
+
+
+def _coerce(field: Field, value):
+    kind = field.kind
+    if kind == "str":
+        if not isinstance(value, str):
+            raise ConfigError(f"{field.name} must be a string")
+    elif kind == "bool":
+        if not isinstance(value, bool):
+            raise ConfigError(f"{field.name} must be true or false")
+    elif kind == "int":
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ConfigError(f"{field.name} must be an integer")
+    elif kind == "float":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ConfigError(f"{field.name} must be a number")
+        value = float(value)
+    elif kind == "int_list":
+        if not isinstance(value, list):
+            raise ConfigError(f"{field.name} must be a list of IDs")
+        try:
+            value = [int(item) for item in value]
+        except (TypeError, ValueError):
+            raise ConfigError(f"{field.name} must be a list of IDs") from None
+    elif kind == "str_list":
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ConfigError(f"{field.name} must be a list of strings")
+        value = list(value)
+
+    if field.choices and value not in field.choices:
+        raise ConfigError(f"{field.name} must be one of {', '.join(field.choices)}")
+    if field.minimum is not None and value < field.minimum:
+        raise ConfigError(f"{field.name} must be at least {field.minimum}")
+    if field.maximum is not None and value > field.maximum:
+        raise ConfigError(f"{field.name} must be at most {field.maximum}")
+    return value
+
+
+class Settings:
+    """Immutable snapshot of every config field"""
+
+    __slots__ = tuple(field.name for field in FIELDS)
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None):
+        values = values or {}
+        for field in FIELDS:
+            value = values[field.name] if field.name in values else field.default
+            object.__setattr__(self, field.name, list(value) if isinstance(value, list) else value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings are read-only; edit config.json or use BotConfig.update()")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def parse(cls, raw: Dict[str, Any]) -> "Settings":
+        values = {}
+        for key, value in raw.items():
+            field = FIELDS_BY_NAME.get(key)
+            if field is None:
+                logger.warning("Ignoring unknown config key %r", key)
+                continue
+            values[key] = _coerce(field, value)
+        return cls(values)
+
+
+ChangeListener = Callable[[Settings, Settings, Set[str]], None]
+
+
+class BotConfig:
+    """Current settings plus file watching; readers see one snapshot swapped atomically"""
+
+    __slots__ = ("path", "_settings", "_listeners", "_stat", "_watch_task")
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self._settings = Settings()
+        self._listeners: List[ChangeListener] = []
+        self._stat = None
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def __getattr__(self, name):
+        # Only reached for names that aren't slots, i.e. setting lookups
+        return getattr(self._settings, name)
+
+    @property
+    def settings(self) -> Settings:
+        return self._settings
+
+    def load_config(self):
+        try:
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+            self._stat = self._file_stat()
+        except FileNotFoundError:
+            self.save_config()
+            return
+        if not isinstance(raw, dict):
+            raise ConfigError(f"{self.path} must contain a JSON object")
+        self._swap(Settings.parse(raw))
+
+    def save_config(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._settings.to_dict(), f, indent=4)
+        os.replace(tmp_path, self.path)
+        self._stat = self._file_stat()
+
+    def update(self, **changes):
+        """Validate, apply and persist a set of changes"""
+        values = self._settings.to_dict()
+        for key, value in changes.items():
+            field = FIELDS_BY_NAME.get(key)
+            if field is None:
+                raise ConfigError(f"Unknown config key {key!r}")
+            values[key] = _coerce(field, value)
+        self._swap(Settings(values))
+        self.save_config()
+
+    def on_change(self, listener: ChangeListener):
+        self._listeners.append(listener)
+
+    def _swap(self, new: Settings):
+        old = self._settings
+        changed = {name for name in Settings.__slots__ if getattr(old, name) != getattr(new, name)}
+        self._settings = new
+        if not changed:
+            return
+        logger.info("Config changed: %s", ", ".join(sorted(changed)))
+        for listener in self._listeners:
+            try:
+                listener(old, new, changed)
+            except Exception:
+                logger.exception("Config listener failed")
+
+    def _file_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start_watching(self):
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    def stop_watching(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _watch(self):
+        # Polling a single stat() is cheap and works on every filesystem
+        while True:
+            await asyncio.sleep(self._settings.config_poll_interval)
+            stat = self._file_stat()
+            if stat is None or stat == self._stat:
+                continue
+            try:
+                self.load_config()
+            except (ConfigError, ValueError) as e:
+                self._stat = stat
+                logger.error("Keeping previous config, %s is invalid: %s", self.path, e)
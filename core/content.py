@@ -0,0 +1,206 @@
+"""Static help and menu content, declared once as data and rendered once at import"""
+from typing import Dict, NamedTuple, Tuple
+
+import discord
+
+
+class Section(NamedTuple):
+    key: str
+    label: str
+    emoji: str
+    summary: str
+    title: str
+    description: str
+    color: int
+    fields: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    commands: str = ""
+
+
+SECTIONS: Tuple[Section, ...] = (
+    Section(
+        "moderation", "Moderation", "🛡️", "Kick, ban, warn, and more",
+        "🛡️ Moderation System", "Professional moderation tools at your fingertips!", 0xff6b6b,
+        (
+            ("Commands", (
+                "`/kick` - Remove member from server",
+                "`/ban` - Permanently ban member",
+                "`/warn` - Issue warning",
+                "`/mute` - Temporarily mute member",
+                "`/purge` - Delete multiple messages",
+                "`/warnings` - View user warnings",
+            )),
+            ("Auto-Moderation", (
+                "Spam protection",
+                "Link filtering",
+                "Bad word detection",
+                "Raid protection",
+            )),
+        ),
+        "`/kick` `/ban` `/warn` `/mute` `/purge`",
+    ),
+    Section(
+        "music", "Music", "🎵", "Play music in voice channels",
+        "🎵 Music System", "High-quality music streaming for your server!", 0x4ecdc4,
+        (
+            ("Commands", (
+                "`/play` - Play a song",
+                "`/queue` - View music queue",
+                "`/skip` - Skip current song",
+                "`/pause/resume` - Control playback",
+                "`/volume` - Adjust volume",
+                "`/lyrics` - Get song lyrics",
+            )),
+        ),
+        "`/play` `/queue` `/skip` `/pause` `/volume`",
+    ),
+    Section(
+        "economy", "Economy", "💰", "Coins, shop, and inventory",
+        "💰 Economy System", "Virtual currency and shop system!", 0xf7dc6f,
+        (
+            ("Commands", (
+                "`/balance` - Check your coins",
+                "`/daily` - Claim daily reward",
+                "`/shop` - Browse server shop",
+                "`/buy` - Purchase items",
+                "`/inventory` - View your items",
+                "`/pay` - Transfer coins",
+            )),
+        ),
+        "`/balance` `/daily` `/shop` `/buy` `/pay`",
+    ),
+    Section(
+        "leveling", "Leveling", "📊", "XP system and leaderboards",
+        "📊 Leveling System", "XP and ranking system to keep members engaged!", 0xbb8fce,
+        (
+            ("Commands", (
+                "`/rank` - View your rank card",
+                "`/leaderboard` - Top server members",
+                "`/setlevel` - Set user level (mods)",
+                "`/rewards` - Level rewards",
+            )),
+        ),
+        "`/rank` `/leaderboard` `/setlevel`",
+    ),
+    Section(
+        "tickets", "Tickets", "🎫", "Support ticket system",
+        "🎫 Ticket System", "Professional support ticket system!", 0x85c1e9,
+        (
+            ("Features", (
+                "Create private support channels",
+                "Automatic ticket logging",
+                "Customizable categories",
+                "Staff management tools",
+            )),
+        ),
+        "`/ticket` `/close` `/add` `/remove`",
+    ),
+    Section(
+        "settings", "Settings", "⚙️", "Configure server settings",
+        "⚙️ Server Settings", "Configure all bot features for your server!", 0xa6acaf,
+        (
+            ("Configuration", (
+                "Welcome/goodbye messages",
+                "Auto-roles",
+                "Moderation settings",
+                "Feature toggles",
+                "Prefix customization",
+            )),
+        ),
+    ),
+)
+
+ADMIN_COMMANDS = "`/setup` `/config` `/prefix` `/autorole`"
+
+GUILD_JOIN_QUICK_START = (
+    "Use `/help` to see all commands",
+    "Use `/setup` to configure me",
+    "Visit the web dashboard for advanced settings",
+)
+GUILD_JOIN_FEATURES = (
+    "Advanced Moderation",
+    "Music Player",
+    "Economy System",
+    "Leveling & XP",
+    "Ticket System",
+    "And much more!",
+)
+SETUP_STEPS = (
+    "Set welcome channel",
+    "Configure auto-role",
+    "Set moderation log channel",
+    "Enable features",
+    "Customize prefix",
+)
+
+
+class StaticEmbed(discord.Embed):
+    """Embed that is never mutated after build, so its payload is serialized once"""
+
+    _payload = None
+
+    def to_dict(self):
+        if self._payload is None:
+            self._payload = super().to_dict()
+        return self._payload
+
+
+def _bullets(lines) -> str:
+    return "\n".join(f"• {line}" for line in lines)
+
+
+def _section_embed(section: Section) -> StaticEmbed:
+    embed = StaticEmbed(title=section.title, description=section.description, color=section.color)
+    for name, lines in section.fields:
+        embed.add_field(name=name, value=_bullets(lines), inline=False)
+    return embed
+
+
+def _help_embed() -> StaticEmbed:
+    embed = StaticEmbed(
+        title="🤖 Professional Discord Bot",
+        description="A feature-rich bot with everything your server needs!",
+        color=0x3498db
+    )
+    for section in SECTIONS:
+        if section.commands:
+            embed.add_field(name=f"{section.emoji} {section.label}", value=section.commands, inline=True)
+    embed.add_field(name="⚙️ Admin", value=ADMIN_COMMANDS, inline=True)
+    embed.set_footer(text="Use the menu below for interactive help!")
+    return embed
+
+
+def _setup_embed() -> StaticEmbed:
+    embed = StaticEmbed(
+        title="⚙️ Server Setup",
+        description="Let's configure your server! Use the buttons below:",
+        color=0xe74c3c
+    )
+    embed.add_field(
+        name="📋 Setup Steps",
+        value="\n".join(f"{number}. {step}" for number, step in enumerate(SETUP_STEPS, 1)),
+        inline=False
+    )
+    return embed
+
+
+MENU_OPTIONS = [
+    discord.SelectOption(label=f"{section.emoji} {section.label}", value=section.key,
+                         description=section.summary, emoji=section.emoji)
+    for section in SECTIONS
+]
+MENU_EMBEDS: Dict[str, StaticEmbed] = {section.key: _section_embed(section) for section in SECTIONS}
+HELP_EMBED = _help_embed()
+SETUP_EMBED = _setup_embed()
+
+
+def guild_join_embed(guild_name: str) -> discord.Embed:
+    """The only per-guild part is the greeting line"""
+    embed = discord.Embed(
+        title="🎉 Thanks for adding me!",
+        description=f"Hello **{guild_name}**! I'm a professional Discord bot with tons of features!",
+        color=0x2ecc71
+    )
+    embed.add_field(name="🚀 Quick Start", value=_bullets(GUILD_JOIN_QUICK_START), inline=False)
+    embed.add_field(name="✨ Key Features", value=_bullets(GUILD_JOIN_FEATURES), inline=False)
+    embed.set_footer(text="Made with ❤️ for your server")
+    return embed
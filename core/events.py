@@ -0,0 +1,267 @@
+"""Live dashboard events: a per-guild pub/sub hub that fans each event out to Server-Sent Events streams
+
+bot.py runs in its own process, so it publishes through an EventRelay: loopback
+UDP datagrams that the dashboard's RelayListener feeds into its EventHub.
+"""
+import json
+import logging
+import socket
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_FRAME = b": keepalive\n\n"
+RELAY_HOST = "127.0.0.1"
+# Comfortably under the loopback UDP limit; bigger events are dropped rather than split
+MAX_DATAGRAM = 60000
+
+
+class HubFull(Exception):
+    """Raised when the hub already has max_subscribers streams open"""
+
+
+class _Channel:
+    """One guild's recent frames, shared by all of its subscribers"""
+
+    def __init__(self, lock: threading.Lock, buffer: int):
+        self.frames: Deque[Tuple[int, bytes]] = deque(maxlen=buffer)
+        # Sequence of the newest frame; consecutive within the guild, so gaps show lost frames
+        self.last = 0
+        self.subscribers: Set["Subscription"] = set()
+        self.ready = threading.Condition(lock)
+
+
+class Subscription:
+    """One open stream; it only keeps a cursor into its guild's shared frames"""
+
+    def __init__(self, hub: "EventHub", guild_id: int, channel: _Channel,
+                 interrupt: Optional[Callable[[], None]] = None):
+        self.hub = hub
+        self.guild_id = guild_id
+        self.closed = False
+        self.cursor = channel.last
+        self._channel = channel
+        # Unblocks a web thread stuck writing to a client that stopped reading
+        self._interrupt = interrupt
+
+    def get(self, timeout: float) -> List[bytes]:
+        """Frames published since the last call, waiting up to timeout; empty on timeout or once closed"""
+        channel = self._channel
+        with channel.ready:
+            if not self.closed and channel.last <= self.cursor:
+                channel.ready.wait(timeout)
+            if self.closed:
+                return []
+            frames = []
+            for seq, frame in reversed(channel.frames):
+                if seq <= self.cursor:
+                    break
+                frames.append(frame)
+            self.cursor = channel.last
+        frames.reverse()
+        return frames
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """Encodes each event once per guild; a dispatcher thread wakes that guild's streams
+
+    Publishing costs the loop one append whatever the number of viewers:
+    waking hundreds of web threads is left to the dispatcher, which also
+    coalesces bursts into one wake-up. Frames live in one ring of
+    ``buffer`` entries per guild. A subscriber that falls more than
+    ``buffer`` events behind is too slow to keep up: it is evicted and its
+    connection cut, so the browser reconnects instead of a stalled stream
+    pinning memory or a server thread.
+    """
+
+    def __init__(self, buffer: int = 100, max_subscribers: int = 500):
+        self.buffer = buffer
+        self.max_subscribers = max_subscribers
+        self._channels: Dict[int, _Channel] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._dirty: Set[_Channel] = set()
+        self._wakeup = threading.Event()
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def subscribe(self, guild_id: int, interrupt: Optional[Callable[[], None]] = None) -> Subscription:
+        with self._lock:
+            if self._closed or self._count >= self.max_subscribers:
+                raise HubFull(f"{self._count} event streams already open")
+            channel = self._channels.get(guild_id)
+            if channel is None:
+                channel = self._channels[guild_id] = _Channel(self._lock, self.buffer)
+            subscription = Subscription(self, guild_id, channel, interrupt)
+            channel.subscribers.add(subscription)
+            self._count += 1
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="events", daemon=True)
+                self._dispatcher.start()
+        metrics.gauge("events.subscribers", self._count)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._detach(subscription)
+        metrics.gauge("events.subscribers", self._count)
+
+    def _detach(self, subscription: Subscription):
+        # Caller holds the lock
+        channel = self._channels.get(subscription.guild_id)
+        if channel is None or subscription not in channel.subscribers:
+            return
+        channel.subscribers.discard(subscription)
+        if not channel.subscribers:
+            del self._channels[subscription.guild_id]
+        self._count -= 1
+        subscription.closed = True
+        channel.ready.notify_all()
+
+    def publish(self, guild_id: int, kind: str, data: Optional[dict] = None):
+        """Queue an event for the guild's open streams; a no-op when nobody is watching"""
+        if guild_id not in self._channels:
+            return
+        body = f"event: {kind}\ndata: {json.dumps(data or {}, separators=(',', ':'))}\n\n".encode()
+        with self._lock:
+            channel = self._channels.get(guild_id)
+            if channel is None:
+                return
+            channel.last += 1
+            channel.frames.append((channel.last, b"id: %d\n" % channel.last + body))
+            self._dirty.add(channel)
+        self._wakeup.set()
+        metrics.incr("events.published")
+
+    def _dispatch(self):
+        while not self._closed:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            evicted = []
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                for channel in dirty:
+                    if len(channel.frames) == self.buffer:
+                        # Anyone whose cursor is older than the ring's oldest frame has lost events
+                        oldest = channel.frames[0][0]
+                        lagging = [s for s in channel.subscribers if s.cursor < oldest - 1]
+                        for subscription in lagging:
+                            self._detach(subscription)
+                        evicted += lagging
+                    channel.ready.notify_all()
+            if evicted:
+                self._interrupt(evicted)
+                metrics.incr("events.evicted", len(evicted))
+                metrics.gauge("events.subscribers", self._count)
+                logger.info("Evicted %d slow event streams", len(evicted))
+
+    @staticmethod
+    def _interrupt(subscriptions: List[Subscription]):
+        for subscription in subscriptions:
+            if subscription._interrupt is not None:
+                try:
+                    subscription._interrupt()
+                except OSError:
+                    pass
+
+    def subscribers(self) -> int:
+        return self._count
+
+    def close(self):
+        """End every stream so the web server's drain is not held open by them"""
+        with self._lock:
+            self._closed = True
+            closing = [s for channel in list(self._channels.values()) for s in list(channel.subscribers)]
+            for subscription in closing:
+                self._detach(subscription)
+        self._wakeup.set()
+        self._interrupt(closing)
+
+
+class EventRelay:
+    """EventHub's publish() for a process without the dashboard; events go to its RelayListener
+
+    Sending never blocks the loop. Events are dropped when the dashboard is
+    not running or the datagram would be too large, which a live view
+    tolerates the same way it tolerates an evicted stream.
+    """
+
+    def __init__(self, port: int):
+        self.address = (RELAY_HOST, port)
+        self._sock: Optional[socket.socket] = None
+        if port:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.setblocking(False)
+
+    def publish(self, guild_id: int, kind: str, data: Optional[dict] = None):
+        if self._sock is None:
+            return
+        payload = json.dumps([guild_id, kind, data or {}], separators=(",", ":")).encode()
+        if len(payload) > MAX_DATAGRAM:
+            metrics.incr("events.relay_dropped")
+            return
+        try:
+            self._sock.sendto(payload, self.address)
+        except OSError:
+            # Nobody listening, or the socket buffer is full
+            metrics.incr("events.relay_dropped")
+            return
+        metrics.incr("events.relayed")
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class RelayListener:
+    """Receives EventRelay datagrams on a daemon thread and publishes them into a local hub"""
+
+    def __init__(self, hub: EventHub, port: int, poll: float = 1.0):
+        self.hub = hub
+        self.port = port
+        self.poll = poll
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def start(self):
+        if not self.port or self._thread is not None:
+            return
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Loopback only: events carry moderation reasons and must not be injectable from the network
+        self._sock.bind((RELAY_HOST, self.port))
+        self._sock.settimeout(self.poll)
+        self._thread = threading.Thread(target=self._receive, name="event-relay", daemon=True)
+        self._thread.start()
+        logger.info("Listening for relayed events on %s:%d", RELAY_HOST, self.port)
+
+    def _receive(self):
+        while not self._closed:
+            try:
+                payload = self._sock.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                guild_id, kind, data = json.loads(payload)
+                self.hub.publish(int(guild_id), str(kind), data)
+            except (ValueError, TypeError) as e:
+                logger.debug("Dropped a malformed relayed event: %s", e)
+
+    def close(self):
+        self._closed = True
+        if self._thread is not None:
+            self._thread.join(self.poll * 2)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
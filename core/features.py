@@ -0,0 +1,105 @@
+"""Per-guild feature flags held in memory as one bitmask per guild"""
+import enum
+import logging
+from datetime import datetime
+from typing import Dict, Iterable
+
+from discord.ext import commands
+
+logger = logging.getLogger(__name__)
+
+
+class Feature(enum.IntFlag):
+    LEVELING = 1
+    ECONOMY = 2
+    AUTO_MOD = 4
+    MUSIC = 8
+
+
+ALL_FEATURES = Feature.LEVELING | Feature.ECONOMY | Feature.AUTO_MOD | Feature.MUSIC
+
+# guilds table column behind each flag
+COLUMNS = {
+    Feature.LEVELING: "level_system_enabled",
+    Feature.ECONOMY: "economy_enabled",
+    Feature.AUTO_MOD: "auto_mod_enabled",
+    Feature.MUSIC: "music_enabled",
+}
+
+
+class FeatureGate:
+    """Answers "is this enabled here?" without touching the database"""
+
+    def __init__(self, db):
+        self.db = db
+        self._flags: Dict[int, int] = {}
+
+    def load(self):
+        conn = self.db.get_connection()
+        try:
+            rows = conn.execute(f"SELECT id, {', '.join(COLUMNS.values())} FROM guilds").fetchall()
+        finally:
+            conn.close()
+        self._flags = {row[0]: self._mask(row[1:]) for row in rows}
+        logger.info("Loaded feature flags for %d guilds", len(self._flags))
+
+    def apply_rows(self, rows):
+        """Fold (id, *COLUMNS) guild rows read after a snapshot into the flags"""
+        for row in rows:
+            self._flags[row[0]] = self._mask(row[1:])
+
+    def masks(self) -> Dict[int, int]:
+        return dict(self._flags)
+
+    def restore(self, masks: Dict[int, int]):
+        self._flags = dict(masks)
+
+    @staticmethod
+    def _mask(values) -> int:
+        mask = 0
+        for feature, value in zip(COLUMNS, values):
+            # NULL means the column default, which is enabled
+            if value is None or value:
+                mask |= feature
+        return mask
+
+    def enabled(self, guild_id: int, feature: Feature) -> bool:
+        # Guilds without a row yet get the table defaults: everything on
+        return bool(self._flags.get(guild_id, ALL_FEATURES) & feature)
+
+    def flags(self, guild_id: int) -> Feature:
+        return Feature(self._flags.get(guild_id, ALL_FEATURES))
+
+    def set_many(self, guild_ids: Iterable[int], enable: Feature = Feature(0), disable: Feature = Feature(0)):
+        """Toggle features across many guilds in a single transaction (blocking; run in a thread)"""
+        guild_ids = list(dict.fromkeys(guild_ids))
+        masks = {}
+        for guild_id in guild_ids:
+            mask = self._flags.get(guild_id, ALL_FEATURES)
+            masks[guild_id] = (mask | enable) & ~disable & ALL_FEATURES
+
+        assignments = ", ".join(f"{column} = ?" for column in COLUMNS.values())
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO guilds (id) VALUES (?)", [(g,) for g in guild_ids])
+                # updated_at lets a warm restart pick the change up as a delta
+                now = datetime.utcnow().isoformat()
+                conn.executemany(
+                    f"UPDATE guilds SET {assignments}, updated_at = ? WHERE id = ?",
+                    [tuple(int(bool(mask & feature)) for feature in COLUMNS) + (now, guild_id)
+                     for guild_id, mask in masks.items()]
+                )
+        finally:
+            conn.close()
+        # Only publish once the transaction committed
+        self._flags.update(masks)
+
+
+def requires_feature(feature: Feature):
+    """Command check that fails fast when a guild has the feature switched off"""
+    async def predicate(ctx):
+        if ctx.guild is None or ctx.bot.features.enabled(ctx.guild.id, feature):
+            return True
+        raise commands.CheckFailure(f"{feature.name.replace('_', ' ').title()} is disabled on this server.")
+    return commands.check(predicate)
@@ -0,0 +1,172 @@
+"""Guild registry: reconciles bot.guilds with the guilds table and coalesces settings writes"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Columns that settings edits are allowed to touch
+DEFAULT_PREFIX = "!"
+
+SETTINGS_COLUMNS = {
+    "name", "prefix", "welcome_channel", "welcome_message", "goodbye_message",
+    "auto_role", "mod_log_channel", "level_up_channel",
+}
+
+UPSERT_SQL = """
+    INSERT INTO guilds (id, name, created_at, updated_at) VALUES (?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET name = excluded.name, updated_at = excluded.updated_at
+"""
+
+
+class GuildRegistry:
+    """Batches guild joins and settings edits into one transaction per interval"""
+
+    def __init__(self, db, interval: float = 1.0):
+        self.db = db
+        self.interval = interval
+        self._joined: Dict[int, str] = {}
+        self._settings: Dict[int, Dict[str, Any]] = {}
+        # Committed non-default prefixes; pending edits are checked first
+        self._prefixes: Dict[int, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def sync(self, guilds: Iterable) -> int:
+        """Diff live guilds against the table and upsert only what changed (blocking)
+
+        Rows of guilds the bot has left are kept on purpose. A returning guild
+        gets its settings back, and bot.py, main.py and shards share the table,
+        so one process's bot.guilds is not the full set of guilds in use.
+        """
+        live = {guild.id: guild.name for guild in guilds}
+        conn = self.db.get_connection()
+        try:
+            stored = dict(conn.execute("SELECT id, name FROM guilds").fetchall())
+            now = datetime.utcnow().isoformat()
+            changes = [(guild_id, name, now, now) for guild_id, name in live.items()
+                       if guild_id not in stored or stored[guild_id] != name]
+            if changes:
+                with conn:
+                    conn.executemany(UPSERT_SQL, changes)
+        finally:
+            conn.close()
+        logger.info("Guild registry synced: %d live, %d upserted", len(live), len(changes))
+        return len(changes)
+
+    def joined(self, guild):
+        """Record a guild join; existing settings for a returning guild are kept"""
+        self._joined[guild.id] = guild.name
+
+    def update_settings(self, guild_id: int, **fields):
+        """Queue settings changes; repeated edits to one guild collapse into one UPDATE"""
+        unknown = set(fields) - SETTINGS_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown guild settings: {', '.join(sorted(unknown))}")
+        self._settings.setdefault(guild_id, {}).update(fields)
+        # Commands read the in-memory value, so a new prefix applies now; only the DB write waits
+        if "prefix" in fields:
+            self.remember_prefix(guild_id, fields["prefix"])
+
+    def pending_settings(self, guild_id: int) -> Dict[str, Any]:
+        return self._settings.get(guild_id, {})
+
+    async def fetch_settings(self, guild_id: int, *columns: str) -> Optional[Dict[str, Any]]:
+        """Read settings off the loop with queued edits on top; None when the guild has neither"""
+        unknown = set(columns) - SETTINGS_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown guild settings: {', '.join(sorted(unknown))}")
+        row = await asyncio.to_thread(self._read_settings, guild_id, columns)
+        pending = {column: value for column, value in self.pending_settings(guild_id).items() if column in columns}
+        if row is None and not pending:
+            return None
+        return {**dict(zip(columns, row or (None,) * len(columns))), **pending}
+
+    def _read_settings(self, guild_id: int, columns):
+        conn = self.db.get_connection()
+        try:
+            return conn.execute(f"SELECT {', '.join(columns)} FROM guilds WHERE id = ?", (guild_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def load_prefixes(self):
+        """Read every custom prefix once (blocking)"""
+        conn = self.db.get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT id, prefix FROM guilds WHERE prefix IS NOT NULL AND prefix != ?", (DEFAULT_PREFIX,)
+            ).fetchall()
+        finally:
+            conn.close()
+        self._prefixes = dict(rows)
+        logger.info("Loaded %d custom prefixes", len(self._prefixes))
+
+    def prefix(self, guild_id: int) -> str:
+        return self._prefixes.get(guild_id, DEFAULT_PREFIX)
+
+    def remember_prefix(self, guild_id: int, prefix: Optional[str]):
+        if prefix and prefix != DEFAULT_PREFIX:
+            self._prefixes[guild_id] = prefix
+        else:
+            self._prefixes.pop(guild_id, None)
+
+    def prefixes(self) -> Dict[int, str]:
+        return dict(self._prefixes)
+
+    def restore_prefixes(self, prefixes: Dict[int, str]):
+        self._prefixes = dict(prefixes)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush guild registry")
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._joined and not self._settings:
+                return
+            joined, self._joined = self._joined, {}
+            settings, self._settings = self._settings, {}
+            try:
+                await asyncio.to_thread(self._write, joined, settings)
+            except Exception:
+                # Merge back under anything queued meanwhile, newer edits win
+                for guild_id, name in joined.items():
+                    self._joined.setdefault(guild_id, name)
+                for guild_id, fields in settings.items():
+                    self._settings[guild_id] = {**fields, **self._settings.get(guild_id, {})}
+                raise
+
+    def _write(self, joined: Dict[int, str], settings: Dict[int, Dict[str, Any]]):
+        now = datetime.utcnow().isoformat()
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                if joined:
+                    conn.executemany(UPSERT_SQL, [(guild_id, name, now, now) for guild_id, name in joined.items()])
+                if settings:
+                    conn.executemany("INSERT OR IGNORE INTO guilds (id, created_at) VALUES (?, ?)",
+                                     [(guild_id, now) for guild_id in settings])
+                for guild_id, fields in settings.items():
+                    columns = sorted(fields)
+                    assignments = ", ".join(f"{column} = ?" for column in columns)
+                    conn.execute(
+                        f"UPDATE guilds SET {assignments}, updated_at = ? WHERE id = ?",
+                        [fields[column] for column in columns] + [now, guild_id]
+                    )
+        finally:
+            conn.close()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
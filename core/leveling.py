@@ -0,0 +1,20 @@
+"""Level curve shared by the XP handler, bulk tools and rank cards"""
+import math
+
+
+def required_xp(level: int) -> int:
+    """Total XP needed to move past ``level``"""
+    return 5 * level ** 2 + 50 * level + 100
+
+
+def level_for_xp(xp: int) -> int:
+    """Level a member with ``xp`` total XP ends up at after every level-up has been applied"""
+    if xp is None or xp < required_xp(1):
+        return 1
+    # Largest L with 5L² + 50L + 100 <= xp, then nudge away integer sqrt rounding
+    level = max(1, (math.isqrt(20 * xp + 500) - 50) // 10)
+    while required_xp(level + 1) <= xp:
+        level += 1
+    while level > 1 and required_xp(level) > xp:
+        level -= 1
+    return level + 1
@@ -0,0 +1,159 @@
+"""Level-up announcements, merged per channel and kept within each channel's send rate"""
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+import discord
+
+from core.metrics import metrics
+from core.moderation import RateBudget
+
+logger = logging.getLogger(__name__)
+
+# Discord allows roughly 5 messages per 5 seconds per channel
+CHANNEL_RATE = 1.0
+CHANNEL_BURST = 5
+MAX_BUDGETS = 1000
+# Ids of our own announcements whose gateway echo has not been seen yet
+MAX_SENT_IDS = 256
+
+
+def create_columns(cursor):
+    """Add guilds.level_up_channel to databases created before it existed"""
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(guilds)").fetchall()}
+    if "level_up_channel" not in columns:
+        cursor.execute("ALTER TABLE guilds ADD COLUMN level_up_channel INTEGER")
+
+
+class LevelUpAnnouncer:
+    """Queues level-ups per target channel and sends one embed per window"""
+
+    MAX_LISTED = 20
+
+    def __init__(self, bot, db, window: float = 2.0, max_backlog: int = 100):
+        self.bot = bot
+        self.db = db
+        self.window = window
+        # Level-ups kept per channel while it is rate limited; the oldest are dropped beyond this
+        self.max_backlog = max_backlog
+        self._channels: Dict[int, int] = {}
+        # channel id -> member id -> (mention, avatar url, level)
+        self._pending: Dict[int, "OrderedDict[int, Tuple[str, str, int]]"] = {}
+        self._targets: Dict[int, discord.abc.Messageable] = {}
+        self._timers: Dict[int, asyncio.Task] = {}
+        self._budgets: Dict[int, RateBudget] = {}
+        # Announcements are charged when sent, so their echo through on_message must not be charged again
+        self._sent: Set[int] = set()
+        self._sent_order: Deque[int] = deque()
+
+    def load_channels(self):
+        """Read every configured guilds.level_up_channel once"""
+        conn = self.db.get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT id, level_up_channel FROM guilds WHERE level_up_channel IS NOT NULL"
+            ).fetchall()
+        finally:
+            conn.close()
+        self._channels = {guild_id: channel_id for guild_id, channel_id in rows}
+        logger.info("Loaded %d level-up channels", len(self._channels))
+
+    def set_channel(self, guild_id: int, channel_id: Optional[int]):
+        if channel_id:
+            self._channels[guild_id] = channel_id
+        else:
+            self._channels.pop(guild_id, None)
+
+    def channels(self) -> Dict[int, int]:
+        return dict(self._channels)
+
+    def restore_channels(self, channels: Dict[int, int]):
+        self._channels = dict(channels)
+
+    def announce(self, channel, member, level: int):
+        """Queue a level-up; the guild's level-up channel wins over the channel it happened in"""
+        target = self.bot.get_channel(self._channels.get(member.guild.id, 0)) or channel
+        pending = self._pending.setdefault(target.id, OrderedDict())
+        previous = pending.pop(member.id, None)
+        if previous is not None:
+            level = max(level, previous[2])
+        pending[member.id] = (member.mention, member.display_avatar.url, level)
+        if len(pending) > self.max_backlog:
+            pending.popitem(last=False)
+            metrics.incr("levelups.dropped")
+        self._targets[target.id] = target
+        if target.id not in self._budgets:
+            if len(self._budgets) >= MAX_BUDGETS:
+                self._budgets = {key: budget for key, budget in self._budgets.items() if key in self._timers}
+            self._budgets[target.id] = RateBudget(CHANNEL_RATE, CHANNEL_BURST)
+        if target.id not in self._timers:
+            self._timers[target.id] = asyncio.create_task(self._send_later(target.id))
+
+    def note_send(self, channel_id: int, message_id: int):
+        """Charge a message the bot sent for another reason against the channel's budget"""
+        if message_id in self._sent:
+            self._sent.discard(message_id)
+            return
+        budget = self._budgets.get(channel_id)
+        if budget is not None:
+            budget.try_acquire()
+
+    async def _send_later(self, channel_id: int):
+        try:
+            # One send in flight per channel; anything queued meanwhile joins the next embed
+            while self._pending.get(channel_id):
+                await asyncio.sleep(self.window)
+                if not self._budgets[channel_id].try_acquire():
+                    # Channel is busy with other sends: keep merging, the backlog cap drops the oldest
+                    metrics.incr("levelups.deferred")
+                    continue
+                await self._send(self._targets[channel_id], self._pending.pop(channel_id))
+        finally:
+            self._timers.pop(channel_id, None)
+            if not self._pending.get(channel_id):
+                self._targets.pop(channel_id, None)
+
+    async def _send(self, channel, entries: "OrderedDict[int, Tuple[str, str, int]]"):
+        if not entries:
+            return
+        metrics.incr("levelups.sent")
+        metrics.incr("levelups.announced", len(entries))
+        try:
+            message = await channel.send(embed=self.build_embed(list(entries.values())))
+        except discord.HTTPException as e:
+            logger.warning("Cannot announce level-ups in %s: %s", channel.id, e)
+            return
+        self._remember_sent(message.id)
+
+    def _remember_sent(self, message_id: int):
+        # Bounded: an echo that raced ahead of the send's response never clears its id
+        self._sent.add(message_id)
+        self._sent_order.append(message_id)
+        while len(self._sent_order) > MAX_SENT_IDS:
+            self._sent.discard(self._sent_order.popleft())
+
+    def build_embed(self, entries) -> discord.Embed:
+        if len(entries) == 1:
+            mention, avatar_url, level = entries[0]
+            embed = discord.Embed(
+                title="🎉 Level Up!",
+                description=f"{mention} reached **Level {level}**!",
+                color=0xf1c40f
+            )
+            embed.set_thumbnail(url=avatar_url)
+            return embed
+
+        lines = [f"{mention} → **Level {level}**" for mention, _, level in entries[:self.MAX_LISTED]]
+        if len(entries) > self.MAX_LISTED:
+            lines.append(f"… and {len(entries) - self.MAX_LISTED} more")
+        return discord.Embed(title=f"🎉 {len(entries)} Level Ups!", description="\n".join(lines), color=0xf1c40f)
+
+    async def close(self):
+        for task in list(self._timers.values()):
+            task.cancel()
+        self._timers.clear()
+        pending, self._pending = self._pending, {}
+        targets, self._targets = self._targets, {}
+        for channel_id, entries in pending.items():
+            await self._send(targets[channel_id], entries)
@@ -0,0 +1,173 @@
+"""Graceful shutdown: stop taking events, drain in-flight work, then flush and close services in order"""
+import asyncio
+import inspect
+import logging
+import signal
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple, Union
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Step = Callable[[], Union[None, Awaitable[None]]]
+
+
+class ShutdownCoordinator:
+    """Runs the drain once, within a deadline, and reports where the time went
+
+    Steps run in the order they were added, each bounded by what is left of
+    the deadline. Steps still running past it get ``step_grace`` seconds, so
+    a slow handler cannot stop pending writes from being flushed.
+    """
+
+    def __init__(self, deadline: float = 30.0, step_grace: float = 2.0):
+        self.deadline = deadline
+        self.step_grace = step_grace
+        self.draining = False
+        self.report: List[Tuple[str, float]] = []
+        self._steps: List[Tuple[str, Step]] = []
+        self._inflight: Set[asyncio.Task] = set()
+        # Tasks that called drain(): a handler closing the bot must not wait for itself
+        self._callers: Set[asyncio.Task] = set()
+        self._drain_task: Optional[asyncio.Future] = None
+
+    def add_step(self, name: str, step: Step):
+        """Register a sync or async callable to run during the drain"""
+        self._steps.append((name, step))
+
+    def admit(self) -> bool:
+        """False once draining; the caller drops the event"""
+        if self.draining:
+            metrics.incr("shutdown.rejected")
+            return False
+        return True
+
+    def track(self, task: asyncio.Task):
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    def install_signal_handlers(self, close: Callable[[], Awaitable[None]]):
+        """SIGTERM/SIGINT start a graceful close; a second signal exits without draining"""
+        loop = asyncio.get_running_loop()
+
+        def handle(sig):
+            if self.draining:
+                logger.warning("Received %s again while draining; exiting now", sig.name)
+                raise SystemExit(1)
+            logger.info("Received %s; shutting down", sig.name)
+            asyncio.ensure_future(close())
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, handle, sig)
+            except (NotImplementedError, RuntimeError):
+                # Windows, or not the main thread: Ctrl+C still closes through KeyboardInterrupt
+                pass
+
+    async def drain(self):
+        """Idempotent; concurrent callers wait for the same drain"""
+        caller = asyncio.current_task()
+        if caller is not None:
+            self._callers.add(caller)
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain())
+        await asyncio.shield(self._drain_task)
+
+    async def _drain(self):
+        self.draining = True
+        started = time.perf_counter()
+        deadline = started + self.deadline
+        logger.info("Draining with a %.0fs deadline: %d handlers in flight", self.deadline, len(self._inflight))
+
+        await self._run_step("handlers", self._wait_inflight, deadline)
+        for name, step in self._steps:
+            await self._run_step(name, step, deadline)
+
+        total = time.perf_counter() - started
+        metrics.observe("shutdown.drain", total)
+        logger.info("Drained in %.2fs: %s", total,
+                    ", ".join(f"{name} {elapsed * 1000:.0f}ms" for name, elapsed in self.report))
+
+    async def _wait_inflight(self):
+        pending = {task for task in self._inflight if task not in self._callers and not task.done()}
+        if not pending:
+            return
+        try:
+            await asyncio.wait(pending)
+        except asyncio.CancelledError:
+            # Deadline hit: cancel the stragglers so they don't touch services closed after this
+            stragglers = [task for task in pending if not task.done()]
+            for task in stragglers:
+                task.cancel()
+            logger.warning("Cancelled %d handlers still running at the deadline", len(stragglers))
+            metrics.incr("shutdown.cancelled", len(stragglers))
+            raise
+
+    async def _run_step(self, name: str, step: Step, deadline: float):
+        started = time.perf_counter()
+        try:
+            result = step()
+            if inspect.isawaitable(result):
+                await asyncio.wait_for(result, timeout=max(deadline - started, self.step_grace))
+        except asyncio.TimeoutError:
+            logger.error("Shutdown step %s did not finish before the deadline", name)
+            metrics.incr("shutdown.timeouts")
+        except Exception:
+            logger.exception("Shutdown step %s failed", name)
+        elapsed = time.perf_counter() - started
+        self.report.append((name, elapsed))
+        metrics.observe(f"shutdown.{name}", elapsed)
+
+
+class WebServer:
+    """A WSGI app on a werkzeug server thread that can be stopped after its requests finish"""
+
+    def __init__(self, app, host: str, port: int):
+        self.app = app
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._active = 0
+        self._idle = threading.Condition()
+
+    def _finished(self):
+        with self._idle:
+            self._active -= 1
+            self._idle.notify_all()
+
+    def _wsgi(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        with self._idle:
+            self._active += 1
+        try:
+            # Streaming responses count as in flight until the server closes their iterator
+            return ClosingIterator(self.app(environ, start_response), self._finished)
+        except BaseException:
+            self._finished()
+            raise
+
+    def start(self):
+        from werkzeug.serving import make_server
+
+        self._server = make_server(self.host, self.port, self._wsgi, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="web", daemon=True)
+        self._thread.start()
+        logger.info("Web server listening on %s:%s", self.host, self.port)
+
+    def stop(self, timeout: float = 10.0) -> int:
+        """Stop accepting, wait up to timeout for running requests (blocking); returns how many were cut off"""
+        if self._server is None:
+            return 0
+        self._server.shutdown()
+        with self._idle:
+            self._idle.wait_for(lambda: self._active == 0, timeout)
+            remaining = self._active
+        self._server.server_close()
+        self._server = None
+        if remaining:
+            logger.warning("Web server stopped with %d requests still running", remaining)
+        return remaining
@@ -0,0 +1,136 @@
+"""Queue-backed logging: the event loop only enqueues records, a listener thread does the I/O"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra=`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Caps high-volume events per (event, guild) per interval.
+
+    Only records logged with ``extra={"sample": "<event>", "guild_id": ...}``
+    are sampled; the next record let through carries a ``suppressed`` count.
+    """
+
+    def __init__(self, per_interval: int = 5, interval: float = 60.0):
+        super().__init__()
+        self.per_interval = per_interval
+        self.interval = interval
+        self._windows: Dict[Tuple[str, Optional[int]], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "sample", None)
+        if event is None:
+            return True
+        key = (event, getattr(record, "guild_id", None))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            window = self._windows[key] = [now, 0, 0]
+            if suppressed:
+                record.suppressed = suppressed
+        if window[1] >= self.per_interval:
+            window[2] += 1
+            return False
+        window[1] += 1
+        if len(self._windows) > 10000:
+            self._prune(now)
+        return True
+
+    def _prune(self, now: float):
+        for key in [key for key, window in self._windows.items() if now - window[0] >= self.interval]:
+            del self._windows[key]
+
+
+class LoopSafeQueueHandler(logging.handlers.QueueHandler):
+    """Leaves message formatting to the listener thread.
+
+    The stock QueueHandler formats each record in the caller, which would
+    put the formatting cost back on the event loop. Only tracebacks are
+    rendered here so the record does not keep frames alive in the queue.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        # A full queue means the disk can't keep up; drop instead of blocking the loop
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Block for the sentinel: a full queue must not stop shutdown from draining
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        if self._thread is not None:
+            super().stop()
+
+
+def setup_logging(level="INFO", path: Optional[str] = "bot.log", json_output: bool = False,
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                  sample_per_interval: int = 5, sample_interval: float = 60.0,
+                  max_queue: int = 10000) -> logging.handlers.QueueListener:
+    """Route the root logger through a queue; returns the running listener"""
+    formatter = JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if path:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=max_queue)
+    queue_handler = LoopSafeQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_per_interval, sample_interval))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = _Listener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
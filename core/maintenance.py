@@ -0,0 +1,222 @@
+"""Online SQLite maintenance: stepped backups, incremental vacuum and PRAGMA optimize in quiet hours"""
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM_INCREMENTAL = 2
+# Files up to this size are switched to incremental auto_vacuum with a one-off VACUUM in quiet hours
+CONVERT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class BackupError(RuntimeError):
+    """Raised when a backup cannot complete, e.g. because writes keep restarting it"""
+
+
+class DatabaseStats(NamedTuple):
+    size_bytes: int
+    page_size: int
+    page_count: int
+    freelist_count: int
+    auto_vacuum: int
+
+    @property
+    def fragmentation(self) -> float:
+        """Share of pages that are free and could be handed back by a vacuum"""
+        return self.freelist_count / self.page_count if self.page_count else 0.0
+
+    @property
+    def reclaimable_bytes(self) -> int:
+        return self.freelist_count * self.page_size
+
+
+def _pragma(conn, name: str):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def enable_incremental_vacuum(cursor):
+    """Set incremental auto_vacuum; only takes effect on a file that has no tables yet"""
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+
+class Maintenance:
+    """Runs the nightly backup, vacuum and optimize pass once per day inside quiet_hours (UTC)"""
+
+    def __init__(self, db, backup_dir: str = "backups", keep: int = 7, quiet_hours: Tuple[int, int] = (3, 6),
+                 pages_per_step: int = 1024, step_pause: float = 0.01, vacuum_pages: int = 2000,
+                 max_restarts: int = 20, check_interval: float = 600.0):
+        self.db = db
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.quiet_hours = quiet_hours
+        # Each step holds the source's read lock for pages_per_step pages, then lets writers in
+        self.pages_per_step = pages_per_step
+        self.step_pause = step_pause
+        self.vacuum_pages = vacuum_pages
+        # A write from another connection restarts the copy; give up after this many
+        self.max_restarts = max_restarts
+        self.check_interval = check_interval
+        self.last_run: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def stats(self) -> DatabaseStats:
+        conn = self.db.get_connection()
+        try:
+            page_size, page_count = _pragma(conn, "page_size"), _pragma(conn, "page_count")
+            freelist_count, auto_vacuum = _pragma(conn, "freelist_count"), _pragma(conn, "auto_vacuum")
+        finally:
+            conn.close()
+        return DatabaseStats(os.path.getsize(self.db.db_path), page_size, page_count, freelist_count, auto_vacuum)
+
+    def backup(self) -> str:
+        """Copy the live database in page steps into backup_dir (blocking); returns the backup path"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        name = os.path.splitext(os.path.basename(self.db.db_path))[0]
+        path = os.path.join(self.backup_dir, f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.db")
+        tmp = f"{path}.tmp"
+        restarts = 0
+        last_remaining = None
+
+        def progress(status, remaining, total):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > self.max_restarts:
+                    raise BackupError(f"Backup restarted {restarts} times by concurrent writes")
+            last_remaining = remaining
+
+        started = time.perf_counter()
+        source = self.db.get_connection()
+        target = sqlite3.connect(tmp)
+        try:
+            source.backup(target, pages=self.pages_per_step, progress=progress, sleep=self.step_pause)
+            if target.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+                raise BackupError("Backup failed its integrity check")
+        except BaseException:
+            target.close()
+            os.remove(tmp)
+            raise
+        finally:
+            source.close()
+        target.close()
+        os.replace(tmp, path)
+
+        elapsed = time.perf_counter() - started
+        metrics.observe("maintenance.backup", elapsed)
+        logger.info("Backed up %s to %s in %.1fs (%d restarts)", self.db.db_path, path, elapsed, restarts)
+        self.prune_backups()
+        return path
+
+    def backups(self) -> List[str]:
+        """Finished backups, newest first"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        names = sorted((name for name in os.listdir(self.backup_dir) if name.endswith(".db")), reverse=True)
+        return [os.path.join(self.backup_dir, name) for name in names]
+
+    def prune_backups(self):
+        for path in self.backups()[self.keep:]:
+            os.remove(path)
+            logger.info("Removed old backup %s", path)
+
+    def vacuum(self) -> int:
+        """Hand free pages back to the filesystem, vacuum_pages per write lock (blocking); returns pages freed"""
+        stats = self.stats()
+        conn = self.db.get_connection()
+        try:
+            if stats.auto_vacuum != AUTO_VACUUM_INCREMENTAL:
+                if stats.size_bytes > CONVERT_MAX_BYTES:
+                    logger.warning("%s is not in incremental auto_vacuum mode and is too large to convert online; "
+                                   "run PRAGMA auto_vacuum = INCREMENTAL; VACUUM; while the bot is stopped",
+                                   self.db.db_path)
+                    return 0
+                # One-off: the mode only applies after a full VACUUM rebuilds the file
+                started = time.perf_counter()
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("VACUUM")
+                logger.info("Switched %s to incremental auto_vacuum in %.1fs", self.db.db_path,
+                            time.perf_counter() - started)
+                return stats.freelist_count
+            free = stats.freelist_count
+            while free:
+                conn.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})").fetchall()
+                remaining = _pragma(conn, "freelist_count")
+                if remaining >= free:
+                    break
+                free = remaining
+                time.sleep(self.step_pause)
+        finally:
+            conn.close()
+        return stats.freelist_count - free
+
+    def optimize(self):
+        conn = self.db.get_connection()
+        try:
+            conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+
+    def run(self) -> DatabaseStats:
+        """Backup, vacuum, optimize and report (blocking)"""
+        started = time.perf_counter()
+        before = self.stats()
+        self.backup()
+        freed = self.vacuum()
+        self.optimize()
+        after = self.stats()
+        self.report(after)
+        logger.info("Maintenance done in %.1fs: %.1f MB -> %.1f MB, %d pages freed, fragmentation %.1f%%",
+                    time.perf_counter() - started, before.size_bytes / 1024 / 1024, after.size_bytes / 1024 / 1024,
+                    freed, after.fragmentation * 100)
+        return after
+
+    @staticmethod
+    def report(stats: DatabaseStats):
+        metrics.gauge("db.size_bytes", stats.size_bytes)
+        metrics.gauge("db.free_pages", stats.freelist_count)
+        metrics.gauge("db.fragmentation", round(stats.fragmentation, 4))
+
+    def in_quiet_hours(self, now: Optional[datetime] = None) -> bool:
+        hour = (now or datetime.utcnow()).hour
+        start, end = self.quiet_hours
+        return start <= hour < end if start <= end else hour >= start or hour < end
+
+    def start(self):
+        if self.last_run is None:
+            # A restart inside quiet hours should not take a second backup the same day
+            newest = self.backups()[:1]
+            if newest:
+                self.last_run = datetime.utcfromtimestamp(os.path.getmtime(newest[0])).date().isoformat()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                self.report(await asyncio.to_thread(self.stats))
+                today = datetime.utcnow().date().isoformat()
+                if self.in_quiet_hours() and self.last_run != today:
+                    await self.run_now()
+                    self.last_run = today
+            except Exception:
+                logger.exception("Database maintenance failed")
+            await asyncio.sleep(self.check_interval)
+
+    async def run_now(self) -> DatabaseStats:
+        """Run the maintenance pass off the loop; concurrent callers wait their turn"""
+        async with self._lock:
+            return await asyncio.to_thread(self.run)
+
+    async def close(self):
+        # A pass already in its thread finishes on its own; backups are written to .tmp first
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
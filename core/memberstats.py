@@ -0,0 +1,318 @@
+"""Columnar in-memory member stats: one set of parallel typed arrays per guild
+
+A member costs ~52 bytes (40 of columns, 12 of index) instead of a row tuple
+with boxed ints and ISO strings. NumPy is optional: when installed,
+top-N, rank and decay run as vectorised operations over zero-copy views of
+the arrays; otherwise they fall back to plain loops over the same storage.
+"""
+import heapq
+import importlib.util
+import logging
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+if importlib.util.find_spec("numpy") is not None:
+    import numpy
+else:
+    numpy = None
+
+# column -> array typecode (q: int64, i: int32, I: uint32 epoch seconds)
+COLUMNS = {
+    "xp": "q",
+    "level": "i",
+    "coins": "q",
+    "reputation": "i",
+    "warnings": "i",
+    "last_active": "I",
+}
+DEFAULTS = {"xp": 0, "level": 1, "coins": 100, "reputation": 0, "warnings": 0, "last_active": 0}
+
+
+class MemberStats(NamedTuple):
+    user_id: int
+    xp: int
+    level: int
+    coins: int
+    reputation: int
+    warnings: int
+    last_active: int
+
+
+def epoch(timestamp: Optional[str]) -> int:
+    """users.last_message (naive UTC ISO) as epoch seconds; 0 when unset"""
+    if not timestamp:
+        return 0
+    try:
+        return max(0, int((datetime.fromisoformat(timestamp) - datetime(1970, 1, 1)).total_seconds()))
+    except ValueError:
+        return 0
+
+
+class SlotIndex:
+    """user_id -> slot without a Python object per member
+
+    Sorted parallel arrays answer lookups by bisection; members added since the
+    last merge sit in a small dict until it grows to an eighth of the arrays.
+    """
+
+    __slots__ = ("keys", "slots", "recent")
+
+    TOMBSTONE = 0xFFFFFFFF
+    MIN_RECENT = 4096
+
+    def __init__(self):
+        self.keys = array("Q")
+        self.slots = array("I")
+        self.recent: Dict[int, int] = {}
+
+    def _find(self, user_id: int) -> Optional[int]:
+        keys = self.keys
+        pos = bisect_left(keys, user_id)
+        if pos < len(keys) and keys[pos] == user_id:
+            return pos
+        return None
+
+    def get(self, user_id: int) -> Optional[int]:
+        slot = self.recent.get(user_id)
+        if slot is not None:
+            return slot
+        pos = self._find(user_id)
+        if pos is None or self.slots[pos] == self.TOMBSTONE:
+            return None
+        return self.slots[pos]
+
+    def __contains__(self, user_id: int):
+        return self.get(user_id) is not None
+
+    def set(self, user_id: int, slot: int, merge: bool = True):
+        pos = self._find(user_id) if user_id not in self.recent else None
+        if pos is not None:
+            self.slots[pos] = slot
+            return
+        self.recent[user_id] = slot
+        if merge and len(self.recent) > max(self.MIN_RECENT, len(self.keys) >> 3):
+            self.merge()
+
+    def pop(self, user_id: int) -> Optional[int]:
+        if user_id in self.recent:
+            return self.recent.pop(user_id)
+        pos = self._find(user_id)
+        if pos is None or self.slots[pos] == self.TOMBSTONE:
+            return None
+        slot = self.slots[pos]
+        self.slots[pos] = self.TOMBSTONE
+        return slot
+
+    def merge(self):
+        """Fold recent members into the sorted arrays and drop tombstones"""
+        if not self.recent and self.TOMBSTONE not in self.slots:
+            return
+        live = ((key, slot) for key, slot in zip(self.keys, self.slots) if slot != self.TOMBSTONE)
+        keys, slots = array("Q"), array("I")
+        for key, slot in heapq.merge(live, sorted(self.recent.items())):
+            keys.append(key)
+            slots.append(slot)
+        self.keys, self.slots, self.recent = keys, slots, {}
+
+    def nbytes(self) -> int:
+        return self.keys.itemsize * len(self.keys) + self.slots.itemsize * len(self.slots)
+
+
+
+class GuildStats:
+    """Dense parallel arrays; slot i of every column belongs to user_ids[i]"""
+
+    __slots__ = ("user_ids", "index", "columns")
+
+    def __init__(self):
+        self.user_ids = array("Q")
+        self.index = SlotIndex()
+        self.columns: Dict[str, array] = {name: array(code) for name, code in COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __contains__(self, user_id: int):
+        return user_id in self.index
+
+    def _slot(self, user_id: int) -> int:
+        slot = self.index.get(user_id)
+        if slot is None:
+            slot = len(self.user_ids)
+            self.user_ids.append(user_id)
+            for name, column in self.columns.items():
+                column.append(DEFAULTS[name])
+            self.index.set(user_id, slot)
+        return slot
+
+    def append(self, user_id: int, values):
+        """Add a member known to be new, values in COLUMNS order; call index.merge() after a batch"""
+        slot = len(self.user_ids)
+        self.user_ids.append(user_id)
+        for column, value in zip(self.columns.values(), values):
+            column.append(value)
+        self.index.set(user_id, slot, merge=False)
+
+    def upsert(self, user_id: int, **fields):
+        slot = self._slot(user_id)
+        for name, value in fields.items():
+            self.columns[name][slot] = value
+
+    def add_xp(self, user_id: int, amount: int, now: int) -> int:
+        slot = self._slot(user_id)
+        xp = self.columns["xp"]
+        xp[slot] += amount
+        self.columns["last_active"][slot] = now
+        return xp[slot]
+
+    def get(self, user_id: int) -> Optional[MemberStats]:
+        slot = self.index.get(user_id)
+        if slot is None:
+            return None
+        return MemberStats(user_id, *(self.columns[name][slot] for name in COLUMNS))
+
+    def remove(self, user_id: int):
+        """Drop a member by moving the last slot into its place, keeping the arrays dense"""
+        slot = self.index.pop(user_id)
+        if slot is None:
+            return
+        last = len(self.user_ids) - 1
+        if slot != last:
+            moved = self.user_ids[last]
+            self.user_ids[slot] = moved
+            for column in self.columns.values():
+                column[slot] = column[last]
+            self.index.set(moved, slot)
+        self.user_ids.pop()
+        for column in self.columns.values():
+            column.pop()
+
+    def top(self, n: int = 10, column: str = "xp") -> List[Tuple[int, int]]:
+        """(user_id, value) of the n highest values, highest first"""
+        values = self.columns[column]
+        count = len(values)
+        if not count or n <= 0:
+            return []
+        if numpy is not None:
+            view = numpy.frombuffer(values, dtype=values.typecode)
+            if n < count:
+                slots = numpy.argpartition(view, count - n)[count - n:]
+            else:
+                slots = numpy.arange(count)
+            slots = slots[numpy.argsort(view[slots], kind="stable")[::-1]]
+            return [(self.user_ids[slot], values[slot]) for slot in slots.tolist()]
+        slots = heapq.nlargest(n, range(count), key=values.__getitem__)
+        return [(self.user_ids[slot], values[slot]) for slot in slots]
+
+    def rank(self, user_id: int, column: str = "xp") -> Optional[int]:
+        """1-based position by ``column``; ties share the better rank"""
+        slot = self.index.get(user_id)
+        if slot is None:
+            return None
+        values = self.columns[column]
+        own = values[slot]
+        if numpy is not None:
+            return int((numpy.frombuffer(values, dtype=values.typecode) > own).sum()) + 1
+        return sum(1 for value in values if value > own) + 1
+
+    def decay(self, factor: float, idle_before: Optional[int] = None, column: str = "xp") -> int:
+        """Multiply ``column`` by factor for members inactive since ``idle_before`` (everyone if None)"""
+        values = self.columns[column]
+        last_active = self.columns["last_active"]
+        if numpy is not None:
+            view = numpy.frombuffer(values, dtype=values.typecode)
+            if idle_before is None:
+                mask = numpy.ones(len(view), dtype=bool)
+            else:
+                mask = numpy.frombuffer(last_active, dtype=last_active.typecode) < idle_before
+            view[mask] = (view[mask] * factor).astype(view.dtype)
+            del view
+            return int(mask.sum())
+        changed = 0
+        for slot in range(len(values)):
+            if idle_before is None or last_active[slot] < idle_before:
+                values[slot] = int(values[slot] * factor)
+                changed += 1
+        return changed
+
+    def nbytes(self) -> int:
+        """Columns plus the sorted index; members still in the index's recent dict are not counted"""
+        return sum(column.itemsize * len(column) for column in self.columns.values()) + \
+            self.user_ids.itemsize * len(self.user_ids) + self.index.nbytes()
+
+    def rows(self) -> Iterator[MemberStats]:
+        for slot, user_id in enumerate(self.user_ids):
+            yield MemberStats(user_id, *(self.columns[name][slot] for name in COLUMNS))
+
+
+class MemberStatsStore:
+    """Per-guild GuildStats, loaded once from the users table and kept current by the XP handler"""
+
+    def __init__(self):
+        self._guilds: Dict[int, GuildStats] = {}
+        self.loaded = False
+
+    def guild(self, guild_id: int) -> GuildStats:
+        stats = self._guilds.get(guild_id)
+        if stats is None:
+            stats = self._guilds[guild_id] = GuildStats()
+        return stats
+
+    def get(self, guild_id: int) -> Optional[GuildStats]:
+        return self._guilds.get(guild_id)
+
+    def __len__(self):
+        return sum(len(stats) for stats in self._guilds.values())
+
+    def add_warning(self, guild_id: int, user_id: int):
+        """Mirror of the warnings bump in insert_mod_logs, which only touches existing rows"""
+        stats = self._guilds.get(guild_id)
+        member = stats.get(user_id) if stats is not None else None
+        if member is not None:
+            stats.upsert(user_id, warnings=member.warnings + 1)
+
+    def reset(self, guild_id: int, user_id: int):
+        """Mirror of a users row replaced with its defaults"""
+        self.guild(guild_id).upsert(user_id, **DEFAULTS)
+
+    def nbytes(self) -> int:
+        return sum(stats.nbytes() for stats in self._guilds.values())
+
+    def items(self) -> Iterator[Tuple[int, GuildStats]]:
+        return iter(self._guilds.items())
+
+    def restore(self, guilds: Dict[int, GuildStats]):
+        self._guilds = guilds
+        self.loaded = True
+
+    def load(self, db, batch: int = 50000):
+        """Stream the users table into the arrays (blocking; run in a thread)"""
+        conn = db.get_connection()
+        try:
+            cursor = conn.execute(
+                "SELECT guild_id, user_id, xp, level, coins, reputation, warnings, last_message FROM users"
+            )
+            guilds: Dict[int, GuildStats] = {}
+            while True:
+                rows = cursor.fetchmany(batch)
+                if not rows:
+                    break
+                for guild_id, user_id, xp, level, coins, reputation, warnings, last_message in rows:
+                    stats = guilds.get(guild_id)
+                    if stats is None:
+                        stats = guilds[guild_id] = GuildStats()
+                    # (user_id, guild_id) is the primary key, so every row is a new member
+                    stats.append(user_id, (xp or 0, level or 1, coins or 0, reputation or 0,
+                                           warnings or 0, epoch(last_message)))
+        finally:
+            conn.close()
+        for stats in guilds.values():
+            stats.index.merge()
+        self._guilds = guilds
+        self.loaded = True
+        logger.info("Loaded stats for %d members across %d guilds (%.1f MB of arrays)",
+                    len(self), len(guilds), self.nbytes() / 1024 / 1024)
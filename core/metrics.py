@@ -0,0 +1,92 @@
+"""In-process metrics: counters and timing summaries shared by every subsystem"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict
+
+
+class TimingStats:
+    """Count, total and max plus a window of recent samples for percentiles"""
+
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self, window: int = 512):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        samples = sorted(self.recent)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class Metrics:
+    """Thread-safe registry; the loop, worker threads and the watchdog all write here"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+        self.timings: Dict[str, TimingStats] = {}
+        self.gauges: Dict[str, Any] = {}
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            stats = self.timings.get(name)
+            if stats is None:
+                stats = self.timings[name] = TimingStats()
+            stats.add(seconds)
+
+    def gauge(self, name: str, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    @contextmanager
+    def timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timings": {name: stats.summary() for name, stats in self.timings.items()},
+            }
+
+    def slowest(self, prefix: str = "", limit: int = 10):
+        """(name, summary) pairs with the highest p99, for quick triage"""
+        with self._lock:
+            rows = [(name, stats.summary()) for name, stats in self.timings.items() if name.startswith(prefix)]
+        rows.sort(key=lambda row: row[1]["p99_ms"], reverse=True)
+        return rows[:limit]
+
+
+# Process-wide registry; the bot exposes it as bot.metrics
+metrics = Metrics()
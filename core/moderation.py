@@ -0,0 +1,206 @@
+"""Moderation executor: bulk deletes and rate-budgeted mass actions"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+import discord
+
+from core.modlog import ModLogEntry
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+class RateBudget:
+    """Token bucket shared by every concurrent call that spends from it"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = asyncio.get_running_loop().time()
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now"""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+class _Progress:
+    """Forwards progress at most once per interval, plus the final count"""
+
+    def __init__(self, callback: Optional[ProgressCallback], total: int, interval: float = 2.0):
+        self.callback = callback
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self._last = 0.0
+
+    async def advance(self, count: int = 1):
+        self.done += count
+        if self.callback is None:
+            return
+        now = asyncio.get_running_loop().time()
+        if self.done >= self.total or now - self._last >= self.interval:
+            self._last = now
+            try:
+                await self.callback(self.done, self.total)
+            except discord.HTTPException:
+                pass
+
+
+class BulkResult:
+    def __init__(self):
+        self.succeeded: List[int] = []
+        self.failed: List[int] = []
+
+    def __repr__(self):
+        return f"<BulkResult succeeded={len(self.succeeded)} failed={len(self.failed)}>"
+
+
+class ModerationExecutor:
+    """Runs purges and mass actions, then records them as one mod-log batch"""
+
+    BULK_CHUNK = 100
+    # Discord refuses bulk deletes for messages older than 14 days; keep a margin
+    BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+
+    def __init__(self, modlog, rate: float = 5.0, burst: int = 5, concurrency: int = 5, events=None):
+        self.modlog = modlog
+        # Anything with EventHub.publish(); each executed action goes to the live dashboard
+        self.events = events
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        # One bucket per guild, so a mass ban in one server never stalls moderation in another
+        self._budgets: Dict[int, RateBudget] = {}
+
+    def budget(self, guild_id: int) -> RateBudget:
+        budget = self._budgets.get(guild_id)
+        if budget is None:
+            budget = self._budgets[guild_id] = RateBudget(self.rate, self.burst)
+        return budget
+
+    async def purge(self, channel, limit: int, moderator_id: int, check=None,
+                    reason: Optional[str] = None, progress: Optional[ProgressCallback] = None) -> int:
+        """Delete up to ``limit`` recent messages; returns how many were removed"""
+        cutoff = discord.utils.utcnow() - self.BULK_MAX_AGE
+        recent, old = [], []
+        async for message in channel.history(limit=limit):
+            if check is not None and not check(message):
+                continue
+            (recent if message.created_at > cutoff else old).append(message)
+
+        tracker = _Progress(progress, len(recent) + len(old))
+        budget = self.budget(channel.guild.id)
+        deleted = 0
+        for start in range(0, len(recent), self.BULK_CHUNK):
+            chunk = recent[start:start + self.BULK_CHUNK]
+            await budget.acquire()
+            try:
+                await channel.delete_messages(chunk, reason=reason)
+                deleted += len(chunk)
+            except discord.HTTPException as e:
+                logger.warning("Bulk delete failed in %s: %s", channel.id, e)
+            await tracker.advance(len(chunk))
+
+        if old:
+            result = await self._fan_out(old, lambda message: message.delete(), tracker, budget, missing_ok=True)
+            deleted += len(result.succeeded)
+
+        if deleted:
+            self.modlog.log(channel.guild.id, None, moderator_id, "purge",
+                            reason or f"Deleted {deleted} messages in #{channel.name}")
+            self._publish(channel.guild.id, {"action": "purge", "channel_id": channel.id, "count": deleted,
+                                             "moderator_id": moderator_id, "reason": reason})
+        return deleted
+
+    async def run_bulk(self, guild, action: str, user_ids: Iterable[int], moderator_id: int,
+                       reason: Optional[str] = None, duration: Optional[int] = None,
+                       progress: Optional[ProgressCallback] = None) -> BulkResult:
+        """Apply kick/ban/unban/mute to many users concurrently under the rate budget"""
+        handler = ACTIONS.get(action)
+        if handler is None:
+            raise ValueError(f"Unknown moderation action: {action}")
+
+        async def execute(user_id):
+            await handler(guild, user_id, reason, duration)
+            self._publish(guild.id, {"action": action, "user_id": user_id, "moderator_id": moderator_id,
+                                     "reason": reason, "duration": duration})
+
+        targets = list(dict.fromkeys(user_ids))
+        tracker = _Progress(progress, len(targets))
+        result = await self._fan_out(targets, execute, tracker, self.budget(guild.id), key=lambda user_id: user_id)
+
+        timestamp = datetime.utcnow().isoformat()
+        self.modlog.log_many([
+            ModLogEntry(guild.id, user_id, moderator_id, action, reason, duration, timestamp)
+            for user_id in result.succeeded
+        ])
+        return result
+
+    def _publish(self, guild_id: int, data: dict):
+        if self.events is not None:
+            self.events.publish(guild_id, "moderation", data)
+
+    async def _fan_out(self, items: list, call, tracker: _Progress, budget: RateBudget,
+                       key=lambda item: item.id, missing_ok: bool = False) -> BulkResult:
+        result = BulkResult()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(item):
+            async with semaphore:
+                await budget.acquire()
+                try:
+                    await call(item)
+                    result.succeeded.append(key(item))
+                except discord.NotFound:
+                    (result.succeeded if missing_ok else result.failed).append(key(item))
+                except discord.HTTPException as e:
+                    logger.warning("Moderation call failed for %s: %s", key(item), e)
+                    result.failed.append(key(item))
+                await tracker.advance()
+
+        await asyncio.gather(*(run(item) for item in items))
+        return result
+
+
+async def _kick(guild, user_id, reason, duration):
+    await guild.kick(discord.Object(id=user_id), reason=reason)
+
+
+async def _ban(guild, user_id, reason, duration):
+    await guild.ban(discord.Object(id=user_id), reason=reason, delete_message_seconds=0)
+
+
+async def _unban(guild, user_id, reason, duration):
+    await guild.unban(discord.Object(id=user_id), reason=reason)
+
+
+async def _mute(guild, user_id, reason, duration):
+    member = guild.get_member(user_id) or await guild.fetch_member(user_id)
+    await member.timeout(timedelta(seconds=duration or 600), reason=reason)
+
+
+ACTIONS = {"kick": _kick, "ban": _ban, "unban": _unban, "mute": _mute}
@@ -0,0 +1,288 @@
+"""Moderation audit log: batched writer, log-channel fan-out and paginated queries"""
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+ACTION_ICONS = {
+    "warn": "⚠️",
+    "kick": "👢",
+    "ban": "🔨",
+    "unban": "🔓",
+    "mute": "🔇",
+    "unmute": "🔊",
+    "purge": "🧹",
+}
+
+class ModLogEntry(NamedTuple):
+    guild_id: int
+    user_id: Optional[int]
+    moderator_id: Optional[int]
+    action: str
+    reason: Optional[str]
+    duration: Optional[int]
+    timestamp: str
+
+
+def create_tables(cursor):
+    """The mod_logs table and the indexes backing the paginated queries below"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mod_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            user_id INTEGER,
+            moderator_id INTEGER,
+            action TEXT,
+            reason TEXT,
+            duration INTEGER,
+            timestamp TEXT
+        )
+    """)
+    create_indexes(cursor)
+
+
+def create_indexes(cursor):
+    """Indexes backing the paginated queries below"""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_logs_guild ON mod_logs (guild_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mod_logs_guild_user ON mod_logs (guild_id, user_id, id)")
+
+
+class ModLogWriter:
+    """Buffers mod_logs rows and hands them to the storage backend once per interval"""
+
+    def __init__(self, db, interval: float = 2.0, max_batch: int = 500, sender=None, member_stats=None):
+        self.db = db
+        self.interval = interval
+        self.max_batch = max_batch
+        self.sender = sender
+        # Warnings show in the in-memory stats straight away, like the row the flush updates
+        self.member_stats = member_stats
+        self._buffer: List[ModLogEntry] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def log(self, guild_id: int, user_id: Optional[int], moderator_id: Optional[int], action: str,
+            reason: Optional[str] = None, duration: Optional[int] = None) -> ModLogEntry:
+        """Queue a single moderation action; never touches the database directly"""
+        entry = ModLogEntry(guild_id, user_id, moderator_id, action, reason, duration,
+                            datetime.utcnow().isoformat())
+        self._push([entry])
+        return entry
+
+    def log_many(self, entries: List[ModLogEntry]):
+        """Queue a burst of actions (mass ban, purge) as one unit"""
+        if entries:
+            self._push(list(entries))
+
+    def _push(self, entries: List[ModLogEntry]):
+        self._buffer.extend(entries)
+        if self.sender is not None:
+            for entry in entries:
+                self.sender.enqueue(entry)
+        if self.member_stats is not None:
+            for entry in entries:
+                if entry.action == "warn" and entry.user_id:
+                    self.member_stats.add_warning(entry.guild_id, entry.user_id)
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Failed to flush mod logs: %s", e)
+
+    async def flush(self):
+        """Write everything buffered so far in a single transaction"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            try:
+                await self.db.backend.insert_mod_logs(batch)
+            except Exception:
+                # Put the batch back so the next interval retries it
+                self._buffer[:0] = batch
+                raise
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+class ModLogChannelSender:
+    """Sends mod-log entries to each guild's log channel, merging bursts into one embed"""
+
+    MAX_LISTED = 20
+
+    def __init__(self, bot, db, window: float = 3.0):
+        self.bot = bot
+        self.db = db
+        self.window = window
+        self._channels: Dict[int, int] = {}
+        self._pending: Dict[int, List[ModLogEntry]] = defaultdict(list)
+        self._timers: Dict[int, asyncio.Task] = {}
+
+    def load_channels(self):
+        """Read every configured guilds.mod_log_channel once"""
+        conn = self.db.get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT id, mod_log_channel FROM guilds WHERE mod_log_channel IS NOT NULL"
+            ).fetchall()
+        finally:
+            conn.close()
+        self._channels = {guild_id: channel_id for guild_id, channel_id in rows}
+        logger.info("Loaded %d mod-log channels", len(self._channels))
+
+    def set_channel(self, guild_id: int, channel_id: Optional[int]):
+        if channel_id:
+            self._channels[guild_id] = channel_id
+        else:
+            self._channels.pop(guild_id, None)
+
+    def channels(self) -> Dict[int, int]:
+        return dict(self._channels)
+
+    def restore_channels(self, channels: Dict[int, int]):
+        self._channels = dict(channels)
+
+    def enqueue(self, entry: ModLogEntry):
+        if entry.guild_id not in self._channels:
+            return
+        self._pending[entry.guild_id].append(entry)
+        if entry.guild_id not in self._timers:
+            self._timers[entry.guild_id] = asyncio.create_task(self._send_later(entry.guild_id))
+
+    async def _send_later(self, guild_id: int):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self._timers.pop(guild_id, None)
+        await self._send(guild_id, self._pending.pop(guild_id, []))
+
+    async def _send(self, guild_id: int, entries: List[ModLogEntry]):
+        channel = self.bot.get_channel(self._channels.get(guild_id, 0))
+        if not entries or channel is None:
+            return
+        try:
+            await channel.send(embed=self.build_embed(entries))
+        except discord.HTTPException as e:
+            logger.warning("Cannot send mod log to %s: %s", guild_id, e)
+
+    def build_embed(self, entries: List[ModLogEntry]) -> discord.Embed:
+        if len(entries) == 1:
+            entry = entries[0]
+            embed = discord.Embed(
+                title=f"{ACTION_ICONS.get(entry.action, '🛡️')} {entry.action.title()}",
+                color=0xff6b6b,
+                timestamp=datetime.fromisoformat(entry.timestamp)
+            )
+            if entry.user_id:
+                embed.add_field(name="User", value=f"<@{entry.user_id}>", inline=True)
+            if entry.moderator_id:
+                embed.add_field(name="Moderator", value=f"<@{entry.moderator_id}>", inline=True)
+            if entry.duration:
+                embed.add_field(name="Duration", value=f"{entry.duration}s", inline=True)
+            embed.add_field(name="Reason", value=entry.reason or "No reason provided", inline=False)
+            return embed
+
+        actions = Counter(e.action for e in entries)
+        moderators = {e.moderator_id for e in entries if e.moderator_id}
+        targets = [f"<@{e.user_id}>" for e in entries if e.user_id]
+        embed = discord.Embed(
+            title=f"🛡️ {len(entries)} Moderation Actions",
+            description="\n".join(
+                f"{ACTION_ICONS.get(action, '🛡️')} **{action.title()}** × {count}"
+                for action, count in actions.most_common()
+            ),
+            color=0xff6b6b,
+            timestamp=datetime.fromisoformat(entries[-1].timestamp)
+        )
+        if moderators:
+            embed.add_field(name="Moderators", value=" ".join(f"<@{m}>" for m in moderators), inline=False)
+        if targets:
+            listed = " ".join(targets[:self.MAX_LISTED])
+            if len(targets) > self.MAX_LISTED:
+                listed += f" … and {len(targets) - self.MAX_LISTED} more"
+            embed.add_field(name="Targets", value=listed, inline=False)
+        return embed
+
+    async def close(self):
+        for task in list(self._timers.values()):
+            task.cancel()
+        self._timers.clear()
+        pending, self._pending = self._pending, defaultdict(list)
+        for guild_id, entries in pending.items():
+            await self._send(guild_id, entries)
+
+
+MOD_LOG_COLUMNS = ("id", "user_id", "moderator_id", "action", "reason", "duration", "timestamp")
+
+
+def _mod_log_filter(guild_id: int, user_id: Optional[int], action: Optional[str],
+                    before_id: Optional[int] = None) -> Tuple[str, list]:
+    where = "guild_id = ?"
+    params: list = [guild_id]
+    if user_id is not None:
+        where += " AND user_id = ?"
+        params.append(user_id)
+    if action is not None:
+        where += " AND action = ?"
+        params.append(action)
+    if before_id is not None:
+        where += " AND id < ?"
+        params.append(before_id)
+    return where, params
+
+
+def fetch_mod_logs(conn, guild_id: int, user_id: Optional[int] = None, action: Optional[str] = None,
+                   before_id: Optional[int] = None, limit: int = 25,
+                   archive=None) -> Tuple[List[tuple], Optional[int]]:
+    """Keyset page of mod_logs and mod_logs_archive, newest first; returns (rows, cursor for the next page)
+
+    With a JsonlArchive, pages continue into rows retention moved to JSONL files.
+    """
+    where, params = _mod_log_filter(guild_id, user_id, action, before_id)
+    columns = ", ".join(MOD_LOG_COLUMNS)
+    # Both halves walk their (guild_id, ...) index in id order and are merged
+    query = (f"SELECT {columns} FROM mod_logs WHERE {where} "
+             f"UNION ALL SELECT {columns} FROM mod_logs_archive WHERE {where} ORDER BY id DESC LIMIT ?")
+    rows = conn.execute(query, params + params + [limit + 1]).fetchall()
+
+    if archive is not None and len(rows) <= limit:
+        older_than = rows[-1][0] if rows else before_id
+        records = archive.read(
+            "mod_logs", guild_id, before_id=older_than, limit=limit + 1 - len(rows),
+            match=lambda r: (user_id is None or r["user_id"] == user_id) and (action is None or r["action"] == action)
+        )
+        rows += [tuple(record[column] for column in MOD_LOG_COLUMNS) for record in records]
+
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def count_mod_logs(conn, guild_id: int, user_id: Optional[int] = None, action: Optional[str] = None) -> int:
+    """Rows in mod_logs and mod_logs_archive; JSONL archives are not counted"""
+    where, params = _mod_log_filter(guild_id, user_id, action)
+    query = (f"SELECT (SELECT COUNT(*) FROM mod_logs WHERE {where}) "
+             f"+ (SELECT COUNT(*) FROM mod_logs_archive WHERE {where})")
+    return conn.execute(query, params + params).fetchone()[0]
@@ -0,0 +1,138 @@
+"""Opt-in hot-path timers, a slow-query log and an on-demand sampling profiler"""
+import logging
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryProfiler:
+    """Settings read by TimedCursor; the bot updates them from config"""
+
+    def __init__(self, slow_threshold: float = 0.1, timing: bool = False):
+        # Seconds; 0 disables the slow-query log
+        self.slow_threshold = slow_threshold
+        # Per-statement timings in metrics, only while profiling is switched on
+        self.timing = timing
+
+    def finished(self, sql: str, seconds: float):
+        if self.timing:
+            metrics.observe(f"db.{_verb(sql)}", seconds)
+        if self.slow_threshold and seconds >= self.slow_threshold:
+            metrics.incr("db.slow_queries")
+            logger.warning("Slow query (%.1fms): %s", seconds * 1000, " ".join(sql.split())[:500])
+
+
+queries = QueryProfiler()
+
+
+def _verb(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].lower() if words else "empty"
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            queries.finished(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            queries.finished(sql, time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=TimedConnection) times every statement it runs"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class EventProfiler:
+    """Wall time of event handlers and commands, recorded only while enabled"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._commands: Dict[int, float] = {}
+
+    @contextmanager
+    def event(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.observe(f"event.{name}", time.perf_counter() - started)
+
+    def install(self, bot):
+        """Register global before/after invoke hooks for command timing"""
+        bot.before_invoke(self._before_command)
+        bot.after_invoke(self._after_command)
+
+    async def _before_command(self, ctx):
+        if self.enabled:
+            self._commands[id(ctx)] = time.perf_counter()
+
+    async def _after_command(self, ctx):
+        started = self._commands.pop(id(ctx), None)
+        if started is not None and ctx.command is not None:
+            metrics.observe(f"command.{ctx.command.qualified_name}", time.perf_counter() - started)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    # Keep the last two path components: enough to tell bot.py from discord/client.py
+    short = os.path.join(os.path.basename(os.path.dirname(path)), os.path.basename(path))
+    # co_qualname only exists from Python 3.11
+    return f"{short}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def sample_stacks(thread_id: int, duration: float, interval: float = 0.005) -> Counter:
+    """Sample one thread's stack until ``duration`` elapses (blocking; run in a worker thread)"""
+    stacks: Counter = Counter()
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        frame = sys._current_frames().get(thread_id)
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        if names:
+            stacks[";".join(reversed(names))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def collapsed(stacks: Counter) -> str:
+    """Brendan Gregg's collapsed format, ready for flamegraph.pl or speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def hottest_frames(stacks: Counter, limit: int = 5):
+    """Leaf frames that appeared in the most samples"""
+    leaves: Counter = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(";", 1)[-1]] += count
+    return leaves.most_common(limit)
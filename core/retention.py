@@ -0,0 +1,246 @@
+"""Retention: moves expired mod_logs, tickets and music_queue rows out of the hot tables in bounded batches
+
+Each table has a default policy that a guild can override in
+retention_policies. Expired rows go to ``<table>_archive`` (same ids, so
+keyset pagination carries on across both), to gzipped JSONL files per guild
+and month, or are deleted.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MODES = ("table", "jsonl", "delete")
+
+
+class ArchiveSpec(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+    time_column: str
+    # Only rows matching this are finished and may expire
+    condition: str = ""
+
+
+class Policy(NamedTuple):
+    keep_days: int
+    mode: str = "table"
+
+
+SPECS: Dict[str, ArchiveSpec] = {
+    "mod_logs": ArchiveSpec(
+        "mod_logs", ("id", "guild_id", "user_id", "moderator_id", "action", "reason", "duration", "timestamp"),
+        "timestamp"),
+    "tickets": ArchiveSpec(
+        "tickets", ("id", "guild_id", "user_id", "channel_id", "category_id", "status", "created_at", "closed_at"),
+        "closed_at", "status = 'closed'"),
+    "music_queue": ArchiveSpec(
+        "music_queue", ("id", "guild_id", "title", "url", "requested_by", "duration", "added_at"),
+        "added_at"),
+}
+
+# keep_days 0 keeps rows forever
+DEFAULT_POLICIES: Dict[str, Policy] = {
+    "mod_logs": Policy(180, "table"),
+    "tickets": Policy(30, "table"),
+    "music_queue": Policy(7, "jsonl"),
+}
+
+
+def create_tables(cursor):
+    """retention_policies plus one archive table per spec, indexed like the hot tables' paginated queries"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS retention_policies (
+            guild_id INTEGER,
+            table_name TEXT,
+            keep_days INTEGER,
+            mode TEXT,
+            PRIMARY KEY (guild_id, table_name)
+        )
+    """)
+    for spec in SPECS.values():
+        columns = ", ".join(("id INTEGER PRIMARY KEY",) + spec.columns[1:])
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {spec.table}_archive ({columns})")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{spec.table}_archive_guild ON {spec.table}_archive (guild_id, id)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_mod_logs_archive_guild_user ON mod_logs_archive (guild_id, user_id, id)"
+    )
+
+
+class JsonlArchive:
+    """Append-only gzipped JSONL per table, guild and month; read back newest first"""
+
+    def __init__(self, root: str = "archive"):
+        self.root = root
+
+    def _dir(self, table: str, guild_id: int) -> str:
+        return os.path.join(self.root, table, str(guild_id))
+
+    def append(self, spec: ArchiveSpec, rows: List[tuple]):
+        """Write rows (in spec.columns order); each call adds one gzip member per file touched"""
+        files: Dict[Tuple[int, str], List[str]] = {}
+        time_index = spec.columns.index(spec.time_column)
+        for row in rows:
+            record = dict(zip(spec.columns, row))
+            month = (row[time_index] or "")[:7] or "unknown"
+            files.setdefault((record["guild_id"], month), []).append(json.dumps(record, separators=(",", ":")))
+        for (guild_id, month), lines in files.items():
+            directory = self._dir(spec.table, guild_id)
+            os.makedirs(directory, exist_ok=True)
+            with gzip.open(os.path.join(directory, f"{month}.jsonl.gz"), "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read(self, table: str, guild_id: int, before_id: Optional[int] = None, limit: int = 25,
+             match: Optional[Callable[[dict], bool]] = None) -> List[dict]:
+        """Up to limit records with id < before_id, newest first"""
+        directory = self._dir(table, guild_id)
+        if not os.path.isdir(directory):
+            return []
+        found: Dict[int, dict] = {}
+        for name in sorted(os.listdir(directory), reverse=True):
+            for record in self._records(os.path.join(directory, name)):
+                if before_id is not None and record["id"] >= before_id:
+                    continue
+                if match is None or match(record):
+                    # A batch retried after a crash can be written twice; ids make that harmless
+                    found[record["id"]] = record
+            if len(found) >= limit:
+                break
+        return [found[record_id] for record_id in sorted(found, reverse=True)[:limit]]
+
+    @staticmethod
+    def _records(path: str):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except EOFError:
+            # A member still being appended; everything before it is complete
+            pass
+
+
+class RetentionEngine:
+    """Sweeps every table once per interval, in batches small enough to keep write locks short"""
+
+    def __init__(self, db, archive: JsonlArchive, interval: float = 3600.0, batch: int = 500,
+                 max_batches: int = 200, pause: float = 0.05):
+        self.db = db
+        self.archive = archive
+        self.interval = interval
+        self.batch = batch
+        # Per table and run, so one backlog cannot hold the sweep for long
+        self.max_batches = max_batches
+        self.pause = pause
+        self._task: Optional[asyncio.Task] = None
+
+    def policies(self, guild_id: int) -> Dict[str, Policy]:
+        """Effective policy per table for one guild (blocking)"""
+        conn = self.db.get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT table_name, keep_days, mode FROM retention_policies WHERE guild_id = ?", (guild_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+        policies = dict(DEFAULT_POLICIES)
+        policies.update({table: Policy(keep_days, mode) for table, keep_days, mode in rows if table in SPECS})
+        return policies
+
+    def set_policy(self, guild_id: int, table: str, keep_days: int, mode: str = "table"):
+        """Override one table's policy for a guild (blocking)"""
+        if table not in SPECS:
+            raise ValueError(f"Unknown table {table}; choose from {', '.join(SPECS)}")
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode}; choose from {', '.join(MODES)}")
+        if keep_days < 0:
+            raise ValueError("keep_days cannot be negative")
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO retention_policies (guild_id, table_name, keep_days, mode) "
+                             "VALUES (?, ?, ?, ?)", (guild_id, table, keep_days, mode))
+        finally:
+            conn.close()
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """One sweep over every table (blocking); returns rows moved per table"""
+        now = now or datetime.utcnow()
+        moved = {}
+        conn = self.db.get_connection()
+        try:
+            for table, spec in SPECS.items():
+                overrides = conn.execute(
+                    "SELECT guild_id, keep_days, mode FROM retention_policies WHERE table_name = ?", (table,)
+                ).fetchall()
+                # Guilds without an override share the default, swept in one pass
+                count = self._sweep(conn, spec, DEFAULT_POLICIES[table], now, (
+                    "guild_id NOT IN (SELECT guild_id FROM retention_policies WHERE table_name = ?)", (table,)))
+                for guild_id, keep_days, mode in overrides:
+                    count += self._sweep(conn, spec, Policy(keep_days, mode), now, ("guild_id = ?", (guild_id,)))
+                moved[table] = count
+                if count:
+                    metrics.incr(f"retention.{table}", count)
+        finally:
+            conn.close()
+        if any(moved.values()):
+            logger.info("Retention moved %s", ", ".join(f"{count} {table}" for table, count in moved.items()))
+        return moved
+
+    def _sweep(self, conn, spec: ArchiveSpec, policy: Policy, now: datetime, scope: Tuple[str, tuple]) -> int:
+        if not policy.keep_days:
+            return 0
+        cutoff = (now - timedelta(days=policy.keep_days)).isoformat()
+        where = f"{spec.time_column} < ? AND {scope[0]}"
+        if spec.condition:
+            where += f" AND {spec.condition}"
+        columns = ", ".join(spec.columns)
+        select = f"SELECT {columns} FROM {spec.table} WHERE {where} ORDER BY id LIMIT ?"
+
+        moved = 0
+        for _ in range(self.max_batches):
+            rows = conn.execute(select, (cutoff, *scope[1], self.batch)).fetchall()
+            if not rows:
+                break
+            ids = [(row[0],) for row in rows]
+            if policy.mode == "jsonl":
+                # Written before the delete commits; a crash in between only repeats rows, never loses them
+                self.archive.append(spec, rows)
+            with conn:
+                if policy.mode == "table":
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO {spec.table}_archive ({columns}) "
+                        f"VALUES ({', '.join('?' * len(spec.columns))})", rows)
+                conn.executemany(f"DELETE FROM {spec.table} WHERE id = ?", ids)
+            moved += len(rows)
+            if len(rows) < self.batch:
+                break
+            time.sleep(self.pause)
+        return moved
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run)
+            except Exception:
+                logger.exception("Retention sweep failed")
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        # A sweep already in its thread finishes its current batch transaction on its own
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,352 @@
+"""Warm-restart snapshots: the bot's in-memory state as one versioned, mmap-able file
+
+Layout (native byte order, recorded in the header):
+
+    header   magic "BSNP", version, byte order, taken_at, section count
+    entries  one per section: name, array typecode, crc32, offset, item count
+    sections raw typed-array bytes, each aligned to 8 bytes
+
+Every section is a flat typed array, so loading one is a checksum plus a
+memcpy out of the mapping. Anything committed after ``taken_at`` is read
+back from the database as a delta; the snapshot never has to be exact.
+"""
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from core.features import COLUMNS as FEATURE_COLUMNS
+from core.memberstats import COLUMNS as MEMBER_COLUMNS, GuildStats, SlotIndex, epoch
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"BSNP"
+VERSION = 1
+HEADER = struct.Struct("=4sHcxdI")
+ENTRY = struct.Struct("=32scxxxIQQ")
+ALIGN = 8
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+# Deltas start this long before taken_at, covering writes that raced the capture
+DELTA_MARGIN = 60.0
+# Older snapshots are ignored; the delta would cost more than a cold load
+MAX_AGE = 86400.0
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is missing a section, corrupt, or from another version"""
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_snapshot(path: str, taken_at: float, sections: Dict[str, array]) -> int:
+    """Write sections to path atomically (blocking); returns the file size"""
+    offset = _aligned(HEADER.size + ENTRY.size * len(sections))
+    entries = []
+    layout = []
+    for name, data in sections.items():
+        entries.append(ENTRY.pack(name.encode(), data.typecode.encode(), zlib.crc32(data), offset, len(data)))
+        layout.append((offset, data))
+        offset = _aligned(offset + data.itemsize * len(data))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER, taken_at, len(sections)))
+        f.write(b"".join(entries))
+        for start, data in layout:
+            f.seek(start)
+            data.tofile(f)
+        f.truncate(offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return offset
+
+
+class SnapshotReader:
+    """Maps a snapshot file read-only and hands out its sections as arrays"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._sections = self._parse()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _parse(self) -> Dict[str, Tuple[str, int, int, int]]:
+        if len(self._map) < HEADER.size:
+            raise SnapshotError("Snapshot is truncated")
+        magic, version, byte_order, self.taken_at, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise SnapshotError("Not a snapshot file")
+        if version != VERSION or byte_order != BYTE_ORDER:
+            raise SnapshotError(f"Snapshot version {version}{byte_order.decode()} is not "
+                                f"{VERSION}{BYTE_ORDER.decode()}")
+        sections = {}
+        for i in range(count):
+            name, typecode, crc, offset, items = ENTRY.unpack_from(self._map, HEADER.size + i * ENTRY.size)
+            sections[name.rstrip(b"\0").decode()] = (typecode.decode(), crc, offset, items)
+        return sections
+
+    def __contains__(self, name: str):
+        return name in self._sections
+
+    def array(self, name: str) -> array:
+        """Checksummed copy of a section"""
+        if name not in self._sections:
+            raise SnapshotError(f"Snapshot has no {name} section")
+        typecode, crc, offset, items = self._sections[name]
+        data = array(typecode)
+        end = offset + data.itemsize * items
+        if end > len(self._map):
+            raise SnapshotError(f"Snapshot section {name} is truncated")
+        with memoryview(self._map)[offset:end] as view:
+            if zlib.crc32(view) != crc:
+                raise SnapshotError(f"Snapshot section {name} fails its checksum")
+            data.frombytes(view)
+        return data
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _pack_ints(mapping: Dict[int, int], value_code: str = "Q") -> Tuple[array, array]:
+    return array("Q", mapping.keys()), array(value_code, mapping.values())
+
+
+def _pack_strings(mapping: Dict[int, str]) -> Tuple[array, array, array]:
+    blob = array("B")
+    ends = array("I")
+    for value in mapping.values():
+        blob.frombytes(value.encode())
+        ends.append(len(blob))
+    return array("Q", mapping.keys()), ends, blob
+
+
+def _unpack_strings(keys: array, ends: array, blob: array) -> Dict[int, str]:
+    data = blob.tobytes()
+    values = []
+    start = 0
+    for end in ends:
+        values.append(data[start:end].decode())
+        start = end
+    return dict(zip(keys, values))
+
+
+class StateSnapshots:
+    """Loads warm state from the last snapshot plus DB deltas, and writes it back on a timer and at shutdown
+
+    Covers feature flags, custom prefixes, mod-log and level-up channels and
+    the columnar member stats. Tickets are reloaded from the database as before.
+    """
+
+    def __init__(self, bot, db, path: str, interval: float = 300.0):
+        self.bot = bot
+        self.db = db
+        self.path = path
+        self.interval = interval
+        # Nothing is written until state has been loaded one way or the other
+        self.loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def load(self) -> str:
+        """Restore from the snapshot, or fall back to a full read of the database (blocking)"""
+        source = "snapshot"
+        started = time.perf_counter()
+        try:
+            restored = self._restore()
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Cannot use snapshot %s: %s", self.path, e)
+            restored = False
+        if not restored:
+            source = "database"
+            self.bot.features.load()
+            self.bot.guild_registry.load_prefixes()
+            self.bot.modlog_sender.load_channels()
+            self.bot.levelups.load_channels()
+            self.bot.member_stats.load(self.db)
+        self.loaded = True
+        elapsed = time.perf_counter() - started
+        metrics.observe(f"snapshot.load.{source}", elapsed)
+        logger.info("Warm state loaded from %s in %.1fms", source, elapsed * 1000)
+        return source
+
+    def _restore(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with SnapshotReader(self.path) as reader:
+            age = time.time() - reader.taken_at
+            if age > MAX_AGE:
+                logger.info("Snapshot is %.0fh old; loading from the database instead", age / 3600)
+                return False
+            taken_at = reader.taken_at
+            masks = dict(zip(reader.array("features.guilds"), reader.array("features.masks")))
+            prefixes = _unpack_strings(reader.array("prefixes.guilds"), reader.array("prefixes.ends"),
+                                       reader.array("prefixes.blob"))
+            modlog = dict(zip(reader.array("modlog.guilds"), reader.array("modlog.channels")))
+            levelups = dict(zip(reader.array("levelups.guilds"), reader.array("levelups.channels")))
+            members = self._read_members(reader)
+
+        # Everything parsed and checksummed: publish, then catch up from the database
+        self.bot.features.restore(masks)
+        self.bot.guild_registry.restore_prefixes(prefixes)
+        self.bot.modlog_sender.restore_channels(modlog)
+        self.bot.levelups.restore_channels(levelups)
+        self.bot.member_stats.restore(members)
+        guilds, users, total = self._apply_deltas(taken_at - DELTA_MARGIN)
+        if total != len(self.bot.member_stats):
+            # Every insert and update is in the delta, so a mismatch means rows were deleted
+            logger.info("Snapshot holds %d members but the database %d; loading from the database instead",
+                        len(self.bot.member_stats), total)
+            return False
+        logger.info("Restored snapshot from %s: %d guild and %d member changes since",
+                    datetime.utcfromtimestamp(taken_at).isoformat(timespec="seconds"), guilds, users)
+        return True
+
+    @staticmethod
+    def _read_members(reader: SnapshotReader) -> Dict[int, GuildStats]:
+        guild_ids = reader.array("members.guilds")
+        counts = reader.array("members.counts")
+        index_counts = reader.array("members.index_counts")
+        recent_counts = reader.array("members.recent_counts")
+        user_ids = reader.array("members.user_ids")
+        columns = {name: reader.array(f"members.{name}") for name in MEMBER_COLUMNS}
+        keys, slots = reader.array("members.index_keys"), reader.array("members.index_slots")
+        recent_keys, recent_slots = reader.array("members.recent_keys"), reader.array("members.recent_slots")
+
+        guilds = {}
+        start = index_start = recent_start = 0
+        for guild_id, count, index_count, recent_count in zip(guild_ids, counts, index_counts, recent_counts):
+            end, index_end, recent_end = start + count, index_start + index_count, recent_start + recent_count
+            stats = GuildStats()
+            stats.user_ids = user_ids[start:end]
+            stats.columns = {name: column[start:end] for name, column in columns.items()}
+            stats.index = SlotIndex()
+            stats.index.keys = keys[index_start:index_end]
+            stats.index.slots = slots[index_start:index_end]
+            stats.index.recent = dict(zip(recent_keys[recent_start:recent_end], recent_slots[recent_start:recent_end]))
+            guilds[guild_id] = stats
+            start, index_start, recent_start = end, index_end, recent_end
+        return guilds
+
+    def _apply_deltas(self, since: float) -> Tuple[int, int, int]:
+        """Re-read rows changed since the snapshot; also returns how many users rows the database holds"""
+        since_iso = datetime.utcfromtimestamp(since).isoformat()
+        conn = self.db.get_connection()
+        try:
+            guild_rows = conn.execute(
+                f"SELECT id, prefix, mod_log_channel, level_up_channel, {', '.join(FEATURE_COLUMNS.values())} "
+                "FROM guilds WHERE updated_at >= ?", (since_iso,)
+            ).fetchall()
+            user_rows = conn.execute(
+                "SELECT guild_id, user_id, xp, level, coins, reputation, warnings, last_message "
+                "FROM users WHERE updated_at >= ?", (since_iso,)
+            ).fetchall()
+            total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        finally:
+            conn.close()
+
+        bot = self.bot
+        bot.features.apply_rows([(row[0],) + tuple(row[4:]) for row in guild_rows])
+        for guild_id, prefix, mod_log_channel, level_up_channel, *_ in guild_rows:
+            bot.guild_registry.remember_prefix(guild_id, prefix)
+            bot.modlog_sender.set_channel(guild_id, mod_log_channel)
+            bot.levelups.set_channel(guild_id, level_up_channel)
+        for guild_id, user_id, xp, level, coins, reputation, warnings, last_message in user_rows:
+            bot.member_stats.guild(guild_id).upsert(
+                user_id, xp=xp or 0, level=level or 1, coins=coins or 0, reputation=reputation or 0,
+                warnings=warnings or 0, last_active=epoch(last_message))
+        return len(guild_rows), len(user_rows), total
+
+    def capture(self) -> Tuple[float, Dict[str, array]]:
+        """Copy the live state into flat arrays; runs on the loop so nothing mutates mid-copy"""
+        taken_at = time.time()
+        bot = self.bot
+        sections: Dict[str, array] = {}
+        sections["features.guilds"], sections["features.masks"] = _pack_ints(bot.features.masks(), "I")
+        (sections["prefixes.guilds"], sections["prefixes.ends"],
+         sections["prefixes.blob"]) = _pack_strings(bot.guild_registry.prefixes())
+        sections["modlog.guilds"], sections["modlog.channels"] = _pack_ints(bot.modlog_sender.channels())
+        sections["levelups.guilds"], sections["levelups.channels"] = _pack_ints(bot.levelups.channels())
+        sections.update(self._pack_members(bot.member_stats.items()))
+        return taken_at, sections
+
+    @staticmethod
+    def _pack_members(guilds) -> Dict[str, array]:
+        # extend() between arrays of one typecode is a memcpy, so this stays cheap on the loop
+        sections = {
+            "members.guilds": array("Q"), "members.counts": array("Q"),
+            "members.index_counts": array("Q"), "members.recent_counts": array("Q"),
+            "members.user_ids": array("Q"),
+            "members.index_keys": array("Q"), "members.index_slots": array("I"),
+            "members.recent_keys": array("Q"), "members.recent_slots": array("I"),
+        }
+        for name, code in MEMBER_COLUMNS.items():
+            sections[f"members.{name}"] = array(code)
+        for guild_id, stats in guilds:
+            sections["members.guilds"].append(guild_id)
+            sections["members.counts"].append(len(stats))
+            sections["members.index_counts"].append(len(stats.index.keys))
+            sections["members.recent_counts"].append(len(stats.index.recent))
+            sections["members.user_ids"].extend(stats.user_ids)
+            for name, column in stats.columns.items():
+                sections[f"members.{name}"].extend(column)
+            sections["members.index_keys"].extend(stats.index.keys)
+            sections["members.index_slots"].extend(stats.index.slots)
+            sections["members.recent_keys"].extend(stats.index.recent.keys())
+            sections["members.recent_slots"].extend(stats.index.recent.values())
+        return sections
+
+    async def save(self):
+        if not self.loaded:
+            return
+        async with self._lock:
+            started = time.perf_counter()
+            taken_at, sections = self.capture()
+            captured = time.perf_counter() - started
+            size = await asyncio.to_thread(write_snapshot, self.path, taken_at, sections)
+            metrics.observe("snapshot.capture", captured)
+            metrics.observe("snapshot.save", time.perf_counter() - started)
+            metrics.gauge("snapshot.bytes", size)
+            logger.info("Wrote snapshot %s (%.1f MB, %.1fms on the loop)", self.path, size / 1024 / 1024,
+                        captured * 1000)
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except Exception:
+                logger.exception("Failed to write snapshot")
+
+    async def close(self):
+        """Stop the timer and write a final snapshot; call after the other services have flushed"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self.save()
+        except Exception:
+            logger.exception("Failed to write snapshot")
@@ -0,0 +1,111 @@
+"""Startup helpers: lazy imports, phase timing and skipping redundant tree syncs"""
+import hashlib
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+TREE_HASH_PATH = "config/tree_hash.json"
+
+
+class LazyModule:
+    """Module proxy that imports on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            started = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            logger.info("Imported %s on first use in %.0fms", self._name, (time.perf_counter() - started) * 1000)
+        return getattr(self._module, attr)
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+class StartupTimer:
+    """Records how long each startup phase takes"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def mark(self, name: str):
+        """Record time elapsed since the timer was created"""
+        self.phases[name] = time.perf_counter() - self.started
+
+    def report(self) -> str:
+        width = max((len(name) for name in self.phases), default=0)
+        lines = [f"{name.ljust(width)}  {seconds * 1000:8.1f}ms" for name, seconds in self.phases.items()]
+        return "\n".join(lines)
+
+
+def available_extensions(names: Iterable[str], package: str = "cogs") -> List[str]:
+    """Qualified names of the enabled cogs that actually exist on disk"""
+    extensions = []
+    for name in names:
+        qualified = f"{package}.{name}"
+        if importlib.util.find_spec(qualified) is None:
+            logger.info("Skipping %s: not installed", qualified)
+            continue
+        extensions.append(qualified)
+    return extensions
+
+
+def command_tree_hash(tree) -> str:
+    """Stable hash of the global application command payload"""
+    payload = []
+    for command in tree.get_commands():
+        try:
+            payload.append(command.to_dict(tree))
+        except TypeError:
+            payload.append(command.to_dict())
+    payload.sort(key=lambda item: item.get("name", ""))
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _read_hashes(path: str) -> Dict[str, str]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+async def sync_tree_if_changed(bot, path: str = TREE_HASH_PATH) -> bool:
+    """Sync global commands only when they differ from the last successful sync"""
+    key = str(bot.application_id)
+    digest = command_tree_hash(bot.tree)
+    hashes = _read_hashes(path)
+    if hashes.get(key) == digest:
+        logger.info("Command tree unchanged, skipping sync")
+        return False
+
+    await bot.tree.sync()
+    hashes[key] = digest
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(hashes, f, indent=4)
+    os.replace(tmp_path, path)
+    logger.info("Slash commands synced!")
+    return True
@@ -0,0 +1,30 @@
+"""Pluggable storage backends for the write-heavy paths (XP, mod logs, bulk imports)"""
+import logging
+from typing import Optional
+
+from core.storage.base import StorageBackend, UserRow, XpDelta
+from core.storage.sqlite import SQLiteBackend
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_SCHEMES = ("postgres://", "postgresql://")
+
+
+class UnsupportedBackend(RuntimeError):
+    """Raised when DATABASE_URL selects a backend the bot cannot run on yet"""
+
+
+async def open_backend(url: Optional[str], sqlite_path: str) -> StorageBackend:
+    """The bot's SQLite file; a Postgres DATABASE_URL is refused"""
+    if url and url.startswith(POSTGRES_SCHEMES):
+        # Mod-log queries, retention, snapshots, maintenance and the dashboard read the SQLite file
+        # directly, so a Postgres backend for the write paths alone would split the data in two
+        raise UnsupportedBackend("DATABASE_URL points at Postgres, which the bot does not support yet; "
+                                 "unset it to run on SQLite")
+    backend = SQLiteBackend(sqlite_path)
+    await backend.open()
+    logger.info("Storage backend: %s", backend.name)
+    return backend
+
+
+__all__ = ["StorageBackend", "SQLiteBackend", "UnsupportedBackend", "UserRow", "XpDelta", "open_backend"]
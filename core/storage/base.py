@@ -0,0 +1,62 @@
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+
+class XpDelta(NamedTuple):
+    user_id: int
+    guild_id: int
+    xp: int
+    last_message: str
+
+
+class UserRow(NamedTuple):
+    user_id: int
+    guild_id: int
+    xp: int
+    level: int
+    coins: int
+    reputation: int
+    warnings: int = 0
+    last_message: Optional[str] = None
+    created_at: Optional[str] = None
+
+
+class StorageBackend:
+    """Operations every backend implements; all methods are coroutines"""
+
+    name = "base"
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def add_xp(self, deltas: Sequence[XpDelta]):
+        """Add XP to many members at once, creating rows as needed"""
+        raise NotImplementedError
+
+    async def set_levels(self, levels: Iterable[tuple]):
+        """(level, user_id, guild_id) rows"""
+        raise NotImplementedError
+
+    async def reset_user(self, user_id: int, guild_id: int):
+        """Start a (re)joining member over from a fresh row with the column defaults"""
+        raise NotImplementedError
+
+    async def upsert_users(self, rows: Sequence[UserRow]):
+        """Bulk load member rows, overwriting stats of rows that already exist"""
+        raise NotImplementedError
+
+    async def insert_mod_logs(self, entries: Sequence[tuple]):
+        """Append mod_logs rows and bump users.warnings for warn actions"""
+        raise NotImplementedError
+
+    async def get_user(self, user_id: int, guild_id: int) -> Optional[UserRow]:
+        raise NotImplementedError
+
+    async def top_users(self, guild_id: int, limit: int = 10) -> List[UserRow]:
+        raise NotImplementedError
+
+    async def rank(self, user_id: int, guild_id: int) -> Optional[int]:
+        """1-based XP rank within the guild, None for members without a row"""
+        raise NotImplementedError
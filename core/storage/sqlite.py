@@ -0,0 +1,155 @@
+import asyncio
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence
+
+from core.profiling import TimedConnection
+from core.storage.base import StorageBackend, UserRow, XpDelta
+
+USER_COLUMNS = "user_id, guild_id, xp, level, coins, reputation, warnings, last_message, created_at"
+# Every write to users stamps updated_at, which is what snapshot deltas are read by
+UPDATED_NOW = "strftime('%Y-%m-%dT%H:%M:%f', 'now')"
+
+
+def create_tables(cursor):
+    """The users table; the bot, the dashboard and offline tools all create it through here"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER,
+            guild_id INTEGER,
+            xp INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            coins INTEGER DEFAULT 100,
+            last_message TEXT,
+            warnings INTEGER DEFAULT 0,
+            reputation INTEGER DEFAULT 0,
+            created_at TEXT,
+            PRIMARY KEY (user_id, guild_id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_guild_xp ON users (guild_id, xp DESC)")
+    create_columns(cursor)
+
+
+def create_columns(cursor):
+    """Add users.updated_at to databases created before it existed"""
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(users)").fetchall()}
+    if "updated_at" not in columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN updated_at TEXT")
+        # Older writes left no trace, so the next snapshot restore re-reads every row once
+        cursor.execute("UPDATE users SET updated_at = ?", (datetime.utcnow().isoformat(),))
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_updated ON users (updated_at)")
+
+
+def warn_counts(entries: Sequence[tuple]) -> List[tuple]:
+    """(count, user_id, guild_id) for every member warned in a mod_logs batch"""
+    warned = Counter((entry[1], entry[0]) for entry in entries if entry[3] == "warn" and entry[1])
+    return [(count, user_id, guild_id) for (user_id, guild_id), count in warned.items()]
+
+
+class SQLiteBackend(StorageBackend):
+    """Runs each batch as one transaction on a worker thread"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, factory=TimedConnection)
+
+    def _run(self, fn, *args):
+        conn = self._connect()
+        try:
+            with conn:
+                return fn(conn, *args)
+        finally:
+            conn.close()
+
+    async def add_xp(self, deltas: Sequence[XpDelta]):
+        if deltas:
+            await asyncio.to_thread(self._run, self._add_xp, list(deltas))
+
+    @staticmethod
+    def _add_xp(conn, deltas):
+        conn.executemany(f"""
+            INSERT INTO users (user_id, guild_id, xp, last_message, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, {UPDATED_NOW})
+            ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                xp = xp + excluded.xp,
+                last_message = excluded.last_message,
+                updated_at = excluded.updated_at
+        """, [(d.user_id, d.guild_id, d.xp, d.last_message, d.last_message) for d in deltas])
+
+    async def set_levels(self, levels: Iterable[tuple]):
+        levels = list(levels)
+        if levels:
+            await asyncio.to_thread(self._run, lambda conn: conn.executemany(
+                f"UPDATE users SET level = ?, updated_at = {UPDATED_NOW} WHERE user_id = ? AND guild_id = ?", levels
+            ))
+
+    async def reset_user(self, user_id: int, guild_id: int):
+        await asyncio.to_thread(self._run, lambda conn: conn.execute(
+            f"INSERT OR REPLACE INTO users (user_id, guild_id, created_at, updated_at) VALUES (?, ?, ?, {UPDATED_NOW})",
+            (user_id, guild_id, datetime.utcnow().isoformat())
+        ))
+
+    async def upsert_users(self, rows: Sequence[UserRow]):
+        if rows:
+            await asyncio.to_thread(self._run, self.upsert_users_sync, list(rows))
+
+    @staticmethod
+    def upsert_users_sync(conn, rows: Sequence[UserRow]):
+        """Usable directly by offline tools that manage their own connection"""
+        conn.executemany(f"""
+            INSERT INTO users ({USER_COLUMNS}, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, {UPDATED_NOW})
+            ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                xp = excluded.xp,
+                level = excluded.level,
+                coins = excluded.coins,
+                reputation = excluded.reputation,
+                warnings = excluded.warnings,
+                last_message = COALESCE(excluded.last_message, users.last_message),
+                updated_at = excluded.updated_at
+        """, rows)
+
+    async def insert_mod_logs(self, entries: Sequence[tuple]):
+        if entries:
+            await asyncio.to_thread(self._run, self._insert_mod_logs, list(entries))
+
+    @staticmethod
+    def _insert_mod_logs(conn, entries):
+        conn.executemany("""
+            INSERT INTO mod_logs (guild_id, user_id, moderator_id, action, reason, duration, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, entries)
+        counts = warn_counts(entries)
+        if counts:
+            conn.executemany(
+                f"UPDATE users SET warnings = warnings + ?, updated_at = {UPDATED_NOW} WHERE user_id = ? AND guild_id = ?",
+                counts
+            )
+
+    async def get_user(self, user_id: int, guild_id: int) -> Optional[UserRow]:
+        row = await asyncio.to_thread(self._run, lambda conn: conn.execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)
+        ).fetchone())
+        return UserRow(*row) if row else None
+
+    async def top_users(self, guild_id: int, limit: int = 10) -> List[UserRow]:
+        rows = await asyncio.to_thread(self._run, lambda conn: conn.execute(
+            f"SELECT {USER_COLUMNS} FROM users WHERE guild_id = ? ORDER BY xp DESC LIMIT ?", (guild_id, limit)
+        ).fetchall())
+        return [UserRow(*row) for row in rows]
+
+    async def rank(self, user_id: int, guild_id: int) -> Optional[int]:
+        return await asyncio.to_thread(self._run, self._rank, user_id, guild_id)
+
+    @staticmethod
+    def _rank(conn, user_id, guild_id):
+        row = conn.execute("SELECT xp FROM users WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)).fetchone()
+        if row is None:
+            return None
+        # Range scan on idx_users_guild_xp
+        return conn.execute("SELECT COUNT(*) + 1 FROM users WHERE guild_id = ? AND xp > ?", (guild_id, row[0])).fetchone()[0]
@@ -0,0 +1,230 @@
+"""Ticket service: in-memory open-ticket index and per-guild channel creation queue"""
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_NAME = "🎫 TICKETS"
+
+
+class OpenTicket(NamedTuple):
+    id: int
+    guild_id: int
+    user_id: int
+    channel_id: int
+    category_id: int
+
+
+class TicketQueueFull(Exception):
+    """Raised when a guild already has too many ticket channels waiting to be created"""
+
+
+class _GuildQueue:
+    """Serialises channel creation for one guild; the worker exits once idle"""
+
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
+        # Unbounded: the cap is checked per submit so live changes to it apply to existing queues
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker: Optional[asyncio.Task] = None
+        self.on_change = on_change
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def submit(self, job, maxsize: int) -> asyncio.Future:
+        if self.queue.qsize() >= maxsize:
+            raise TicketQueueFull()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((job, future))
+        self._changed()
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._drain())
+        return future
+
+    async def _drain(self):
+        while not self.queue.empty():
+            job, future = self.queue.get_nowait()
+            self._changed()
+            try:
+                result = await job()
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+
+class TicketService:
+    """Creates and closes tickets without racing on double clicks"""
+
+    def __init__(self, db, max_pending_per_guild: int = 25, events=None):
+        self.db = db
+        self._max_pending = max_pending_per_guild
+        # Anything with EventHub.publish(); queue adds, removals and resizes go to the live dashboard
+        self.events = events
+        self._open: Dict[Tuple[int, int], OpenTicket] = {}
+        self._by_channel: Dict[int, OpenTicket] = {}
+        self._locks: Dict[Tuple[int, int], asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._lock_users: Counter = Counter()
+        self._categories: Dict[int, int] = {}
+        self._queues: Dict[int, _GuildQueue] = {}
+
+    @property
+    def max_pending_per_guild(self) -> int:
+        return self._max_pending
+
+    @max_pending_per_guild.setter
+    def max_pending_per_guild(self, size: int):
+        if size == self._max_pending:
+            return
+        self._max_pending = size
+        for guild_id in self._queues:
+            self._publish_queue(guild_id)
+
+    def _publish_queue(self, guild_id: int):
+        if self.events is None:
+            return
+        queue = self._queues.get(guild_id)
+        self.events.publish(guild_id, "ticket_queue", {
+            "waiting": queue.queue.qsize() if queue is not None else 0, "capacity": self._max_pending
+        })
+
+    def load(self):
+        """Build the open-ticket index from the tickets table"""
+        conn = self.db.get_connection()
+        try:
+            rows = conn.execute(
+                "SELECT id, guild_id, user_id, channel_id, category_id FROM tickets WHERE status = 'open'"
+            ).fetchall()
+        finally:
+            conn.close()
+        self._open.clear()
+        self._by_channel.clear()
+        for row in rows:
+            self._index(OpenTicket(*row))
+        logger.info("Loaded %d open tickets", len(self._open))
+
+    def _index(self, ticket: OpenTicket):
+        self._open[(ticket.guild_id, ticket.user_id)] = ticket
+        self._by_channel[ticket.channel_id] = ticket
+        self._categories.setdefault(ticket.guild_id, ticket.category_id)
+
+    def get_open(self, guild_id: int, user_id: int) -> Optional[OpenTicket]:
+        return self._open.get((guild_id, user_id))
+
+    def get_by_channel(self, channel_id: int) -> Optional[OpenTicket]:
+        return self._by_channel.get(channel_id)
+
+    async def open_ticket(self, guild: discord.Guild, member: discord.Member) -> Tuple[OpenTicket, bool]:
+        """Return the member's open ticket, creating one if needed; second item is True when created"""
+        key = (guild.id, member.id)
+        lock = self._locks[key]
+        self._lock_users[key] += 1
+        try:
+            async with lock:
+                existing = self._open.get(key)
+                if existing is not None:
+                    return existing, False
+
+                queue = self._queues.get(guild.id)
+                if queue is None:
+                    queue = self._queues[guild.id] = _GuildQueue(lambda: self._publish_queue(guild.id))
+                channel = await queue.submit(lambda: self._create_channel(guild, member), self.max_pending_per_guild)
+
+                created_at = datetime.utcnow().isoformat()
+                try:
+                    ticket_id = await asyncio.to_thread(
+                        self._insert, guild.id, member.id, channel.id, channel.category_id, created_at
+                    )
+                except Exception:
+                    await self._discard_channel(channel)
+                    raise
+                ticket = OpenTicket(ticket_id, guild.id, member.id, channel.id, channel.category_id)
+                self._index(ticket)
+                return ticket, True
+        finally:
+            # Drop the lock once nobody is holding or waiting on it
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    async def close_ticket(self, ticket: OpenTicket):
+        self._open.pop((ticket.guild_id, ticket.user_id), None)
+        self._by_channel.pop(ticket.channel_id, None)
+        await asyncio.to_thread(self._mark_closed, ticket.id, datetime.utcnow().isoformat())
+
+    async def _get_category(self, guild: discord.Guild) -> discord.CategoryChannel:
+        category = guild.get_channel(self._categories.get(guild.id, 0))
+        if not isinstance(category, discord.CategoryChannel):
+            category = discord.utils.get(guild.categories, name=CATEGORY_NAME)
+            if category is None:
+                category = await guild.create_category(CATEGORY_NAME)
+            self._categories[guild.id] = category.id
+        return category
+
+    async def _create_channel(self, guild: discord.Guild, member: discord.Member) -> discord.TextChannel:
+        category = await self._get_category(guild)
+        overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            member: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+            guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True)
+        }
+        channel = await guild.create_text_channel(
+            f"ticket-{member.name}",
+            category=category,
+            overwrites=overwrites
+        )
+
+        welcome_embed = discord.Embed(
+            title="🎫 Support Ticket",
+            description=f"Hello {member.mention}! Staff will be with you shortly.\n\n"
+                        "Please describe your issue in detail.",
+            color=0x3498db
+        )
+        try:
+            await channel.send(embed=welcome_embed)
+        except BaseException:
+            await self._discard_channel(channel)
+            raise
+        return channel
+
+    @staticmethod
+    async def _discard_channel(channel: discord.TextChannel):
+        """Delete a channel whose ticket could not be set up, so a retry starts clean"""
+        try:
+            await channel.delete(reason="Ticket setup failed")
+        except discord.HTTPException as e:
+            logger.warning("Cannot delete orphaned ticket channel %s: %s", channel.id, e)
+
+    def _insert(self, guild_id: int, user_id: int, channel_id: int, category_id: int, created_at: str) -> int:
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO tickets (guild_id, user_id, channel_id, category_id, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (guild_id, user_id, channel_id, category_id, created_at)
+                )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def _mark_closed(self, ticket_id: int, closed_at: str):
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                conn.execute("UPDATE tickets SET status = 'closed', closed_at = ? WHERE id = ?",
+                             (closed_at, ticket_id))
+        finally:
+            conn.close()
+
+
+def create_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status, guild_id, user_id)")
@@ -0,0 +1,141 @@
+"""Persistent UI components shared by every message that carries them"""
+import asyncio
+from datetime import datetime
+
+import discord
+from discord.ui import View, Button, Select, Modal, TextInput
+
+from core.content import MENU_EMBEDS, MENU_OPTIONS
+from core.tickets import TicketQueueFull
+
+
+class MainMenuView(View):
+    """Help menu; one registered instance serves every help message"""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.select(
+        custom_id="main_menu:select",
+        placeholder="🎮 Choose a feature to explore...",
+        options=MENU_OPTIONS
+    )
+    async def menu_select(self, interaction: discord.Interaction, select: Select):
+        embed = MENU_EMBEDS.get(select.values[0])
+        if embed is None:
+            # Menus sent before the values were made stable carry label strings
+            await interaction.response.send_message("❌ This menu is outdated, run `/help` again.", ephemeral=True)
+            return
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+class QuickActionsView(View):
+    """Welcome-message buttons; one registered instance serves every welcome"""
+
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="🎵 Play Music", style=discord.ButtonStyle.success, emoji="🎵",
+                       custom_id="quick_actions:play_music")
+    async def play_music(self, interaction: discord.Interaction, button: Button):
+        modal = PlayMusicModal()
+        await interaction.response.send_modal(modal)
+
+    @discord.ui.button(label="📊 Server Stats", style=discord.ButtonStyle.primary, emoji="📊",
+                       custom_id="quick_actions:server_stats")
+    async def server_stats(self, interaction: discord.Interaction, button: Button):
+        guild = interaction.guild
+
+        # Get database stats
+        active_users = await asyncio.to_thread(_count_users, interaction.client.db, guild.id)
+
+        embed = discord.Embed(
+            title=f"📊 {guild.name} Statistics",
+            color=0x3498db,
+            timestamp=datetime.utcnow()
+        )
+        embed.set_thumbnail(url=guild.icon.url if guild.icon else None)
+        embed.add_field(name="👥 Total Members", value=f"{guild.member_count:,}", inline=True)
+        embed.add_field(name="🤖 Bots", value=f"{len([m for m in guild.members if m.bot]):,}", inline=True)
+        embed.add_field(name="👨‍💻 Humans", value=f"{len([m for m in guild.members if not m.bot]):,}", inline=True)
+        embed.add_field(name="📈 Active Users", value=f"{active_users:,}", inline=True)
+        embed.add_field(name="💬 Text Channels", value=f"{len(guild.text_channels):,}", inline=True)
+        embed.add_field(name="🔊 Voice Channels", value=f"{len(guild.voice_channels):,}", inline=True)
+        embed.add_field(name="😎 Roles", value=f"{len(guild.roles):,}", inline=True)
+        embed.add_field(name="😀 Emojis", value=f"{len(guild.emojis):,}", inline=True)
+        embed.add_field(name="🎮 Boosts", value=f"{guild.premium_subscription_count:,}", inline=True)
+        embed.add_field(name="📅 Created", value=guild.created_at.strftime("%B %d, %Y"), inline=False)
+
+        if guild.owner:
+            embed.add_field(name="👑 Owner", value=guild.owner.mention, inline=False)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    @discord.ui.button(label="🎫 Create Ticket", style=discord.ButtonStyle.secondary, emoji="🎫",
+                       custom_id="quick_actions:create_ticket")
+    async def create_ticket(self, interaction: discord.Interaction, button: Button):
+        await open_ticket_for(interaction)
+
+
+def _count_users(db, guild_id: int) -> int:
+    conn = db.get_connection()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM users WHERE guild_id = ?", (guild_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+async def open_ticket_for(interaction: discord.Interaction):
+    """Open (or point to) the user's support ticket"""
+    tickets = interaction.client.tickets
+    existing = tickets.get_open(interaction.guild_id, interaction.user.id)
+    if existing:
+        await interaction.response.send_message("❌ You already have an open ticket!", ephemeral=True)
+        return
+
+    # Channel creation is queued per guild, so it may take a moment under load
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        ticket, created = await tickets.open_ticket(interaction.guild, interaction.user)
+    except TicketQueueFull:
+        await interaction.followup.send("⏳ Lots of tickets are being opened right now, please try again in a minute.", ephemeral=True)
+        return
+
+    if not created:
+        await interaction.followup.send("❌ You already have an open ticket!", ephemeral=True)
+        return
+
+    embed = discord.Embed(
+        title="🎫 Ticket Created",
+        description=f"Your support ticket has been created: <#{ticket.channel_id}>",
+        color=0x2ecc71
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+
+class PlayMusicModal(Modal):
+    def __init__(self):
+        super().__init__(title="🎵 Play Music")
+
+        self.song_input = TextInput(
+            label="Song Name or URL",
+            placeholder="Enter a YouTube URL or search term...",
+            required=True,
+            max_length=500
+        )
+        self.add_item(self.song_input)
+
+    async def on_submit(self, interaction: discord.Interaction):
+        if not interaction.user.voice:
+            await interaction.response.send_message("❌ You need to be in a voice channel!", ephemeral=True)
+            return
+
+        await interaction.response.send_message(f"🎵 Searching for: `{self.song_input.value}`", ephemeral=True)
+        # Music functionality would be handled by the music cog
+
+
+def send_only(view: View) -> View:
+    """Stop a view so sends render its components without storing it per message;
+    clicks are still dispatched by the instance registered with add_view"""
+    view.stop()
+    return view
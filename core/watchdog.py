@@ -0,0 +1,100 @@
+"""Event-loop watchdog: a thread that notices when the loop stops turning and says who blocked it"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Deque, NamedTuple, Optional
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Stall(NamedTuple):
+    at: str
+    duration: float
+    task: str
+    stack: str
+
+
+class LoopWatchdog:
+    """A heartbeat task stamps the time; a daemon thread reports when the stamp goes stale"""
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05, history: int = 20):
+        # Seconds the loop may go without a heartbeat before it counts as blocked; 0 disables
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls: Deque[Stall] = deque(maxlen=history)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._beat_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._current = None  # (last beat before the stall, task name, stack)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._beat_task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            metrics.observe("loop.lag", max(0.0, now - expected))
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            if not self.threshold:
+                continue
+            last_beat = self._last_beat
+            blocked = time.monotonic() - last_beat
+            if blocked >= self.threshold + self.interval:
+                if self._current is None:
+                    self._begin(last_beat, blocked)
+            elif self._current is not None:
+                self._end(last_beat)
+
+    def _running_task(self) -> str:
+        # Read from this thread without touching the loop; the task can't change while it's blocked
+        task = asyncio.current_task(self._loop)
+        return task.get_name() if task is not None else "loop callback"
+
+    def _begin(self, last_beat: float, blocked: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        task = self._running_task()
+        self._current = (last_beat, task, stack)
+        metrics.incr("loop.stalls")
+        logger.warning("Event loop blocked for %.0fms in %s\n%s", blocked * 1000, task, stack.rstrip())
+
+    def _end(self, resumed_beat: float):
+        last_beat, task, stack = self._current
+        self._current = None
+        duration = max(0.0, resumed_beat - last_beat - self.interval)
+        metrics.observe("loop.stall", duration)
+        metrics.gauge("loop.last_stall", {"task": task, "duration_ms": round(duration * 1000, 1)})
+        self.stalls.append(Stall(datetime.utcnow().isoformat(), duration, task, stack))
+        logger.warning("Event loop unblocked after ~%.0fms (%s)", duration * 1000, task)
+
+    def stop(self):
+        self._stop.set()
+        if self._beat_task is not None:
+            self._beat_task.cancel()
+            self._beat_task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
@@ -0,0 +1,177 @@
+"""Read side of the dashboard API: read-only connections, keyset-paginated queries and a short-TTL response cache"""
+import hashlib
+import hmac
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+GUILD_COLUMNS = ("id", "name", "prefix", "created_at")
+MEMBER_COLUMNS = ("user_id", "xp", "level", "coins", "warnings", "reputation", "last_message")
+TICKET_COLUMNS = ("id", "user_id", "channel_id", "status", "created_at", "closed_at")
+
+
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+
+def is_loopback(host: Optional[str]) -> bool:
+    return host in LOOPBACK_HOSTS
+
+
+def token_matches(expected: str, presented: Optional[str]) -> bool:
+    """Constant-time comparison, so response timing doesn't leak the token"""
+    return presented is not None and hmac.compare_digest(presented.encode(), expected.encode())
+
+
+def enable_wal(cursor):
+    """WAL lets dashboard readers run alongside the bot's writer instead of blocking it; persists in the file"""
+    cursor.execute("PRAGMA journal_mode = WAL")
+
+
+def create_indexes(cursor):
+    """Indexes backing the keyset queries below"""
+    # user_id is the tie-breaker of the leaderboard order, so it has to be in the index too
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_guild_xp_user ON users (guild_id, xp DESC, user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tickets_guild ON tickets (guild_id, id)")
+
+
+class ReadOnlyDatabase:
+    """A small pool of read-only connections for web threads, separate from the bot's writer"""
+
+    def __init__(self, path: str, size: int = 4, busy_timeout: float = 1.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        # Connections are opened lazily, so a missing file only fails the request that needs it
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False,
+                               timeout=self.busy_timeout)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._slots:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            try:
+                yield conn
+            except sqlite3.Error:
+                # Don't hand a connection in an unknown state to the next request
+                conn.close()
+                raise
+            else:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._pool.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class ResponseCache:
+    """JSON bodies with their ETags, kept for ttl seconds; a hit never touches the database"""
+
+    def __init__(self, ttl: float = 5.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, compute: Callable[[], object]) -> Tuple[str, bytes]:
+        """(etag, body) for key, calling compute for a JSON-serialisable payload on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                metrics.incr("api.cache_hits")
+                return entry[1], entry[2]
+        # Computed outside the lock; two concurrent misses both query, which is cheaper than serialising them
+        metrics.incr("api.cache_misses")
+        body = json.dumps(compute(), separators=(",", ":")).encode()
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag, body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def fetch_guilds(conn, after_id: Optional[int] = None, limit: int = 50) -> Tuple[List[tuple], Optional[int]]:
+    """Keyset page of guilds in id order; returns (rows, cursor for the next page)"""
+    where, params = ("WHERE id > ?", [after_id]) if after_id is not None else ("", [])
+    rows = conn.execute(
+        f"SELECT {', '.join(GUILD_COLUMNS)} FROM guilds {where} ORDER BY id LIMIT ?", params + [limit + 1]
+    ).fetchall()
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def fetch_members(conn, guild_id: int, after: Optional[Tuple[int, int]] = None,
+                  limit: int = 50) -> Tuple[List[tuple], Optional[Tuple[int, int]]]:
+    """Keyset page of a guild's members by xp, highest first; the cursor is the last (xp, user_id)"""
+    where, params = "guild_id = ?", [guild_id]
+    if after is not None:
+        where += " AND (xp < ? OR (xp = ? AND user_id > ?))"
+        params += [after[0], after[0], after[1]]
+    rows = conn.execute(
+        f"SELECT {', '.join(MEMBER_COLUMNS)} FROM users WHERE {where} ORDER BY xp DESC, user_id LIMIT ?",
+        params + [limit + 1]
+    ).fetchall()
+    next_cursor = (rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def fetch_tickets(conn, guild_id: int, status: Optional[str] = None, before_id: Optional[int] = None,
+                  limit: int = 25, archive=None) -> Tuple[List[tuple], Optional[int]]:
+    """Keyset page of tickets and tickets_archive, newest first
+
+    With a JsonlArchive, pages continue into tickets retention moved to JSONL files.
+    """
+    where, params = "guild_id = ?", [guild_id]
+    if status is not None:
+        where += " AND status = ?"
+        params.append(status)
+    if before_id is not None:
+        where += " AND id < ?"
+        params.append(before_id)
+    columns = ", ".join(TICKET_COLUMNS)
+    rows = conn.execute(
+        f"SELECT {columns} FROM tickets WHERE {where} "
+        f"UNION ALL SELECT {columns} FROM tickets_archive WHERE {where} ORDER BY id DESC LIMIT ?",
+        params + params + [limit + 1]
+    ).fetchall()
+
+    if archive is not None and len(rows) <= limit:
+        older_than = rows[-1][0] if rows else before_id
+        records = archive.read(
+            "tickets", guild_id, before_id=older_than, limit=limit + 1 - len(rows),
+            match=lambda r: status is None or r["status"] == status
+        )
+        rows += [tuple(record[column] for column in TICKET_COLUMNS) for record in records]
+
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,89 @@
+"""XP writer: coalesces XP gains and level-ups on the loop and flushes them through the storage backend"""
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from core.storage import XpDelta
+
+logger = logging.getLogger(__name__)
+
+
+class XpWriter:
+    """Buffers one pending delta per member and hands the batch to db.backend once per interval"""
+
+    def __init__(self, db, interval: float = 5.0, max_batch: int = 5000):
+        self.db = db
+        self.interval = interval
+        self.max_batch = max_batch
+        self._xp: Dict[Tuple[int, int], XpDelta] = {}
+        self._levels: Dict[Tuple[int, int], int] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def add(self, user_id: int, guild_id: int, xp: int, last_message: str):
+        """Queue an XP gain; repeated gains before a flush collapse into one row"""
+        key = (user_id, guild_id)
+        pending = self._xp.get(key)
+        if pending is not None:
+            xp += pending.xp
+        self._xp[key] = XpDelta(user_id, guild_id, xp, last_message)
+        if len(self._xp) >= self.max_batch:
+            self._wakeup.set()
+
+    def set_level(self, user_id: int, guild_id: int, level: int):
+        self._levels[(user_id, guild_id)] = level
+
+    def pending(self) -> int:
+        return len(self._xp) + len(self._levels)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Failed to flush XP: %s", e)
+
+    async def flush(self):
+        """Write buffered XP, then levels (which need the rows add_xp creates)"""
+        async with self._flush_lock:
+            if not self._xp and not self._levels:
+                return
+            deltas, self._xp = self._xp, {}
+            levels, self._levels = self._levels, {}
+            try:
+                await self.db.backend.add_xp(list(deltas.values()))
+            except Exception:
+                # Put the batch back under anything queued meanwhile so the next interval retries it
+                for delta in deltas.values():
+                    newer = self._xp.get((delta.user_id, delta.guild_id))
+                    self._xp[(delta.user_id, delta.guild_id)] = delta._replace(
+                        xp=delta.xp + (newer.xp if newer else 0),
+                        last_message=newer.last_message if newer else delta.last_message)
+                self._restore_levels(levels)
+                raise
+            try:
+                await self.db.backend.set_levels(
+                    [(level, user_id, guild_id) for (user_id, guild_id), level in levels.items()])
+            except Exception:
+                self._restore_levels(levels)
+                raise
+
+    def _restore_levels(self, levels: Dict[Tuple[int, int], int]):
+        for key, level in levels.items():
+            self._levels.setdefault(key, level)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
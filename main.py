@@ -1,34 +1,56 @@
 # main.py
 import os
+import asyncio
 import logging
 import json
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
-import threading
+import socket
+from functools import partial, wraps
 
 from dotenv import load_dotenv
 
 # Discord imports
 import discord
 from discord.ext import commands, tasks
-from discord.ui import View, TextInput, Modal, Select, Button
 
 # Flask imports
-from flask import Flask
+from flask import Flask, Response, jsonify, request
+from markupsafe import escape
+
+from core.activity import Activity, ActivityRecorder, GRANULARITIES, COLUMNS as ACTIVITY_COLUMNS
+from core.activity import create_tables as create_activity_tables, fetch_activity
+from core.config import BotConfig
+from core.content import HELP_EMBED
+from core.events import EventHub, HubFull, KEEPALIVE_FRAME, RelayListener
+from core.features import Feature, FeatureGate
+from core.guilds import GuildRegistry
+from core.levelups import create_columns as create_level_up_columns
+from core.lifecycle import ShutdownCoordinator, WebServer
+from core.logsetup import setup_logging
+from core.maintenance import enable_incremental_vacuum
+from core.retention import JsonlArchive, create_tables as create_retention_tables
+from core.profiling import TimedConnection, queries
+from core.storage.sqlite import create_tables as create_user_tables
+from core.modlog import MOD_LOG_COLUMNS, fetch_mod_logs, create_tables as create_mod_log_tables
+from core.startup import sync_tree_if_changed
+from core.views import MainMenuView, send_only
+from core.watchdog import LoopWatchdog
+from core.webapi import ReadOnlyDatabase, ResponseCache, GUILD_COLUMNS, MEMBER_COLUMNS, TICKET_COLUMNS
+from core.webapi import create_indexes as create_api_indexes, enable_wal, fetch_guilds, fetch_members, fetch_tickets
+from core.webapi import is_loopback, token_matches
 
 # ---- Logging ----
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()]
-)
+setup_logging(level=logging.INFO, path=None)
 logger = logging.getLogger("discord_flask_app")
 
 # ---- Load env ----
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 PORT = int(os.getenv("PORT", 10000))
+# Bearer token for the dashboard API; without one the API only answers clients on this machine
+API_TOKEN = os.getenv("API_TOKEN")
 
 # ---- Database class (sqlite) ----
 class Database:
@@ -39,6 +61,8 @@ class Database:
     def init_database(self):
         conn = sqlite3.connect(self.db_path)
         c = conn.cursor()
+        enable_incremental_vacuum(c)
+        enable_wal(c)
 
         # Basic required tables (same as before)
         c.execute("""
@@ -59,20 +83,8 @@ class Database:
                 updated_at TEXT
             )
         """)
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER,
-                guild_id INTEGER,
-                xp INTEGER DEFAULT 0,
-                level INTEGER DEFAULT 1,
-                coins INTEGER DEFAULT 100,
-                last_message TEXT,
-                warnings INTEGER DEFAULT 0,
-                reputation INTEGER DEFAULT 0,
-                created_at TEXT,
-                PRIMARY KEY (user_id, guild_id)
-            )
-        """)
+        create_level_up_columns(c)
+        create_user_tables(c)
         c.execute("""
             CREATE TABLE IF NOT EXISTS tickets (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -85,39 +97,23 @@ class Database:
                 closed_at TEXT
             )
         """)
+        create_mod_log_tables(c)
+        create_retention_tables(c)
+        create_activity_tables(c)
+        create_api_indexes(c)
         conn.commit()
         conn.close()
         logger.info("Database initialized/checked at %s", self.db_path)
 
     def get_connection(self):
-        return sqlite3.connect(self.db_path, check_same_thread=False)
+        return sqlite3.connect(self.db_path, check_same_thread=False, factory=TimedConnection)
 
 db = Database()
 
 # ---- Bot configuration object ----
-class BotConfig:
-    def __init__(self):
-        self.prefix = "!"
-        self.version = "2.0.0"
-        self.description = "Professional Discord Bot - Like MEE6 but Better!"
-        self.owner_ids = []
-
-    def load_config(self):
-        try:
-            os.makedirs("config", exist_ok=True)
-            with open("config/config.json", "r") as f:
-                cfg = json.load(f)
-                self.__dict__.update(cfg)
-        except FileNotFoundError:
-            self.save_config()
-
-    def save_config(self):
-        os.makedirs("config", exist_ok=True)
-        with open("config/config.json", "w") as f:
-            json.dump(self.__dict__, f, indent=4)
-
 config = BotConfig()
 config.load_config()
+queries.slow_threshold = config.slow_query_ms / 1000
 
 # ---- Discord Bot ----
 intents = discord.Intents.all()
@@ -125,6 +121,41 @@ def get_prefix_callable(bot, message):
     # placeholder; will be replaced by ProDiscordBot.get_prefix method which uses DB
     return commands.when_mentioned_or("!")(bot, message)
 
+def read_prefix(guild_id):
+    conn = db.get_connection()
+    try:
+        result = conn.execute("SELECT prefix FROM guilds WHERE id = ?", (guild_id,)).fetchone()
+    finally:
+        conn.close()
+    return result[0] if result and result[0] else "!"
+
+def award_message_xp(user_id, guild_id):
+    """Simple XP addition with a 60 second cooldown (blocking; run in a thread)"""
+    conn = db.get_connection()
+    try:
+        c = conn.cursor()
+        c.execute("SELECT last_message FROM users WHERE user_id = ? AND guild_id = ?", (user_id, guild_id))
+        row = c.fetchone()
+        if row and row[0]:
+            try:
+                if (datetime.utcnow() - datetime.fromisoformat(row[0])).seconds < 60:
+                    return
+            except ValueError:
+                pass
+        now = datetime.utcnow().isoformat()
+        # Upsert so coins, level, reputation and warnings survive, as SQLiteBackend.add_xp does
+        c.execute("""
+            INSERT INTO users (user_id, guild_id, xp, last_message, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                xp = xp + excluded.xp,
+                last_message = excluded.last_message,
+                updated_at = excluded.updated_at
+        """, (user_id, guild_id, random.randint(10, 25), now, now, now))
+        conn.commit()
+    finally:
+        conn.close()
+
 class ProDiscordBot(commands.Bot):
     def __init__(self):
         super().__init__(
@@ -138,185 +169,62 @@ class ProDiscordBot(commands.Bot):
         self.launch_time = datetime.utcnow()
         self.command_stats = {}
         self.music_players = {}
+        self.db = db
+        self.guild_registry = GuildRegistry(db)
+        self.features = FeatureGate(db)
+        self.main_menu_view = None
+        self.watchdog = LoopWatchdog(threshold=config.watchdog_threshold_ms / 1000)
+        # Drain order; start_all adds the web server
+        self.lifecycle = ShutdownCoordinator(deadline=config.shutdown_deadline)
+        self.lifecycle.add_step("watchdog", self.watchdog.stop)
+        self.lifecycle.add_step("stats task", lambda: update_stats.cancel())
+        self.lifecycle.add_step("voice", self.disconnect_voice)
+        self.analytics = ActivityRecorder(db)
+        self.lifecycle.add_step("guild registry", self.guild_registry.close)
+        self.lifecycle.add_step("activity", self.analytics.close)
+        self.event_hub = EventHub(buffer=config.event_buffer, max_subscribers=config.event_max_subscribers)
+        # Before the web server step, which would otherwise wait out every open stream
+        self.lifecycle.add_step("event streams", self.event_hub.close)
+
+    def _schedule_event(self, coro, event_name, *args, **kwargs):
+        if not self.lifecycle.admit():
+            return None
+        task = super()._schedule_event(coro, event_name, *args, **kwargs)
+        self.lifecycle.track(task)
+        return task
+
+    async def disconnect_voice(self):
+        for voice in list(self.voice_clients):
+            await voice.disconnect(force=True)
+
+    async def close(self):
+        await self.lifecycle.drain()
+        await super().close()
 
     async def get_prefix(self, message):
         if not message.guild:
             return commands.when_mentioned_or("!")(self, message)
-        conn = db.get_connection()
-        c = conn.cursor()
-        c.execute("SELECT prefix FROM guilds WHERE id = ?", (message.guild.id,))
-        result = c.fetchone()
-        conn.close()
-        prefix = result[0] if result else "!"
+        # Read per message rather than cached: bot.py owns prefix edits
+        prefix = await asyncio.to_thread(read_prefix, message.guild.id)
         return commands.when_mentioned_or(prefix)(self, message)
 
     async def setup_hook(self):
-        # sync application commands (slash)
+        self.lifecycle.install_signal_handlers(self.close)
+        self.watchdog.start()
+        self.analytics.start()
+        self.guild_registry.start()
+        await asyncio.to_thread(self.features.load)
+        # shared help menu view, same custom_ids as bot.py
+        self.add_view(MainMenuView())
+        self.main_menu_view = send_only(MainMenuView())
+        # sync application commands (slash), skipped when unchanged since last sync
         try:
-            await self.tree.sync()
-            logger.info("Slash commands synced!")
+            await sync_tree_if_changed(self)
         except Exception as e:
             logger.warning("Failed to sync tree: %s", e)
 
 bot = ProDiscordBot()
 
-# ---- UI Views (cleaned strings) ----
-class MainMenuView(View):
-    def __init__(self):
-        super().__init__(timeout=300)
-
-    @discord.ui.select(
-        placeholder="🎮 Choose a feature to explore...",
-        options=[
-            discord.SelectOption(label="🛡️ Moderation", description="Kick, ban, warn, and more", emoji="🛡️"),
-            discord.SelectOption(label="🎵 Music", description="Play music in voice channels", emoji="🎵"),
-            discord.SelectOption(label="💰 Economy", description="Coins, shop, and inventory", emoji="💰"),
-            discord.SelectOption(label="📊 Leveling", description="XP system and leaderboards", emoji="📊"),
-            discord.SelectOption(label="🎫 Tickets", description="Support ticket system", emoji="🎫"),
-            discord.SelectOption(label="⚙️ Settings", description="Configure server settings", emoji="⚙️"),
-        ]
-    )
-    async def menu_select(self, interaction: discord.Interaction, select: Select):
-        selection = select.values[0]
-
-        if selection == "🛡️ Moderation":
-            embed = discord.Embed(
-                title="🛡️ Moderation System",
-                description="Professional moderation tools at your fingertips!",
-                color=0xff6b6b
-            )
-            embed.add_field(
-                name="Commands",
-                value=(
-                    "• `/kick` - Remove member from server\n"
-                    "• `/ban` - Permanently ban member\n"
-                    "• `/warn` - Issue warning\n"
-                    "• `/mute` - Temporarily mute member\n"
-                    "• `/purge` - Delete multiple messages\n"
-                    "• `/warnings` - View user warnings"
-                ),
-                inline=False
-            )
-            embed.add_field(
-                name="Auto-Moderation",
-                value=(
-                    "• Spam protection\n"
-                    "• Link filtering\n"
-                    "• Bad word detection\n"
-                    "• Raid protection"
-                ),
-                inline=False
-            )
-
-        elif selection == "🎵 Music":
-            embed = discord.Embed(
-                title="🎵 Music System",
-                description="High-quality music streaming for your server!",
-                color=0x4ecdc4
-            )
-            embed.add_field(
-                name="Commands",
-                value=(
-                    "• `/play` - Play a song\n"
-                    "• `/queue` - View music queue\n"
-                    "• `/skip` - Skip current song\n"
-                    "• `/pause/resume` - Control playback\n"
-                    "• `/volume` - Adjust volume\n"
-                    "• `/lyrics` - Get song lyrics"
-                ),
-                inline=False
-            )
-
-        elif selection == "💰 Economy":
-            embed = discord.Embed(
-                title="💰 Economy System",
-                description="Virtual currency and shop system!",
-                color=0xf7dc6f
-            )
-            embed.add_field(
-                name="Commands",
-                value=(
-                    "• `/balance` - Check your coins\n"
-                    "• `/daily` - Claim daily reward\n"
-                    "• `/shop` - Browse server shop\n"
-                    "• `/buy` - Purchase items\n"
-                    "• `/inventory` - View your items\n"
-                    "• `/pay` - Transfer coins"
-                ),
-                inline=False
-            )
-
-        elif selection == "📊 Leveling":
-            embed = discord.Embed(
-                title="📊 Leveling System",
-                description="XP and ranking system to keep members engaged!",
-                color=0xbb8fce
-            )
-            embed.add_field(
-                name="Commands",
-                value=(
-                    "• `/rank` - View your rank card\n"
-                    "• `/leaderboard` - Top server members\n"
-                    "• `/setlevel` - Set user level (mods)\n"
-                    "• `/rewards` - Level rewards"
-                ),
-                inline=False
-            )
-
-        elif selection == "🎫 Tickets":
-            embed = discord.Embed(
-                title="🎫 Ticket System",
-                description="Professional support ticket system!",
-                color=0x85c1e9
-            )
-            embed.add_field(
-                name="Features",
-                value=(
-                    "• Create private support channels\n"
-                    "• Automatic ticket logging\n"
-                    "• Customizable categories\n"
-                    "• Staff management tools"
-                ),
-                inline=False
-            )
-
-        elif selection == "⚙️ Settings":
-            embed = discord.Embed(
-                title="⚙️ Server Settings",
-                description="Configure all bot features for your server!",
-                color=0xa6acaf
-            )
-            embed.add_field(
-                name="Configuration",
-                value=(
-                    "• Welcome/goodbye messages\n"
-                    "• Auto-roles\n"
-                    "• Moderation settings\n"
-                    "• Feature toggles\n"
-                    "• Prefix customization"
-                ),
-                inline=False
-            )
-
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-
-class PlayMusicModal(Modal):
-    def __init__(self):
-        super().__init__(title="🎵 Play Music")
-        self.song_input = TextInput(
-            label="Song Name or URL",
-            placeholder="Enter a YouTube URL or search term...",
-            required=True,
-            max_length=500
-        )
-        self.add_item(self.song_input)
-
-    async def on_submit(self, interaction: discord.Interaction):
-        if not interaction.user.voice:
-            await interaction.response.send_message("❌ You need to be in a voice channel!", ephemeral=True)
-            return
-        await interaction.response.send_message(f"🎵 Searching for: `{self.song_input.value}`", ephemeral=True)
-
 # ---- Events & commands ----
 @bot.event
 async def on_ready():
@@ -331,65 +239,54 @@ async def on_ready():
         )
     except Exception:
         pass
+    await asyncio.to_thread(bot.guild_registry.sync, bot.guilds)
     update_stats.start()
 
 @bot.event
 async def on_guild_join(guild):
     logger.info("Joined new guild: %s (%s)", guild.name, guild.id)
-    conn = db.get_connection()
-    c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO guilds (id, name, created_at) VALUES (?, ?, ?)",
-              (guild.id, guild.name, datetime.utcnow().isoformat()))
-    conn.commit()
-    conn.close()
+    # Coalesced with other joins into one transaction per interval
+    bot.guild_registry.joined(guild)
+
+@bot.event
+async def on_member_join(member):
+    if not member.bot:
+        bot.analytics.record(member.guild.id, Activity.JOINS)
+    bot.event_hub.publish(member.guild.id, "member_join", {"user_id": member.id, "name": str(member),
+                                                           "bot": member.bot})
+
+@bot.event
+async def on_member_remove(member):
+    if not member.bot:
+        bot.analytics.record(member.guild.id, Activity.LEAVES)
+    bot.event_hub.publish(member.guild.id, "member_leave", {"user_id": member.id, "name": str(member),
+                                                            "bot": member.bot})
+
+@bot.event
+async def on_command(ctx):
+    if ctx.guild:
+        bot.analytics.record(ctx.guild.id, Activity.COMMANDS)
+        bot.event_hub.publish(ctx.guild.id, "command", {"command": ctx.command.qualified_name,
+                                                        "user_id": ctx.author.id})
 
 @bot.event
 async def on_message(message):
     if message.author.bot:
         return
-    # Simple XP addition
     if message.guild:
-        conn = db.get_connection()
-        c = conn.cursor()
-        c.execute("SELECT last_message, xp, level FROM users WHERE user_id = ? AND guild_id = ?",
-                  (message.author.id, message.guild.id))
-        row = c.fetchone()
-        can_gain_xp = True
-        if row and row[0]:
-            last = row[0]
-            try:
-                last_dt = datetime.fromisoformat(last)
-                if (datetime.utcnow() - last_dt).seconds < 60:
-                    can_gain_xp = False
-            except Exception:
-                can_gain_xp = True
-        if can_gain_xp:
-            xp_gain = random.randint(10, 25)
-            c.execute("""
-                INSERT OR REPLACE INTO users (user_id, guild_id, xp, last_message, created_at)
-                VALUES (?, ?, COALESCE((SELECT xp FROM users WHERE user_id = ? AND guild_id = ?), 0) + ?, ?, COALESCE((SELECT created_at FROM users WHERE user_id = ? AND guild_id = ?), ?))
-            """, (message.author.id, message.guild.id, message.author.id, message.guild.id, xp_gain, datetime.utcnow().isoformat(), message.author.id, message.guild.id, datetime.utcnow().isoformat()))
-            conn.commit()
-        conn.close()
+        bot.analytics.record(message.guild.id, Activity.MESSAGES)
+    if message.guild and bot.features.enabled(message.guild.id, Feature.LEVELING):
+        await asyncio.to_thread(award_message_xp, message.author.id, message.guild.id)
     await bot.process_commands(message)
 
 @bot.hybrid_command(name="help")
 async def help_command(ctx):
-    embed = discord.Embed(
-        title="🤖 Professional Discord Bot",
-        description="A feature-rich bot with everything your server needs!",
-        color=0x3498db
-    )
-    embed.add_field(name="🛡️ Moderation", value="`/kick` `/ban` `/warn` `/mute` `/purge`", inline=True)
-    embed.add_field(name="🎵 Music", value="`/play` `/queue` `/skip` `/pause` `/volume`", inline=True)
-    embed.add_field(name="💰 Economy", value="`/balance` `/daily` `/shop` `/buy` `/pay`", inline=True)
-    embed.add_field(name="📊 Leveling", value="`/rank` `/leaderboard` `/setlevel`", inline=True)
-    embed.add_field(name="🎫 Tickets", value="`/ticket` `/close` `/add` `/remove`", inline=True)
-    embed.set_footer(text=f"Bot Version {config.version}")
-    await ctx.send(embed=embed, view=MainMenuView())
+    await ctx.send(embed=HELP_EMBED, view=bot.main_menu_view)
 
 @tasks.loop(minutes=5)
 async def update_stats():
+    # bot.py owns the feature toggles; pick up its changes on the same cadence
+    await asyncio.to_thread(bot.features.load)
     guild_count = len(bot.guilds)
     user_count = sum(g.member_count for g in bot.guilds) if bot.guilds else 0
     try:
@@ -404,24 +301,205 @@ flask_app = Flask(__name__)
 flask_app.config['SECRET_KEY'] = os.getenv("FLASK_SECRET", "please-change-this")
 flask_app.config['DATABASE'] = db.db_path
 
+# Web threads read through their own read-only connections and never queue behind the bot's writes
+reader = ReadOnlyDatabase(db.db_path, size=config.api_readers)
+api_cache = ResponseCache(ttl=config.api_cache_ttl)
+
+# History that retention moved to JSONL files is paged in after the archive table
+archive = JsonlArchive(config.archive_dir)
+
+def api_response(compute):
+    """Serve compute()'s JSON from the short-TTL cache, answering 304 when the client's ETag still matches"""
+    etag, body = api_cache.get(request.full_path, compute)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = f"private, max-age={int(api_cache.ttl)}"
+    return response
+
+def request_token(query=False):
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer":
+        return token
+    # EventSource can't set headers, so streams may pass the token as ?token=
+    return request.args.get("token") if query else None
+
+def require_api_token(view=None, *, query=False):
+    """Refuse API calls without API_TOKEN, or from other hosts when no token is configured"""
+    if view is None:
+        return partial(require_api_token, query=query)
+
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if API_TOKEN:
+            if not token_matches(API_TOKEN, request_token(query)):
+                return jsonify(error="missing or invalid API token"), 401
+        elif not is_loopback(request.remote_addr):
+            return jsonify(error="API_TOKEN is not set, so the API only answers local clients"), 403
+        return view(*args, **kwargs)
+    return guarded
+
+def page_limit(default=25):
+    return max(1, min(request.args.get("limit", default, type=int), 100))
+
 @flask_app.route("/")
 def dashboard():
-    # Lightweight dashboard landing page
-    return "<h2>Discord Bot Dashboard</h2><p>Bot is running.</p>"
+    # Busiest guilds over the last 30 days, read from the daily rollups
+    with reader.connection() as conn:
+        rows = conn.execute(
+            "SELECT a.guild_id, g.name, SUM(a.messages), SUM(a.joins), SUM(a.leaves), SUM(a.commands) "
+            "FROM activity_daily a LEFT JOIN guilds g ON g.id = a.guild_id WHERE a.day >= ? "
+            "GROUP BY a.guild_id ORDER BY SUM(a.messages) DESC LIMIT 25",
+            ((datetime.utcnow() - timedelta(days=30)).strftime("%Y-%m-%d"),)
+        ).fetchall()
+    body = "".join(
+        f"<tr><td><a href='/api/guilds/{guild_id}/activity?granularity=day'>{escape(name or str(guild_id))}</a></td>"
+        f"<td>{messages:,}</td><td>{joins:,}</td><td>{leaves:,}</td><td>{commands:,}</td></tr>"
+        for guild_id, name, messages, joins, leaves, commands in rows
+    )
+    return ("<h2>Discord Bot Dashboard</h2><p>Last 30 days</p><table>"
+            "<tr><th>Server</th><th>Messages</th><th>Joins</th><th>Leaves</th><th>Commands</th></tr>"
+            f"{body}</table>")
+
+@flask_app.route("/api/guilds")
+@require_api_token
+def guilds():
+    after = request.args.get("after", type=int)
+    limit = page_limit(50)
+
+    def compute():
+        with reader.connection() as conn:
+            rows, next_cursor = fetch_guilds(conn, after_id=after, limit=limit)
+        return {"items": [dict(zip(GUILD_COLUMNS, row)) for row in rows], "next": next_cursor}
+    return api_response(compute)
+
+@flask_app.route("/api/guilds/<int:guild_id>/activity")
+@require_api_token
+def guild_activity(guild_id):
+    granularity = request.args.get("granularity", "hour")
+    if granularity != "minute" and granularity not in GRANULARITIES:
+        return jsonify(error="granularity must be minute, hour or day"), 400
+    days = min(request.args.get("days", 30, type=int), 366)
+
+    def compute():
+        if granularity == "minute":
+            # Live minute buckets held by this process's bot, not yet rolled up
+            rows = bot.analytics.recent(guild_id)
+        else:
+            with reader.connection() as conn:
+                rows = fetch_activity(conn, guild_id, granularity, days)
+        return {"granularity": granularity,
+                "points": [dict(zip(("at",) + ACTIVITY_COLUMNS, row)) for row in rows]}
+    return api_response(compute)
+
+@flask_app.route("/api/guilds/<int:guild_id>/members")
+@require_api_token
+def guild_members(guild_id):
+    # Cursor is "<xp>:<user_id>" of the last member on the previous page
+    after = None
+    if request.args.get("after"):
+        try:
+            xp, user_id = request.args["after"].split(":")
+            after = (int(xp), int(user_id))
+        except ValueError:
+            return jsonify(error="after must be <xp>:<user_id>"), 400
+    limit = page_limit(50)
+
+    def compute():
+        with reader.connection() as conn:
+            rows, next_cursor = fetch_members(conn, guild_id, after=after, limit=limit)
+        return {"items": [dict(zip(MEMBER_COLUMNS, row)) for row in rows],
+                "next": f"{next_cursor[0]}:{next_cursor[1]}" if next_cursor else None}
+    return api_response(compute)
+
+@flask_app.route("/api/guilds/<int:guild_id>/mod-logs")
+@require_api_token
+def guild_mod_logs(guild_id):
+    user_id = request.args.get("user_id", type=int)
+    action = request.args.get("action")
+    before = request.args.get("before", type=int)
+    limit = page_limit()
+
+    def compute():
+        with reader.connection() as conn:
+            rows, next_cursor = fetch_mod_logs(conn, guild_id, user_id=user_id, action=action,
+                                               before_id=before, limit=limit, archive=archive)
+        return {"items": [dict(zip(MOD_LOG_COLUMNS, row)) for row in rows], "next": next_cursor}
+    return api_response(compute)
+
+@flask_app.route("/api/guilds/<int:guild_id>/tickets")
+@require_api_token
+def guild_tickets(guild_id):
+    status = request.args.get("status")
+    if status not in (None, "open", "closed"):
+        return jsonify(error="status must be open or closed"), 400
+    before = request.args.get("before", type=int)
+    limit = page_limit()
+
+    def compute():
+        with reader.connection() as conn:
+            rows, next_cursor = fetch_tickets(conn, guild_id, status=status, before_id=before, limit=limit,
+                                              archive=archive)
+        return {"items": [dict(zip(TICKET_COLUMNS, row)) for row in rows], "next": next_cursor}
+    return api_response(compute)
+
+def stop_socket(environ):
+    # The dev server exposes the client socket; shutting it down fails a write blocked on a stalled client
+    sock = environ.get("werkzeug.socket")
+    if sock is not None:
+        sock.shutdown(socket.SHUT_RDWR)
+
+@flask_app.route("/api/guilds/<int:guild_id>/events")
+@require_api_token(query=True)
+def guild_events(guild_id):
+    # Server-Sent Events; the browser's EventSource reconnects on its own after an eviction or restart
+    try:
+        subscription = bot.event_hub.subscribe(guild_id, interrupt=partial(stop_socket, request.environ))
+    except HubFull:
+        return jsonify(error="too many event streams open"), 503
 
-def run_flask():
-    logger.info("Starting Flask on port %s", PORT)
-    flask_app.run(host="0.0.0.0", port=PORT, threaded=True)
+    def stream():
+        try:
+            yield b"retry: 5000\n\n"
+            while True:
+                frames = subscription.get(config.event_keepalive)
+                if frames:
+                    yield b"".join(frames)
+                elif subscription.closed:
+                    break
+                else:
+                    # Also how a closed browser tab is noticed: the write fails and the stream ends
+                    yield KEEPALIVE_FRAME
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # ---- Startup ----
 def start_all():
-    # Start flask in a background thread, then run the bot
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start()
-    logger.info("Flask thread started.")
+    # Start flask in a background thread, then run the bot; the drain stops it after the bot's handlers
+    host = config.api_host
+    if not is_loopback(host) and not API_TOKEN:
+        logger.error("api_host is %s but API_TOKEN is not set; serving on 127.0.0.1 only", host)
+        host = "127.0.0.1"
+    web = WebServer(flask_app, host, PORT)
+    web.start()
+    # Moderation, ticket and member events from bot.py's process
+    relay = RelayListener(bot.event_hub, config.event_relay_port)
+    try:
+        relay.start()
+    except OSError as e:
+        logger.error("Cannot listen for relayed events on port %d: %s", config.event_relay_port, e)
+    bot.lifecycle.add_step("event relay", relay.close)
+    bot.lifecycle.add_step("web server", lambda: asyncio.to_thread(web.stop))
+    bot.lifecycle.add_step("api readers", reader.close)
 
     if not DISCORD_TOKEN:
         logger.error("DISCORD_BOT_TOKEN not set in environment. Exiting.")
+        web.stop()
         return
 
     try:
@@ -0,0 +1,37 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from core.modlog import create_tables as create_mod_log_tables
+from core.storage import SQLiteBackend
+from core.storage.sqlite import create_tables as create_user_tables
+
+
+async def _sqlite_backend(path):
+    # The same schema helpers the bot runs at startup, so the tests cannot drift from it
+    conn = sqlite3.connect(path)
+    create_user_tables(conn)
+    create_mod_log_tables(conn)
+    conn.commit()
+    conn.close()
+    backend = SQLiteBackend(str(path))
+    await backend.open()
+    return backend
+
+
+@pytest.fixture
+def run(tmp_path):
+    """Run an async check against a freshly opened backend on its own loop"""
+
+    def runner(check):
+        async def main():
+            backend = await _sqlite_backend(tmp_path / "test.db")
+            try:
+                await check(backend)
+            finally:
+                await backend.close()
+
+        asyncio.run(main())
+
+    return runner
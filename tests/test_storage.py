@@ -0,0 +1,114 @@
+"""Contract every StorageBackend implements, run against the SQLite backend"""
+from core.storage import UserRow, XpDelta
+
+GUILD = 10
+OTHER_GUILD = 20
+# A flush with many members, each seen several times
+LARGE_BATCH = 600
+
+
+def user(user_id, xp, guild_id=GUILD, **fields):
+    values = dict(level=1, coins=100, reputation=0, warnings=0, last_message=None, created_at="2024-01-01T00:00:00")
+    values.update(fields)
+    return UserRow(user_id, guild_id, xp, **values)
+
+
+def test_add_xp_creates_and_accumulates(run):
+    async def check(backend):
+        await backend.add_xp([XpDelta(1, GUILD, 20, "2024-01-01T00:00:00")])
+        await backend.add_xp([XpDelta(1, GUILD, 15, "2024-01-01T00:01:00"), XpDelta(2, GUILD, 5, "2024-01-01T00:01:00")])
+        first = await backend.get_user(1, GUILD)
+        assert (first.xp, first.level, first.coins, first.last_message) == (35, 1, 100, "2024-01-01T00:01:00")
+        assert (await backend.get_user(2, GUILD)).xp == 5
+        assert await backend.get_user(1, OTHER_GUILD) is None
+
+    run(check)
+
+
+def test_add_xp_keeps_other_columns(run):
+    async def check(backend):
+        await backend.upsert_users([user(1, 100, level=3, coins=555, reputation=7, warnings=2)])
+        await backend.add_xp([XpDelta(1, GUILD, 25, "2024-02-01T00:00:00")])
+        row = await backend.get_user(1, GUILD)
+        assert (row.xp, row.level, row.coins, row.reputation, row.warnings) == (125, 3, 555, 7, 2)
+
+    run(check)
+
+
+def test_add_xp_large_batch_with_repeated_members(run):
+    async def check(backend):
+        members = LARGE_BATCH
+        deltas = [XpDelta(n % members, GUILD, 1, f"2024-01-01T00:00:{n % 60:02d}") for n in range(members * 3)]
+        await backend.add_xp(deltas)
+        top = await backend.top_users(GUILD, limit=members + 10)
+        assert len(top) == members
+        assert {row.xp for row in top} == {3}
+
+    run(check)
+
+
+def test_set_levels(run):
+    async def check(backend):
+        await backend.add_xp([XpDelta(1, GUILD, 500, "2024-01-01T00:00:00")])
+        await backend.set_levels([(4, 1, GUILD), (9, 404, GUILD)])
+        assert (await backend.get_user(1, GUILD)).level == 4
+        assert await backend.get_user(404, GUILD) is None
+
+    run(check)
+
+
+def test_reset_user_starts_over(run):
+    async def check(backend):
+        await backend.upsert_users([user(1, 300, level=4, coins=9, warnings=3), user(2, 50)])
+        await backend.reset_user(1, GUILD)
+        await backend.reset_user(3, GUILD)
+        row = await backend.get_user(1, GUILD)
+        assert (row.xp, row.level, row.coins, row.reputation, row.warnings) == (0, 1, 100, 0, 0)
+        assert (await backend.get_user(3, GUILD)).xp == 0
+        assert (await backend.get_user(2, GUILD)).xp == 50
+
+    run(check)
+
+
+def test_upsert_users_overwrites_stats(run):
+    async def check(backend):
+        await backend.upsert_users([user(1, 10, last_message="2024-01-01T00:00:00"), user(2, 20)])
+        await backend.upsert_users([user(1, 99, level=5, coins=1, warnings=4)])
+        row = await backend.get_user(1, GUILD)
+        assert (row.xp, row.level, row.coins, row.warnings) == (99, 5, 1, 4)
+        # A missing last_message does not erase the stored one
+        assert row.last_message == "2024-01-01T00:00:00"
+        assert (await backend.get_user(2, GUILD)).xp == 20
+
+    run(check)
+
+
+def test_insert_mod_logs_counts_warnings(run):
+    async def check(backend):
+        await backend.upsert_users([user(1, 0), user(2, 0)])
+        await backend.insert_mod_logs([
+            (GUILD, 1, 99, "warn", "spam", None, "2024-01-01T00:00:00"),
+            (GUILD, 1, 99, "warn", "spam again", None, "2024-01-01T00:01:00"),
+            (GUILD, 2, 99, "kick", "rude", None, "2024-01-01T00:02:00"),
+            (GUILD, None, 99, "purge", None, None, "2024-01-01T00:03:00"),
+        ])
+        assert (await backend.get_user(1, GUILD)).warnings == 2
+        assert (await backend.get_user(2, GUILD)).warnings == 0
+
+    run(check)
+
+
+def test_top_users_and_rank(run):
+    async def check(backend):
+        await backend.upsert_users([user(1, 50), user(2, 300), user(3, 300), user(4, 10), user(5, 999, guild_id=OTHER_GUILD)])
+        top = await backend.top_users(GUILD, limit=3)
+        assert [row.xp for row in top] == [300, 300, 50]
+        assert {row.user_id for row in top[:2]} == {2, 3}
+        # Ties share the better rank; other guilds don't count
+        assert await backend.rank(2, GUILD) == 1
+        assert await backend.rank(3, GUILD) == 1
+        assert await backend.rank(1, GUILD) == 3
+        assert await backend.rank(4, GUILD) == 4
+        assert await backend.rank(404, GUILD) is None
+
+    run(check)